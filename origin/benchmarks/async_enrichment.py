@@ -0,0 +1,166 @@
+"""
+Compare looking up new LEIs in POST /bonds/ with the enrichment workers
+
+    python -m benchmarks.async_enrichment --bonds 1000 --concurrency 8 --coroutines 200
+
+Every bond is issued by an entity that has not been seen before, so each one
+needs a GLEIF lookup, which the local stub answers after --gleif-latency
+seconds. The bonds are created from --concurrency threads, standing in for
+the threads of the WSGI workers, in each of the modes:
+
+    wsgi      the request waits on GLEIF, as with BONDS_ASYNC_ENRICHMENT off
+    threads   the bond is saved as pending and resolved by an
+              EnrichmentWorkerPool of --concurrency threads
+    asyncio   the bond is saved as pending and resolved by an
+              AsyncEnrichmentWorker of --coroutines coroutines on one thread
+
+Workers claim --batch-size jobs at a time, 1 by default so that every bond
+takes a GLEIF query of its own as it does in a request. The latency and
+throughput of the creates, and the time until every bond was resolved, are
+reported as JSON.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from benchmarks.gleif_stub import GleifStubServer
+from benchmarks.run import percentile, setup_database
+
+MODES = ["wsgi", "threads", "asyncio"]
+
+
+def _create(client, number, issuer):
+    from benchmarks.dataset import lei
+    data = {
+        "isin": f"A{number:011}",
+        "size": 100000,
+        "currency": "EUR",
+        "maturity": "2030-06-30",
+        "lei": lei(issuer),
+    }
+    started = time.perf_counter()
+    response = client.post("/bonds/", json.dumps(data), content_type="application/json")
+    return time.perf_counter() - started, response.status_code
+
+
+def _wait_for_jobs(poll_interval=0.05):
+    from bonds.models import EnrichmentJob
+    while EnrichmentJob.objects.exists():
+        time.sleep(poll_interval)
+
+
+def run_mode(mode, args, first_issuer):
+    accounts = setup_database(args.concurrency, 0, args.issuers, args.seed)
+
+    from django.db import connections
+    from django.test import Client
+
+    from bonds import enrichment
+    from bonds.cache import lei_cache
+    from bonds.models import Bond
+
+    lei_cache.clear()
+    clients = [Client(HTTP_AUTHORIZATION=f"Token {key}") for user, key in accounts]
+
+    def create(number):
+        try:
+            return _create(clients[number % len(clients)], number, first_issuer + number)
+        finally:
+            connections.close_all()
+
+    started = time.perf_counter()
+    with mock.patch("bonds.views.ASYNC_ENRICHMENT", mode != "wsgi"):
+        with ThreadPoolExecutor(args.concurrency) as executor:
+            samples = list(executor.map(create, range(args.bonds)))
+    created = time.perf_counter() - started
+
+    if mode == "threads":
+        pool = enrichment.EnrichmentWorkerPool(
+            workers=args.concurrency, batch_size=args.batch_size, poll_interval=0.05
+        )
+        pool.start()
+        _wait_for_jobs()
+        pool.stop()
+    elif mode == "asyncio":
+        enrichment.AsyncEnrichmentWorker(
+            concurrency=args.coroutines, batch_size=args.batch_size
+        ).run(once=True)
+    resolved = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, status in samples)
+    return {
+        "creates": {
+            "duration_s": round(created, 4),
+            "requests_per_s": round(len(samples) / created, 2),
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50) * 1000, 3),
+                "p95": round(percentile(latencies, 95) * 1000, 3),
+                "p99": round(percentile(latencies, 99) * 1000, 3),
+            },
+            "statuses": dict(sorted(
+                Counter(str(status) for latency, status in samples).items()
+            )),
+        },
+        "resolved_s": round(resolved, 4),
+        "resolved_per_s": round(args.bonds / resolved, 2),
+        "enrichment_states": dict(Counter(
+            Bond.objects.values_list("enrichment_state", flat=True)
+        )),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--bonds", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8, help="Request threads")
+    parser.add_argument("--coroutines", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=1, help="Jobs claimed at a time")
+    parser.add_argument("--issuers", type=int, default=10)
+    parser.add_argument("--gleif-latency", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    modes = args.modes.split(",")
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"Unknown modes: {', '.join(sorted(unknown))}")
+
+    stub = GleifStubServer(latency=args.gleif_latency, seed=args.seed).start()
+    os.environ["BENCH_GLEIF_PORT"] = str(stub.server_port)
+    os.environ["DJANGO_SETTINGS_MODULE"] = "benchmarks.settings"
+
+    results = {}
+    try:
+        for number, mode in enumerate(modes):
+            print(f"Running {mode}", file=sys.stderr)
+            # New issuers for every mode, so that none are already stored
+            results[mode] = run_mode(mode, args, args.issuers + number * args.bonds)
+    finally:
+        stub.stop()
+
+    report = {
+        "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "gleif_stub_requests": stub.requests,
+        "modes": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Generate benchmark users, legal entities and bonds
+"""
+import datetime
+import random
+
+from django.contrib.auth.models import User
+from rest_framework.authtoken.models import Token
+
+from bonds import aggregates
+from bonds import sharding
+from bonds.models import Bond, LegalEntity, UserDataVersion
+from bonds.utils import chunked
+
+CURRENCIES = ["EUR", "USD", "GBP", "JPY", "CHF"]
+FIRST_MATURITY = datetime.date(2021, 1, 1)
+
+
+def lei(index):
+    # Never ends in "00", which the stub reports as unknown
+    return f"BENCH{index:013}X1"
+
+
+def isin(user_index, index):
+    return f"B{user_index:04}{index:07}"
+
+
+def generate(users, bonds_per_user, issuers=100, seed=0):
+    """
+    Create users with tokens, issuers and bonds_per_user bonds for each user
+
+    Returns a list of (user, token key) tuples. The same arguments always
+    produce the same data.
+    """
+    rng = random.Random(seed)
+    LegalEntity.objects.store({lei(i): f"Legal Entity {lei(i)}" for i in range(issuers)})
+
+    accounts = []
+    for user_index in range(users):
+        user = User.objects.create(username=f"bench-{user_index}")
+        token = Token.objects.create(user=user)
+        bonds = (
+            Bond(
+                user=user,
+                isin=isin(user_index, i),
+                size=rng.randrange(1, 1000) * 100000,
+                currency=rng.choice(CURRENCIES),
+                maturity=FIRST_MATURITY + datetime.timedelta(days=rng.randrange(30 * 365)),
+                lei=lei(rng.randrange(issuers)),
+            )
+            for i in range(bonds_per_user)
+        )
+        with sharding.use_shard(sharding.shard_for(user.pk)), sharding.atomic():
+            for batch in chunked(bonds, 1000):
+                for bond in batch:
+                    bond.legal_entity_id = bond.lei
+                Bond.objects.bulk_create(batch)
+            UserDataVersion.objects.bump([user.pk])
+        accounts.append((user, token.key))
+
+    for shard in sharding.SHARDS:
+        with sharding.use_shard(shard):
+            aggregates.rebuild()
+    return accounts
@@ -0,0 +1,115 @@
+"""
+Local stand-in for the GLEIF leirecords API
+
+    python -m benchmarks.gleif_stub --port 8765 --latency 0.05 --error-rate 0.01
+
+Every well formed LEI is known, apart from those ending in "00", and is
+given the legal name "Legal Entity <LEI>". Each request is delayed by
+latency seconds (plus up to jitter seconds more) and fails with a 503 with
+probability error_rate.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PATH = "/api/v2/leirecords"
+
+
+def is_known(lei):
+    return len(lei) == 20 and not lei.endswith("00")
+
+
+def record(lei):
+    return {
+        "LEI": {"$": lei},
+        "Entity": {"LegalName": {"$": f"Legal Entity {lei}"}},
+    }
+
+
+class LeiRecordsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        time.sleep(server.latency + server.random.uniform(0, server.jitter))
+
+        url = urlparse(self.path)
+        if url.path != PATH:
+            return self._send(404, {"message": "Not found"})
+        if server.random.random() < server.error_rate:
+            return self._send(503, {"message": "Service unavailable"})
+
+        leis = parse_qs(url.query).get("lei", [""])[0].split(",")
+        if not all(leis):
+            return self._send(400, {"message": "400 Bad Request", "status_code": 400})
+        self._send(200, [record(lei) for lei in leis if is_known(lei)])
+
+    def _send(self, status, body):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class GleifStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for the connections an asyncio client opens all at once
+    request_queue_size = 1024
+
+    def __init__(self, port=0, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        super().__init__(("127.0.0.1", port), LeiRecordsHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}{PATH}"
+
+    def start(self):
+        """
+        Serve from a background thread
+        """
+        thread = threading.Thread(
+            target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = GleifStubServer(args.port, args.latency, args.jitter, args.error_rate)
+    print(f"Serving GLEIF stub on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
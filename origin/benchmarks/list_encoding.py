@@ -0,0 +1,112 @@
+"""
+Compare BondSerializer with the row encoder used by GET /bonds/
+
+    python -m benchmarks.list_encoding --rows 10000,100000,1000000
+
+One user is given as many bonds as the largest row count. For each row
+count, the bonds are read and encoded as a page of the list endpoint both
+ways, and the best time out of --repeat runs of each is reported as JSON,
+split between reading the rows and encoding them.
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import sys
+import time
+
+
+def best_of(repeat, function):
+    """
+    Run function repeat times, returns its result and the fastest
+    (read, encode) times of a run
+    """
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        result, timings = function()
+        if best is None or sum(timings) < sum(best):
+            best = timings
+    return result, best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", default="10000,100000,1000000")
+    parser.add_argument("--issuers", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results to this file instead of stdout")
+    args = parser.parse_args(argv)
+    counts = [int(count) for count in args.rows.split(",")]
+
+    os.environ["DJANGO_SETTINGS_MODULE"] = "benchmarks.settings"
+    from benchmarks.run import setup_database
+
+    print(f"Generating {max(counts)} bonds", file=sys.stderr)
+    [(user, key)] = setup_database(1, max(counts), args.issuers, args.seed)
+
+    from rest_framework.renderers import JSONRenderer
+
+    from bonds import encoding, export
+    from bonds.models import Bond
+    from bonds.serializers import BondSerializer
+
+    bonds = Bond.objects.filter(user=user).order_by("id")
+
+    def serializer(count):
+        def run():
+            started = time.perf_counter()
+            page = list(bonds.select_related("legal_entity")[:count])
+            read = time.perf_counter()
+            body = JSONRenderer().render({
+                "next": None,
+                "previous": None,
+                "results": BondSerializer(page, many=True).data,
+            })
+            return body, (read - started, time.perf_counter() - read)
+        return run
+
+    def row_encoder(count):
+        def run():
+            started = time.perf_counter()
+            page = list(bonds.values_list(*export.COLUMNS, "id", named=True)[:count])
+            read = time.perf_counter()
+            body = encoding.encode_page(export.encode_bond, page, None, None)
+            return body, (read - started, time.perf_counter() - read)
+        return run
+
+    results = {}
+    for count in counts:
+        print(f"Encoding {count} bonds", file=sys.stderr)
+        expected, slow = best_of(args.repeat, serializer(count))
+        body, fast = best_of(args.repeat, row_encoder(count))
+        results[count] = {
+            "identical_output": body == expected,
+            "bytes": len(body),
+            "serializer_s": {"read": round(slow[0], 4), "encode": round(slow[1], 4),
+                             "total": round(sum(slow), 4)},
+            "row_encoder_s": {"read": round(fast[0], 4), "encode": round(fast[1], 4),
+                              "total": round(sum(fast), 4)},
+            "speedup": round(sum(slow) / sum(fast), 2),
+        }
+        del expected, body
+
+    report = {
+        "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "rows": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Run scripted concurrent workloads against the bonds API
+
+    python -m benchmarks.run --users 10 --bonds 1000 --concurrency 8 \
+        --workloads create,list,filter --output results.json
+
+A fresh SQLite database is migrated and filled by benchmarks.dataset, LEIs
+that are not already stored are looked up on the local GLEIF stub. Requests
+go through the full Django stack in-process, from a pool of threads. The
+latency percentiles, throughput, status codes and database queries of every
+workload are written out as JSON so that runs can be compared.
+"""
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.gleif_stub import GleifStubServer
+
+WORKLOADS = {}
+
+
+def workload(name):
+    """
+    Register a function building the requests of a workload
+
+    The function is called with the request number, a random.Random and the
+    Run, and returns a (method, path, data) tuple.
+    """
+    def register(build):
+        WORKLOADS[name] = build
+        return build
+    return register
+
+
+_new_isins = itertools.count()
+
+
+@workload("create")
+def create_bond(number, rng, run):
+    from benchmarks.dataset import CURRENCIES, lei
+    # One bond in five is issued by an entity that has to be looked up
+    if rng.random() < 0.2:
+        issuer = run.issuers + rng.randrange(run.issuers * 10)
+    else:
+        issuer = rng.randrange(run.issuers)
+    return "post", "/bonds/", {
+        "isin": f"N{next(_new_isins):011}",
+        "size": rng.randrange(1, 1000) * 100000,
+        "currency": rng.choice(CURRENCIES),
+        "maturity": f"{rng.randrange(2021, 2051)}-06-30",
+        "lei": lei(issuer),
+    }
+
+
+@workload("list")
+def list_bonds(number, rng, run):
+    return "get", "/bonds/", None
+
+
+@workload("filter")
+def filter_bonds(number, rng, run):
+    from benchmarks.dataset import CURRENCIES
+    return "get", "/bonds/", {
+        "currency": rng.choice(CURRENCIES),
+        "maturity__gte": f"{rng.randrange(2021, 2050)}-01-01",
+    }
+
+
+@workload("summary")
+def summarize_bonds(number, rng, run):
+    return "get", "/bonds/summary/", None
+
+
+def percentile(values, p):
+    """
+    Nearest rank percentile of a sorted list
+    """
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * p // 100))
+    return values[int(rank) - 1]
+
+
+class Run:
+    def __init__(self, accounts, issuers, requests, concurrency, seed):
+        self.accounts = accounts
+        self.issuers = issuers
+        self.requests = requests
+        self.concurrency = concurrency
+        self.seed = seed
+
+    def workload(self, name):
+        """
+        Send the requests of a workload, returns its statistics
+        """
+        build = WORKLOADS[name]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            samples = list(pool.map(
+                lambda number: self._request(build, number), range(self.requests)
+            ))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for latency, status, queries in samples)
+        queries = [queries for latency, status, queries in samples]
+        statuses = Counter(str(status) for latency, status, queries in samples)
+        return {
+            "requests": len(samples),
+            "concurrency": self.concurrency,
+            "duration_s": round(elapsed, 4),
+            "requests_per_s": round(len(samples) / elapsed, 2),
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50) * 1000, 3),
+                "p95": round(percentile(latencies, 95) * 1000, 3),
+                "p99": round(percentile(latencies, 99) * 1000, 3),
+                "mean": round(sum(latencies) / len(latencies) * 1000, 3),
+                "max": round(latencies[-1] * 1000, 3),
+            },
+            "statuses": dict(sorted(statuses.items())),
+            "queries": {
+                "total": sum(queries),
+                "per_request": round(sum(queries) / len(queries), 2),
+                "max": max(queries),
+            },
+        }
+
+    def _request(self, build, number):
+        from django.db import connection
+        from django.test import Client
+
+        from bonds.middleware import QueryCounter
+
+        rng = random.Random(f"{self.seed}-{number}")
+        user, key = self.accounts[number % len(self.accounts)]
+        method, path, data = build(number, rng, self)
+        client = Client(HTTP_AUTHORIZATION=f"Token {key}")
+        counter = QueryCounter()
+
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(counter):
+                if method == "post":
+                    response = client.post(
+                        path, json.dumps(data), content_type="application/json"
+                    )
+                else:
+                    response = client.get(path, data)
+                if response.streaming:
+                    b"".join(response.streaming_content)
+            status = response.status_code
+        except Exception as e:
+            status = type(e).__name__
+        return time.perf_counter() - started, status, counter.count
+
+
+def setup_database(users, bonds, issuers, seed):
+    """
+    Migrate fresh benchmark databases, one per shard, and fill them, returns
+    the accounts
+    """
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connections
+
+    django.setup()
+    # A database set up earlier in this process may still be open
+    connections.close_all()
+    for alias, database in settings.DATABASES.items():
+        name = database["NAME"]
+        # Along with the write-ahead log left by a WAL mode database
+        for path in [name, f"{name}-wal", f"{name}-shm"]:
+            if os.path.exists(path):
+                os.remove(path)
+        call_command("migrate", database=alias, verbosity=0)
+
+    from benchmarks import dataset
+    return dataset.generate(users, bonds, issuers=issuers, seed=seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--bonds", type=int, default=1000, help="Bonds per user")
+    parser.add_argument("--issuers", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=500, help="Requests per workload")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--workloads",
+        default=",".join(WORKLOADS),
+        help=f"Comma separated, out of {', '.join(WORKLOADS)}"
+    )
+    parser.add_argument("--gleif-latency", type=float, default=0.05)
+    parser.add_argument("--gleif-jitter", type=float, default=0.0)
+    parser.add_argument("--gleif-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    names = args.workloads.split(",")
+    unknown = set(names) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"Unknown workloads: {', '.join(sorted(unknown))}")
+
+    stub = GleifStubServer(
+        latency=args.gleif_latency,
+        jitter=args.gleif_jitter,
+        error_rate=args.gleif_error_rate,
+        seed=args.seed
+    ).start()
+    os.environ["BENCH_GLEIF_PORT"] = str(stub.server_port)
+    os.environ["DJANGO_SETTINGS_MODULE"] = "benchmarks.settings"
+
+    try:
+        print(f"Generating {args.users} users x {args.bonds} bonds", file=sys.stderr)
+        accounts = setup_database(args.users, args.bonds, args.issuers, args.seed)
+        run = Run(accounts, args.issuers, args.requests, args.concurrency, args.seed)
+
+        results = {}
+        for name in names:
+            print(f"Running {name}", file=sys.stderr)
+            results[name] = run.workload(name)
+    finally:
+        stub.stop()
+
+    report = {
+        "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "gleif_stub_requests": stub.requests,
+        "workloads": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Measure ?search= and ?legal_name__prefix= as the legal entity table grows
+
+    python -m benchmarks.search --entities 10000,100000,1000000
+
+One user is given --bonds bonds spread over --issuers issuers. The legal
+entity table is then grown to each of the --entities sizes with generated
+names, and at every size the user's bonds are filtered by word prefix
+search, by legal name prefix and, for comparison, by a case insensitive
+substring match on the legal name, which has to scan every entity. The
+median and p95 latencies of --queries queries of each kind are reported as
+JSON.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+from benchmarks.run import percentile
+
+WORDS = [
+    "alpha", "atlantic", "banco", "bank", "capital", "central", "credit",
+    "deutsche", "energy", "european", "finance", "first", "general", "global",
+    "group", "holdings", "industrial", "international", "investment", "mutual",
+    "national", "nordic", "pacific", "partners", "royal", "savings", "securities",
+    "société", "trust", "union", "générale", "zürich",
+]
+SUFFIXES = ["AG", "S.A.", "plc", "Inc.", "GmbH", "N.V.", "SpA", "Ltd"]
+
+
+def legal_name(rng):
+    words = rng.sample(WORDS, rng.randrange(2, 5))
+    # A made up word keeps most names distinct, as real ones are
+    words.append("".join(rng.choice("bcdfgklmnprstvz") + rng.choice("aeiou") for _ in range(3)))
+    return " ".join(word.capitalize() for word in words) + " " + rng.choice(SUFFIXES)
+
+
+def grow(size, rng):
+    """
+    Add generated legal entities until the table holds size of them
+    """
+    from bonds.models import LegalEntity
+    from bonds.settings import GOLDEN_COPY_CHUNK_SIZE
+
+    count = LegalEntity.objects.count()
+    while count < size:
+        batch = min(GOLDEN_COPY_CHUNK_SIZE, size - count)
+        LegalEntity.objects.store({
+            f"SRCH{index:014}X1": legal_name(rng) for index in range(count, count + batch)
+        })
+        count += batch
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entities", default="10000,100000,1000000")
+    parser.add_argument("--bonds", type=int, default=1000)
+    parser.add_argument("--issuers", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=50, help="Queries of each kind per size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results to this file instead of stdout")
+    args = parser.parse_args(argv)
+    sizes = [int(size) for size in args.entities.split(",")]
+
+    os.environ["DJANGO_SETTINGS_MODULE"] = "benchmarks.settings"
+    from benchmarks.run import setup_database
+
+    [(user, key)] = setup_database(1, args.bonds, args.issuers, args.seed)
+
+    from bonds.filters import BondFilter
+    from bonds.models import Bond, LegalEntity
+
+    rng = random.Random(args.seed)
+    bonds = Bond.objects.filter(user=user).order_by("id")
+
+    # The benchmark issuers are all named "Legal Entity BENCH...", so the
+    # queries below match the user's bonds whatever the table holds
+    def query(kind):
+        number = rng.randrange(args.issuers)
+        if kind == "search":
+            return {"search": f"ent bench{number:013}"}
+        if kind == "prefix":
+            return {"legal_name__prefix": f"legal entity bench{number:013}"}
+        return {"legal_name__icontains": f"bench{number:013}"}
+
+    def run(params):
+        if "legal_name__icontains" in params:
+            # What a search would cost without the index
+            queryset = bonds.filter(legal_entity__in=LegalEntity.objects.filter(
+                legal_name__icontains=params["legal_name__icontains"]
+            ).values("lei"))
+        else:
+            queryset = BondFilter(params, queryset=bonds).qs
+        started = time.perf_counter()
+        matched = len(queryset[:100])
+        return time.perf_counter() - started, matched
+
+    results = {}
+    for size in sizes:
+        print(f"Growing the legal entity table to {size} rows", file=sys.stderr)
+        started = time.perf_counter()
+        grow(size, rng)
+        grown = time.perf_counter() - started
+
+        timings = {}
+        for kind in ["search", "prefix", "substring_scan"]:
+            durations = []
+            matched = 0
+            for _ in range(args.queries):
+                duration, count = run(query(kind))
+                durations.append(duration * 1000)
+                matched += count
+            durations.sort()
+            timings[kind] = {
+                "p50_ms": round(percentile(durations, 50), 3),
+                "p95_ms": round(percentile(durations, 95), 3),
+                "bonds_matched": matched,
+            }
+        results[size] = {"grow_s": round(grown, 2), **timings}
+
+    report = {
+        "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "entities": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Settings for benchmark runs, a throwaway SQLite database and the GLEIF stub
+"""
+import os
+import tempfile
+
+from origin.settings import *  # noqa: F401,F403
+
+DEBUG = False
+
+# Host name used by django.test.Client
+ALLOWED_HOSTS = ['testserver']
+
+_database = os.environ.get(
+    'BENCH_DATABASE', os.path.join(tempfile.gettempdir(), 'origin-bench.sqlite3')
+)
+
+DATABASES = {
+    'default': {
+        # django.db.backends.sqlite3 to compare with the stock backend
+        'ENGINE': os.environ.get('BENCH_DATABASE_ENGINE', 'bonds.backends.sqlite3'),
+        'NAME': _database,
+    }
+}
+
+# BENCH_SHARDS databases in all, the default one and shard1, shard2, ...
+BONDS_SHARDS = ['default']
+for _number in range(1, int(os.environ.get('BENCH_SHARDS', '1'))):
+    _root, _ext = os.path.splitext(_database)
+    DATABASES[f'shard{_number}'] = dict(
+        DATABASES['default'], NAME=f'{_root}-shard{_number}{_ext}'
+    )
+    BONDS_SHARDS.append(f'shard{_number}')
+
+BONDS_GLEIF_LEILOOKUP_URL = (
+    f"http://127.0.0.1:{os.environ.get('BENCH_GLEIF_PORT', '8765')}/api/v2/leirecords"
+)
@@ -0,0 +1,198 @@
+"""
+Compare write throughput of the SQLite backends under concurrent processes
+
+    python -m benchmarks.sqlite_writes --processes 8 --writes 200 --readers 2
+
+For every backend of --engines, a fresh database is filled by
+benchmarks.dataset with one user per writer process. --processes processes,
+standing in for gunicorn workers, then each create --writes bonds through
+POST /bonds/ while --readers processes page through GET /bonds/. With
+--workload commit the writers only bump their user's data version in a
+transaction of its own, leaving out the cost of the request so that the
+cost of committing stands out. With --shards the users are spread over that
+many database files by bonds.sharding. The write and read throughput,
+latency percentiles and the requests that failed with "database is locked"
+are reported as JSON.
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import time
+from collections import Counter
+
+from benchmarks.run import percentile
+
+ENGINES = ["django.db.backends.sqlite3", "bonds.backends.sqlite3"]
+
+
+def _setup_django(engine, shards):
+    # Runs in a fresh process, before anything imports the settings
+    os.environ["DJANGO_SETTINGS_MODULE"] = "benchmarks.settings"
+    os.environ["BENCH_DATABASE_ENGINE"] = engine
+    os.environ["BENCH_SHARDS"] = str(shards)
+    import django
+    django.setup()
+
+
+def _setup_database(engine, shards, users, issuers, seed):
+    _setup_django(engine, shards)
+    from benchmarks.run import setup_database
+    return [key for user, key in setup_database(users, 0, issuers, seed)]
+
+
+def _client(key):
+    from django.test import Client
+    return Client(HTTP_AUTHORIZATION=f"Token {key}")
+
+
+def _timed(request):
+    started = time.perf_counter()
+    try:
+        status = request()
+    except Exception as e:
+        # The test client raises the exceptions of the view
+        status = "locked" if "database is locked" in str(e) else type(e).__name__
+    return time.perf_counter() - started, status
+
+
+def _commit(engine, shards, key, writes):
+    _setup_django(engine, shards)
+    from rest_framework.authtoken.models import Token
+
+    from bonds import sharding
+    from bonds.models import UserDataVersion
+
+    user_id = Token.objects.get(key=key).user_id
+    shard = sharding.shard_for(user_id)
+
+    def bump():
+        with sharding.use_shard(shard), sharding.atomic():
+            UserDataVersion.objects.bump([user_id])
+        # Counted like a successful request
+        return 200
+
+    started = time.time()
+    samples = [_timed(bump) for _ in range(writes)]
+    return started, time.time(), samples
+
+
+def _write(engine, shards, number, key, writes, issuers, seed):
+    _setup_django(engine, shards)
+    from benchmarks.dataset import CURRENCIES, lei
+
+    rng = random.Random(f"{seed}-{number}")
+    client = _client(key)
+    samples = []
+    started = time.time()
+    for i in range(writes):
+        data = {
+            "isin": f"W{number:04}{i:07}",
+            "size": rng.randrange(1, 1000) * 100000,
+            "currency": rng.choice(CURRENCIES),
+            "maturity": f"{rng.randrange(2021, 2051)}-06-30",
+            "lei": lei(rng.randrange(issuers)),
+        }
+        samples.append(_timed(lambda: client.post(
+            "/bonds/", json.dumps(data), content_type="application/json"
+        ).status_code))
+    return started, time.time(), samples
+
+
+def _read(engine, shards, key, reads):
+    _setup_django(engine, shards)
+    client = _client(key)
+    started = time.time()
+    samples = [_timed(lambda: client.get("/bonds/").status_code) for _ in range(reads)]
+    return started, time.time(), samples
+
+
+def _summary(results):
+    started = min(result[0] for result in results)
+    elapsed = max(result[1] for result in results) - started
+    samples = [sample for result in results for sample in result[2]]
+    statuses = Counter(str(status) for latency, status in samples)
+    latencies = sorted(latency for latency, status in samples)
+    succeeded = sum(1 for latency, status in samples if status == 200)
+    return {
+        "requests": len(samples),
+        "succeeded": succeeded,
+        "duration_s": round(elapsed, 4),
+        "succeeded_per_s": round(succeeded / elapsed, 2),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3),
+        },
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--engines", default=",".join(ENGINES))
+    parser.add_argument("--processes", type=int, default=8, help="Writer processes")
+    parser.add_argument("--shards", type=int, default=1, help="Database files")
+    parser.add_argument("--workload", choices=["api", "commit"], default="api")
+    parser.add_argument("--writes", type=int, default=200, help="Writes per writer")
+    parser.add_argument("--readers", type=int, default=2, help="Reader processes")
+    parser.add_argument("--reads", type=int, default=200, help="Pages read per reader")
+    parser.add_argument("--issuers", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    # Every process sets up Django for its own engine
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for engine in args.engines.split(","):
+        print(f"Running {engine}", file=sys.stderr)
+        with context.Pool(1) as pool:
+            keys = pool.apply(_setup_database, (
+                engine, args.shards, args.processes, args.issuers, args.seed
+            ))
+
+        with context.Pool(args.processes + args.readers) as pool:
+            if args.workload == "api":
+                writers = [
+                    pool.apply_async(_write, (
+                        engine, args.shards, number, key, args.writes, args.issuers, args.seed
+                    ))
+                    for number, key in enumerate(keys)
+                ]
+            else:
+                writers = [
+                    pool.apply_async(_commit, (engine, args.shards, key, args.writes))
+                    for key in keys
+                ]
+            readers = [
+                pool.apply_async(_read, (
+                    engine, args.shards, keys[number % len(keys)], args.reads
+                ))
+                for number in range(args.readers)
+            ]
+            results[engine] = {"writes": _summary([writer.get() for writer in writers])}
+            if readers:
+                results[engine]["reads"] = _summary([reader.get() for reader in readers])
+
+    report = {
+        "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "engines": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
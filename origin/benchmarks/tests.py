@@ -0,0 +1,38 @@
+from django.test import SimpleTestCase
+
+from benchmarks.gleif_stub import GleifStubServer
+from benchmarks.run import percentile
+from bonds.gleif import GleifClient, GleifUnavailable
+
+
+class GleifStubTestCase(SimpleTestCase):
+
+    def start(self, **kwargs):
+        server = GleifStubServer(**kwargs).start()
+        self.addCleanup(server.stop)
+        return GleifClient(url=server.url, max_retries=0)
+
+    def test_known_and_unknown_leis(self):
+        client = self.start()
+        self.assertEqual(
+            client.get_legal_names(["R0MUWSFPU8MPRO8K5P83", "R0MUWSFPU8MPRO8K5P00"]),
+            {
+                "R0MUWSFPU8MPRO8K5P83": "Legal Entity R0MUWSFPU8MPRO8K5P83",
+                "R0MUWSFPU8MPRO8K5P00": None,
+            }
+        )
+
+    def test_error_rate(self):
+        client = self.start(error_rate=1)
+        with self.assertRaises(GleifUnavailable):
+            client.get_legal_names(["R0MUWSFPU8MPRO8K5P83"])
+
+
+class PercentileTestCase(SimpleTestCase):
+
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3], 95), 3)
+        self.assertIsNone(percentile([], 50))
@@ -0,0 +1,126 @@
+from collections import defaultdict
+
+from django.db.models import Count, F, Sum
+from django.db.models.functions import ExtractYear
+
+from bonds import sharding
+from bonds.models import Bond, PortfolioAggregate
+from bonds.utils import chunked
+
+KEY = ["user_id", "currency", "lei", "maturity_year"]
+
+
+def record_created(bonds):
+    """
+    Add newly created bonds to their users' aggregates
+
+    Must be called in the transaction that creates the bonds.
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    for bond in bonds:
+        maturity_year = _year(bond.maturity)
+        delta = deltas[(bond.user_id, bond.currency, bond.lei, maturity_year)]
+        delta[0] += bond.size
+        delta[1] += 1
+    _apply(deltas)
+
+
+def record_deleted(queryset):
+    """
+    Remove the bonds of queryset from their users' aggregates
+
+    Must be called in the transaction that deletes the bonds, before they are
+    deleted. The deltas are computed with a single GROUP BY over queryset.
+    """
+    deltas = {
+        tuple(row[field] for field in KEY): [-row["size"], -row["count"]]
+        for row in group(queryset)
+    }
+    _apply(deltas)
+    PortfolioAggregate.objects.filter(
+        user_id__in={key[0] for key in deltas}, count__lte=0
+    ).delete()
+
+
+def group(queryset):
+    """
+    Aggregate rows computed from the bonds themselves
+    """
+    return (
+        queryset.order_by()
+        .annotate(maturity_year=ExtractYear("maturity"))
+        .values("user_id", "currency", "lei", "maturity_year")
+        .annotate(size=Sum("size"), count=Count("id"))
+    )
+
+
+def rebuild(users=None):
+    """
+    Recompute the aggregates of users, or of everyone, from their bonds on
+    the current shard
+    """
+    bonds = Bond.objects.all()
+    aggregates = PortfolioAggregate.objects.all()
+    if users is not None:
+        bonds = bonds.filter(user__in=users)
+        aggregates = aggregates.filter(user__in=users)
+
+    with sharding.atomic():
+        aggregates.delete()
+        for rows in chunked(group(bonds).iterator(), 500):
+            PortfolioAggregate.objects.bulk_create(
+                [PortfolioAggregate(**row) for row in rows]
+            )
+
+
+def verify(users=None):
+    """
+    Compare the aggregates of users, or of everyone, with their bonds on the
+    current shard
+
+    Returns a list of (key, stored, expected) tuples for every aggregate that
+    does not match, where stored and expected are (size, count) tuples.
+    """
+    bonds = Bond.objects.all()
+    aggregates = PortfolioAggregate.objects.all()
+    if users is not None:
+        bonds = bonds.filter(user__in=users)
+        aggregates = aggregates.filter(user__in=users)
+
+    expected = {
+        tuple(row[field] for field in KEY): (row["size"], row["count"])
+        for row in group(bonds).iterator()
+    }
+    stored = {
+        tuple(row[:4]): tuple(row[4:])
+        for row in aggregates.values_list(*KEY, "size", "count").iterator()
+    }
+    return [
+        (key, stored.get(key), expected.get(key))
+        for key in sorted(set(expected) | set(stored))
+        if stored.get(key) != expected.get(key)
+    ]
+
+
+def _apply(deltas):
+    for (user_id, currency, lei, maturity_year), (size, count) in deltas.items():
+        aggregate = PortfolioAggregate.objects.filter(
+            user_id=user_id, currency=currency, lei=lei, maturity_year=maturity_year
+        )
+        changes = {"size": F("size") + size, "count": F("count") + count}
+        if not aggregate.update(**changes):
+            # Create the row then update it, so that a concurrent creation of
+            # the same group cannot make either write fail
+            PortfolioAggregate.objects.bulk_create([
+                PortfolioAggregate(
+                    user_id=user_id, currency=currency, lei=lei, maturity_year=maturity_year
+                )
+            ], ignore_conflicts=True)
+            aggregate.update(**changes)
+
+
+def _year(maturity):
+    # Bonds built from request data may still hold the maturity as a string
+    if isinstance(maturity, str):
+        return int(maturity[:4])
+    return maturity.year
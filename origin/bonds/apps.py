@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class BondsConfig(AppConfig):
     name = 'bonds'
+
+    def ready(self):
+        # Connect the token cache invalidation signals
+        from bonds import authentication  # noqa: F401
@@ -0,0 +1,123 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from bonds.cache import MISSING, LRUCache
+from bonds.settings import TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL, TOKEN_CACHE_BACKEND
+
+
+class TokenCache:
+    """
+    Cache of token key -> Token, with its user already loaded
+
+    When a Django cache alias is given it is shared between workers and
+    consulted whenever the in-process LRU misses. Only the token's creation
+    date and the user's fields other than the password hash are written to
+    it, the password is loaded again if it is ever read.
+    """
+    key_prefix = "bonds:token:"
+
+    def __init__(self, max_size, ttl, backend=None):
+        self.ttl = ttl
+        self.backend = backend
+        self.local = LRUCache(max_size, ttl)
+
+    @property
+    def shared(self):
+        if self.backend is None:
+            return None
+        return caches[self.backend]
+
+    def get(self, key):
+        token = self.local.get(key)
+        if token is not MISSING or self.shared is None:
+            return token
+
+        fields = self.shared.get(self.key_prefix + key, MISSING)
+        if fields is MISSING:
+            return MISSING
+        token = _load_token(key, fields)
+        self.local.set(key, token)
+        return token
+
+    def set(self, key, token):
+        self.local.set(key, token)
+        if self.shared is not None:
+            self.shared.set(self.key_prefix + key, _dump_token(token), self.ttl)
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(self.key_prefix + key)
+
+    def clear(self):
+        self.local.clear()
+
+
+def _dump_token(token):
+    user = token.user
+    return {
+        "created": token.created,
+        "user": {
+            field.attname: getattr(user, field.attname)
+            for field in user._meta.concrete_fields
+            if field.attname != "password"
+        },
+    }
+
+
+def _load_token(key, fields):
+    # Built like a queryset with the password deferred
+    user_fields = fields["user"]
+    user = get_user_model().from_db(
+        DEFAULT_DB_ALIAS, list(user_fields), list(user_fields.values())
+    )
+    token = Token.from_db(
+        DEFAULT_DB_ALIAS, ["key", "user_id", "created"], [key, user.pk, fields["created"]]
+    )
+    token.user = user
+    return token
+
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL, backend=TOKEN_CACHE_BACKEND)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that only queries the token table on a cache miss
+
+    Only tokens of active users are cached. The cached Token and user
+    instances are shared between requests and must not be modified.
+    """
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is MISSING:
+            # As TokenAuthentication, without loading the password hash
+            try:
+                token = Token.objects.select_related("user").defer("user__password").get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_("Invalid token."))
+            if not token.user.is_active:
+                raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+            token_cache.set(key, token)
+        return (token.user, token)
+
+
+@receiver(post_delete, sender=Token)
+def _forget_token(sender, instance, **kwargs):
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def _forget_user_tokens(sender, instance, created, **kwargs):
+    # Covers deactivation, along with any other change to the cached user
+    if not created:
+        for key in Token.objects.filter(user=instance).values_list("key", flat=True):
+            token_cache.delete(key)
@@ -0,0 +1,77 @@
+"""
+SQLite backend tuned for several worker processes writing to one database
+
+Every connection is switched to WAL, so readers no longer wait for writers,
+and given the pragmas of BONDS_SQLITE_PRAGMAS. Transactions opened with
+bonds.utils.write_atomic are started with BEGIN IMMEDIATE, which takes the
+write lock up front: a deferred transaction that reads and then writes can
+fail with "database is locked" as soon as it tries to upgrade its lock,
+without waiting for busy_timeout. Every other transaction starts deferred,
+so that read-only ones never queue for the write lock. Statements run
+outside a transaction, including the BEGIN itself, are retried with a
+backoff when the lock is still held after busy_timeout.
+
+Use it with 'ENGINE': 'bonds.backends.sqlite3'.
+"""
+import random
+import time
+
+from django.db.backends.sqlite3 import base
+from django.db.backends.sqlite3.base import Database
+
+from bonds import metrics
+from bonds.settings import (
+    SQLITE_PRAGMAS,
+    SQLITE_TRANSACTION_MODE,
+    SQLITE_LOCK_RETRIES,
+    SQLITE_LOCK_RETRY_DELAY,
+)
+
+
+def is_locked(error):
+    return "database is locked" in str(error)
+
+
+class SQLiteCursorWrapper(base.SQLiteCursorWrapper):
+
+    def execute(self, query, params=None):
+        return self._retry(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        return self._retry(super().executemany, query, param_list)
+
+    def _retry(self, execute, *args):
+        for attempt in range(SQLITE_LOCK_RETRIES + 1):
+            try:
+                return execute(*args)
+            except Database.OperationalError as e:
+                # Inside a transaction the earlier statements were lost with
+                # the lock, so only the caller can start over
+                if (
+                    not is_locked(e)
+                    or self.connection.in_transaction
+                    or attempt == SQLITE_LOCK_RETRIES
+                ):
+                    raise
+                metrics.DB_LOCK_RETRIES.inc()
+                time.sleep(SQLITE_LOCK_RETRY_DELAY * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # Set by bonds.utils.write_atomic for the transaction it opens
+    begin_immediate = False
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for pragma, value in SQLITE_PRAGMAS.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        return conn
+
+    def create_cursor(self, name=None):
+        return self.connection.cursor(factory=SQLiteCursorWrapper)
+
+    def _start_transaction_under_autocommit(self):
+        if self.begin_immediate:
+            self.cursor().execute(f"BEGIN {SQLITE_TRANSACTION_MODE}")
+        else:
+            super()._start_transaction_under_autocommit()
@@ -0,0 +1,155 @@
+from bonds import aggregates
+from bonds import enrichment
+from bonds import gleif
+from bonds import sharding
+from bonds import timing
+from bonds import validation
+from bonds.cache import MISSING
+from bonds.models import Bond, EnrichmentJob, UserDataVersion
+from bonds.settings import ASYNC_ENRICHMENT, BULK_CHUNK_SIZE
+from bonds.utils import chunked
+
+CREATED = "created"
+ERROR = "error"
+
+DUPLICATE_ISIN = "The fields user, isin must make a unique set."
+
+
+def ingest_bonds(user, rows):
+    """
+    Validate, enrich and store many bonds for a user
+
+    Rows are validated in a single pass, the LEIs of the valid rows are
+    resolved in batches and every row that survives is written with
+    bulk_create inside one transaction. With ASYNC_ENRICHMENT, rows whose
+    LEI is not already stored are saved as pending for the enrichment
+    workers instead. Returns one result per row, in the order they were
+    given. Raises gleif.GleifUnavailable, without writing anything, if the
+    legal names could not be resolved.
+    """
+    results, bonds = prepare_bonds(user, rows)
+    with sharding.atomic():
+        bonds = recheck_existing(user, rows, results, bonds)
+        save_bonds(user, bonds)
+    return results
+
+
+def prepare_bonds(user, rows):
+    """
+    Validate and enrich rows without writing the bonds
+
+    Returns the result of every row and the unsaved Bond instances of the
+    rows that can be created.
+    """
+    results = [None] * len(rows)
+
+    with timing.phase("validation"):
+        validated, errors = validation.validate_rows(rows)
+    for index, detail in errors.items():
+        results[index] = _error(index, rows[index], detail)
+
+    # (user, isin) uniqueness is checked against the whole batch at once
+    # rather than with a query per row
+    existing = _existing_isins(user, [data["isin"] for data in validated.values()])
+    seen = set()
+    for index, data in list(validated.items()):
+        if data["isin"] in existing or data["isin"] in seen:
+            results[index] = _error(
+                index, rows[index], {"non_field_errors": [DUPLICATE_ISIN]}
+            )
+            del validated[index]
+        seen.add(data["isin"])
+
+    leis = (data["lei"] for data in validated.values())
+    if ASYNC_ENRICHMENT:
+        legal_names, _ = gleif.stored_legal_names(leis)
+    else:
+        legal_names = gleif.resolve_legal_names(leis)
+
+    bonds = []
+    for index, data in validated.items():
+        legal_name = legal_names.get(data["lei"], MISSING)
+        if legal_name is MISSING:
+            bonds.append(Bond(user=user, enrichment_state=Bond.PENDING, **data))
+        elif legal_name is None:
+            results[index] = _error(index, rows[index], {
+                "lei": [f"A legal entity with LEI {data['lei']} does not exist"]
+            })
+            continue
+        else:
+            bonds.append(Bond(user=user, legal_entity_id=data["lei"], **data))
+        results[index] = {"index": index, "isin": data["isin"], "status": CREATED}
+
+    return results, bonds
+
+
+def recheck_existing(user, rows, results, bonds):
+    """
+    Drop the bonds from prepare_bonds whose ISIN was created for the user
+    since, by a concurrent request, and report their rows as duplicates
+
+    Must be called in the transaction that saves the bonds, once it holds
+    the write lock. Returns the bonds that can still be created.
+    """
+    existing = _existing_isins(user, [bond.isin for bond in bonds])
+    if not existing:
+        return bonds
+    for index, result in enumerate(results):
+        if result["status"] == CREATED and result["isin"] in existing:
+            results[index] = _error(
+                index, rows[index], {"non_field_errors": [DUPLICATE_ISIN]}
+            )
+    return [bond for bond in bonds if bond.isin not in existing]
+
+
+def save_bonds(user, bonds):
+    """
+    Write bonds from prepare_bonds, must be called in a transaction
+    """
+    Bond.objects.bulk_create(bonds, batch_size=BULK_CHUNK_SIZE)
+    pending = [bond.isin for bond in bonds if bond.enrichment_state == Bond.PENDING]
+    for batch in chunked(pending, BULK_CHUNK_SIZE):
+        # bulk_create does not set the ids of the bonds on SQLite
+        enrichment.enqueue_many(
+            Bond.objects.filter(user=user, isin__in=batch).values_list("id", flat=True)
+        )
+    aggregates.record_created(bonds)
+    if bonds:
+        UserDataVersion.objects.bump([user.pk])
+
+
+def delete_bonds(user, bonds):
+    """
+    Delete a queryset of a user's bonds, returns the number deleted
+
+    Must be called in a transaction. The bonds are deleted with a single
+    DELETE, along with their enrichment jobs and aggregates, without being
+    loaded.
+    """
+    # Writing first means no other writer can change the bonds in between
+    EnrichmentJob.objects.filter(bond__in=bonds).delete()
+    aggregates.record_deleted(bonds)
+    # QuerySet.delete() would load every bond to cascade to its job. The
+    # jobs are gone, nothing else references a bond and no signal handler
+    # listens for their deletion, so the single DELETE that Django's
+    # collector itself runs for fast deletes leaves nothing behind. Revisit
+    # this if a relation or a signal is added to Bond.
+    deleted = bonds._raw_delete(bonds.db)
+    if deleted:
+        UserDataVersion.objects.bump([user.pk])
+    return deleted
+
+
+def _existing_isins(user, isins):
+    existing = set()
+    # Keep the IN clause below SQLite's bound parameter limit
+    for batch in chunked(isins, BULK_CHUNK_SIZE):
+        existing.update(
+            Bond.objects.filter(user=user, isin__in=batch).values_list("isin", flat=True)
+        )
+    return existing
+
+
+def _error(index, row, errors):
+    isin = row.get("isin") if isinstance(row, dict) else None
+    return {"index": index, "isin": isin, "status": ERROR, "errors": errors}
@@ -0,0 +1,164 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+
+from bonds import metrics
+
+from bonds.settings import (
+    LEI_CACHE_SIZE,
+    LEI_CACHE_TTL,
+    LEI_CACHE_NEGATIVE_TTL,
+    LEI_CACHE_BACKEND,
+)
+
+# Returned by the caches below when a key is not present (or has expired),
+# so that None can be stored as a real value.
+MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread safe in-process LRU cache with a time to live per entry
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return MISSING
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+
+class LEICache:
+    """
+    Cache of LEI -> legal name lookups
+
+    A legal name of None records an LEI that GLEIF does not know about, these
+    negative entries are kept for a shorter time than resolved names. When a
+    Django cache alias is given it is shared between workers and consulted
+    whenever the in-process LRU misses.
+    """
+    key_prefix = "bonds:lei:"
+    # Django cache backends cannot reliably tell a stored None from a miss
+    unknown_marker = ""
+
+    def __init__(self, max_size, ttl, negative_ttl, backend=None):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.backend = backend
+        self.local = LRUCache(max_size, ttl)
+        self.shared_hits = 0
+        self.shared_misses = 0
+
+    @property
+    def shared(self):
+        if self.backend is None:
+            return None
+        return caches[self.backend]
+
+    def get(self, lei):
+        legal_name = self._get(lei)
+        metrics.LEI_CACHE_LOOKUPS.labels("miss" if legal_name is MISSING else "hit").inc()
+        return legal_name
+
+    def _get(self, lei):
+        legal_name = self.local.get(lei)
+        if legal_name is not MISSING or self.shared is None:
+            return legal_name
+
+        legal_name = self.shared.get(self.key_prefix + lei, MISSING)
+        if legal_name is MISSING:
+            self.shared_misses += 1
+            return MISSING
+        self.shared_hits += 1
+        if legal_name == self.unknown_marker:
+            legal_name = None
+        self.local.set(lei, legal_name, self._ttl_for(legal_name))
+        return legal_name
+
+    def set(self, lei, legal_name):
+        ttl = self._ttl_for(legal_name)
+        self.local.set(lei, legal_name, ttl)
+        if self.shared is not None:
+            value = self.unknown_marker if legal_name is None else legal_name
+            self.shared.set(self.key_prefix + lei, value, ttl)
+
+    def delete(self, lei):
+        self.local.delete(lei)
+        if self.shared is not None:
+            self.shared.delete(self.key_prefix + lei)
+
+    def clear(self):
+        """
+        Clear the in-process entries and counters, the shared backend is left
+        alone as other workers may be using it
+        """
+        self.local.clear()
+        self.shared_hits = 0
+        self.shared_misses = 0
+
+    def stats(self):
+        if self.shared is None:
+            misses = self.local.misses
+        else:
+            misses = self.shared_misses
+        return {
+            "hits": self.local.hits + self.shared_hits,
+            "misses": misses,
+            "local_hits": self.local.hits,
+            "shared_hits": self.shared_hits,
+            "evictions": self.local.evictions,
+            "size": len(self.local),
+        }
+
+    def _ttl_for(self, legal_name):
+        return self.negative_ttl if legal_name is None else self.ttl
+
+
+lei_cache = LEICache(
+    LEI_CACHE_SIZE,
+    LEI_CACHE_TTL,
+    LEI_CACHE_NEGATIVE_TTL,
+    backend=LEI_CACHE_BACKEND,
+)
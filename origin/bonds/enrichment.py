@@ -0,0 +1,269 @@
+import asyncio
+import datetime
+import logging
+import threading
+import uuid
+from collections import defaultdict
+
+from django.db import close_old_connections, connections
+from django.db.models import Q
+from django.utils import timezone
+
+from bonds import gleif
+from bonds import sharding
+from bonds.models import Bond, EnrichmentJob, UserDataVersion
+from bonds.settings import (
+    ENRICHMENT_WORKERS,
+    ENRICHMENT_CONCURRENCY,
+    ENRICHMENT_BATCH_SIZE,
+    ENRICHMENT_POLL_INTERVAL,
+    ENRICHMENT_LEASE,
+    ENRICHMENT_MAX_ATTEMPTS,
+    ENRICHMENT_RETRY_DELAY,
+    BULK_CHUNK_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(bond):
+    """
+    Queue a legal entity lookup for a bond saved in the pending state
+    """
+    return EnrichmentJob.objects.create(bond=bond)
+
+
+def enqueue_many(bond_ids):
+    """
+    Queue legal entity lookups for the ids of bonds saved in the pending state
+    """
+    EnrichmentJob.objects.bulk_create(
+        [EnrichmentJob(bond_id=bond_id) for bond_id in bond_ids], batch_size=BULK_CHUNK_SIZE
+    )
+
+
+def claim_jobs(limit):
+    """
+    Lease up to limit jobs of the current shard that are due, returning them
+    with their bonds
+    """
+    now = timezone.now()
+    due = (
+        Q(available_at__lte=now)
+        & (Q(locked_until__isnull=True) | Q(locked_until__lt=now))
+    )
+    ids = list(
+        EnrichmentJob.objects.filter(due)
+        .order_by("available_at")
+        .values_list("id", flat=True)[:limit]
+    )
+    if not ids:
+        return []
+
+    # Re-checking the condition in the UPDATE means jobs claimed by another
+    # worker since the SELECT are skipped
+    token = uuid.uuid4().hex
+    EnrichmentJob.objects.filter(due, id__in=ids).update(
+        locked_by=token,
+        locked_until=now + datetime.timedelta(seconds=ENRICHMENT_LEASE)
+    )
+    return list(EnrichmentJob.objects.filter(locked_by=token).select_related("bond"))
+
+
+def process_jobs(limit=ENRICHMENT_BATCH_SIZE):
+    """
+    Claim and resolve a batch of jobs of the current shard, returns the
+    number of jobs claimed
+    """
+    jobs = claim_jobs(limit)
+    if not jobs:
+        return 0
+
+    try:
+        legal_names = gleif.resolve_legal_names(job.bond.lei for job in jobs)
+    except gleif.GleifUnavailable as e:
+        for job in jobs:
+            _retry(job, str(e))
+        return len(jobs)
+
+    _complete(jobs, legal_names)
+    return len(jobs)
+
+
+async def process_jobs_async(shard, async_client, limit=ENRICHMENT_BATCH_SIZE):
+    """
+    process_jobs for an event loop, waiting on GLEIF through async_client
+    rather than holding the thread
+
+    Coroutines of the same thread select their own shards while this one
+    waits, so the shard is only selected around the queries.
+    """
+    with sharding.use_shard(shard):
+        jobs = claim_jobs(limit)
+    if not jobs:
+        return 0
+
+    try:
+        legal_names = await gleif.resolve_legal_names_async(
+            (job.bond.lei for job in jobs), async_client
+        )
+    except gleif.GleifUnavailable as e:
+        with sharding.use_shard(shard):
+            for job in jobs:
+                _retry(job, str(e))
+        return len(jobs)
+
+    with sharding.use_shard(shard):
+        _complete(jobs, legal_names)
+    return len(jobs)
+
+
+def _complete(jobs, legal_names):
+    # The legal entity rows were written while resolving, so what is left is
+    # one update of the bonds and one delete of the jobs for each issuer
+    by_lei = defaultdict(list)
+    for job in jobs:
+        by_lei[job.bond.lei].append(job)
+    for lei, lei_jobs in by_lei.items():
+        if legal_names[lei] is None:
+            changes = {"enrichment_state": Bond.FAILED}
+        else:
+            changes = {"legal_entity_id": lei, "enrichment_state": Bond.RESOLVED}
+        with sharding.atomic():
+            Bond.objects.filter(pk__in=[job.bond_id for job in lei_jobs]).update(**changes)
+            EnrichmentJob.objects.filter(pk__in=[job.pk for job in lei_jobs]).delete()
+            UserDataVersion.objects.bump(job.bond.user_id for job in lei_jobs)
+
+
+def _retry(job, error):
+    # Only while the job is still leased by this worker, another one may have
+    # claimed it since the lease ran out
+    leased = EnrichmentJob.objects.filter(pk=job.pk, locked_by=job.locked_by)
+    job.attempts += 1
+    job.last_error = error
+    if job.attempts >= ENRICHMENT_MAX_ATTEMPTS:
+        logger.warning("Giving up on enrichment of bond %s: %s", job.bond_id, error)
+        with sharding.atomic():
+            deleted, _ = leased.delete()
+            if deleted:
+                Bond.objects.filter(pk=job.bond_id).update(enrichment_state=Bond.FAILED)
+                UserDataVersion.objects.bump([job.bond.user_id])
+        return
+
+    delay = ENRICHMENT_RETRY_DELAY * 2 ** (job.attempts - 1)
+    leased.update(
+        attempts=job.attempts,
+        last_error=error,
+        available_at=timezone.now() + datetime.timedelta(seconds=delay),
+        locked_by="",
+        locked_until=None
+    )
+
+
+class EnrichmentWorkerPool:
+    """
+    Pool of threads that drain the enrichment job queue
+
+    Each worker claims a batch of due jobs from every shard in turn, resolves
+    their LEIs together and sleeps for poll_interval whenever the queues are
+    empty.
+    """
+
+    def __init__(
+        self,
+        workers=ENRICHMENT_WORKERS,
+        batch_size=ENRICHMENT_BATCH_SIZE,
+        poll_interval=ENRICHMENT_POLL_INTERVAL
+    ):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._stopping = threading.Event()
+        self._threads = []
+
+    def start(self):
+        self._stopping.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f"enrichment-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        try:
+            while not self._stopping.is_set():
+                close_old_connections()
+                processed = 0
+                for shard in sharding.SHARDS:
+                    try:
+                        with sharding.use_shard(shard):
+                            processed += process_jobs(self.batch_size)
+                    except Exception:
+                        logger.exception("Enrichment worker failed to process jobs")
+                if not processed:
+                    self._stopping.wait(self.poll_interval)
+        finally:
+            connections.close_all()
+
+
+class AsyncEnrichmentWorker:
+    """
+    Drains the enrichment job queue from a single event loop
+
+    concurrency coroutines each claim a batch of due jobs from every shard in
+    turn and share one AsyncGleifClient, so that a single thread can have
+    that many GLEIF lookups in flight. Queries still run synchronously on
+    the thread's connection, none of them spans an await.
+    """
+
+    def __init__(
+        self,
+        concurrency=ENRICHMENT_CONCURRENCY,
+        batch_size=ENRICHMENT_BATCH_SIZE,
+        poll_interval=ENRICHMENT_POLL_INTERVAL
+    ):
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+
+    def run(self, once=False):
+        """
+        Process jobs until interrupted or, with once, until none are due.
+        Returns the number of jobs processed
+        """
+        return asyncio.run(self._run(once))
+
+    async def _run(self, once):
+        async_client = gleif.AsyncGleifClient()
+        try:
+            processed = await asyncio.gather(*(
+                self._work(async_client, once) for _ in range(self.concurrency)
+            ))
+        finally:
+            await async_client.aclose()
+        return sum(processed)
+
+    async def _work(self, async_client, once):
+        processed = 0
+        while True:
+            claimed = 0
+            for shard in sharding.SHARDS:
+                try:
+                    claimed += await process_jobs_async(shard, async_client, self.batch_size)
+                except Exception:
+                    logger.exception("Enrichment worker failed to process jobs")
+            processed += claimed
+            if not claimed:
+                if once:
+                    return processed
+                # Every coroutine shares the thread's connection, so it is
+                # only recycled while the queues are empty
+                close_old_connections()
+                await asyncio.sleep(self.poll_interval)
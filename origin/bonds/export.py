@@ -0,0 +1,74 @@
+import csv
+
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+
+from bonds.encoding import DATE, INTEGER, STRING, make_row_encoder, escape_separators
+from bonds.settings import EXPORT_CHUNK_SIZE
+from bonds.utils import chunked
+
+# Columns of a bond as returned by GET /bonds/
+FIELDS = ["isin", "size", "currency", "maturity", "lei", "legal_name", "enrichment_state"]
+COLUMNS = [
+    "isin",
+    "size",
+    "currency",
+    "maturity",
+    "lei",
+    Coalesce("legal_entity__legal_name", Value("")),
+    "enrichment_state",
+]
+
+# Encodes a row of COLUMNS as BondSerializer would the bond
+encode_bond = make_row_encoder(
+    list(zip(FIELDS, [STRING, INTEGER, STRING, DATE, STRING, STRING, STRING]))
+)
+
+NDJSON = "ndjson"
+CSV = "csv"
+CONTENT_TYPES = {
+    NDJSON: "application/x-ndjson; charset=utf-8",
+    CSV: "text/csv; charset=utf-8",
+}
+
+
+class _Echo:
+    """
+    File-like object that hands back what is written to it, so csv.writer
+    can format rows without buffering them
+    """
+    def write(self, value):
+        return value
+
+
+def _rows(queryset):
+    return queryset.order_by("id").values_list(*COLUMNS).iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    )
+
+
+def iter_ndjson(queryset):
+    for chunk in chunked(_rows(queryset), EXPORT_CHUNK_SIZE):
+        yield escape_separators("".join(encode_bond(row) + "\n" for row in chunk))
+
+
+def iter_csv(queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(FIELDS)
+    for chunk in chunked(_rows(queryset), EXPORT_CHUNK_SIZE):
+        yield "".join(writer.writerow(row) for row in chunk)
+
+
+def streaming_response(queryset, format, filename=None):
+    """
+    Stream the bonds of queryset as NDJSON or CSV
+
+    Rows are read with .values_list().iterator(), so only one chunk of rows
+    is held in memory whatever the size of the book.
+    """
+    rows = iter_ndjson(queryset) if format == NDJSON else iter_csv(queryset)
+    response = StreamingHttpResponse(rows, content_type=CONTENT_TYPES[format])
+    if filename:
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
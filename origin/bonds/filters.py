@@ -0,0 +1,44 @@
+import django_filters
+
+from bonds import search
+from bonds.models import Bond, LegalEntity, LegalNameTerm
+
+
+class BondFilter(django_filters.FilterSet):
+    legal_name = django_filters.CharFilter(method="filter_legal_name")
+    legal_name__prefix = django_filters.CharFilter(
+        field_name="legal_name", method="filter_legal_name_prefix"
+    )
+    search = django_filters.CharFilter(field_name="legal_name", method="filter_search")
+
+    class Meta:
+        model = Bond
+        fields = {
+            "isin": ["exact"],
+            "size": ["exact", "lt", "lte", "gt", "gte"],
+            "lei": ["exact"],
+            "maturity": ["exact", "lt", "lte", "gt", "gte"],
+            "currency": ["exact"],
+            "enrichment_state": ["exact"],
+        }
+
+    def filter_legal_name(self, queryset, name, value):
+        # Find the issuers by name first, then the user's bonds through the
+        # (user, legal_entity) index, rather than joining every bond
+        return queryset.filter(
+            legal_entity__in=LegalEntity.objects.filter(legal_name=value).values("lei")
+        )
+
+    def filter_legal_name_prefix(self, queryset, name, value):
+        # Case and accent insensitive, as a range over the search_name index
+        return queryset.filter(
+            legal_entity__in=LegalEntity.objects.filter(
+                **search.prefix_range("search_name", search.normalize(value))
+            ).values("lei")
+        )
+
+    def filter_search(self, queryset, name, value):
+        # Every word of the query must start a word of the legal name
+        if not search.terms(value):
+            return queryset
+        return queryset.filter(legal_entity__in=LegalNameTerm.objects.matching(value))
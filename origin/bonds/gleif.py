@@ -0,0 +1,313 @@
+import asyncio
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from rest_framework import status
+
+from bonds import metrics
+from bonds import timing
+from bonds.cache import MISSING, lei_cache
+from bonds.models import LegalEntity
+from bonds.settings import (
+    GLEIF_LEILOOKUP_URL,
+    GLEIF_BATCH_SIZE,
+    GLEIF_POOL_MAXSIZE,
+    GLEIF_ASYNC_POOL_MAXSIZE,
+    GLEIF_CONNECT_TIMEOUT,
+    GLEIF_READ_TIMEOUT,
+    GLEIF_MAX_RETRIES,
+    GLEIF_BACKOFF_FACTOR,
+)
+from bonds.utils import chunked
+
+
+class GleifError(Exception):
+    """
+    Base class for errors looking up LEIs
+    """
+
+
+class GleifBadRequest(GleifError):
+    """
+    GLEIF rejected the LEIs it was given
+    """
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+class GleifUnavailable(GleifError):
+    """
+    GLEIF could not be queried or gave an unexpected response
+    """
+
+
+def _records(response):
+    """
+    Records of a GLEIF response, raising for any status other than 200
+    """
+    if response.status_code == status.HTTP_400_BAD_REQUEST:
+        metrics.GLEIF_ERRORS.labels("bad_request").inc()
+        raise GleifBadRequest(response.json()["message"])
+    elif response.status_code != status.HTTP_200_OK:
+        metrics.GLEIF_ERRORS.labels("status").inc()
+        raise GleifUnavailable(
+            f"GLEIF responded with status {response.status_code}"
+        )
+    return response.json()
+
+
+def _legal_names(leis, records):
+    if len(leis) == 1:
+        # Single LEI responses are matched positionally
+        found = {leis[0]: records[0]["Entity"]["LegalName"]["$"]} if records else {}
+    else:
+        found = {
+            record["LEI"]["$"]: record["Entity"]["LegalName"]["$"]
+            for record in records
+        }
+    return {lei: found.get(lei) for lei in leis}
+
+
+class GleifClient:
+    """
+    Client for the GLEIF leirecords API
+
+    Requests go through a single Session so that connections are kept alive
+    and reused between lookups. Connection errors, read errors and 5xx
+    responses are retried with exponential backoff before giving up.
+    """
+    retry_statuses = (500, 502, 503, 504)
+
+    def __init__(
+        self,
+        url=GLEIF_LEILOOKUP_URL,
+        pool_maxsize=GLEIF_POOL_MAXSIZE,
+        connect_timeout=GLEIF_CONNECT_TIMEOUT,
+        read_timeout=GLEIF_READ_TIMEOUT,
+        max_retries=GLEIF_MAX_RETRIES,
+        backoff_factor=GLEIF_BACKOFF_FACTOR
+    ):
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=self.retry_statuses,
+            # Hand the last response back instead of raising so that it is
+            # reported like any other unexpected status
+            raise_on_status=False
+        )
+        # Every request goes to the same host, so one pool is enough
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get_records(self, leis):
+        """
+        Fetch the LEI records of a list of LEIs in a single query
+        """
+        try:
+            with timing.phase("gleif"), metrics.GLEIF_DURATION.time():
+                response = self.session.get(
+                    f"{self.url}?lei={','.join(leis)}", timeout=self.timeout
+                )
+        except requests.RequestException as e:
+            metrics.GLEIF_ERRORS.labels("connection").inc()
+            raise GleifUnavailable(str(e)) from e
+        return _records(response)
+
+    def get_legal_names(self, leis):
+        """
+        Map each of leis to its legal name, or to None if GLEIF does not know
+        about it
+        """
+        return _legal_names(leis, self.get_records(leis))
+
+
+class AsyncGleifClient:
+    """
+    asyncio client for the GLEIF leirecords API
+
+    Lookups made concurrently from an event loop share the connection pool
+    of one httpx.AsyncClient, so that waiting on GLEIF does not take up a
+    thread per lookup. Failures are retried like GleifClient does. The
+    client can only be used from the event loop it was first used in, and
+    must be closed with aclose.
+    """
+    retry_statuses = GleifClient.retry_statuses
+
+    def __init__(
+        self,
+        url=GLEIF_LEILOOKUP_URL,
+        pool_maxsize=GLEIF_ASYNC_POOL_MAXSIZE,
+        connect_timeout=GLEIF_CONNECT_TIMEOUT,
+        read_timeout=GLEIF_READ_TIMEOUT,
+        max_retries=GLEIF_MAX_RETRIES,
+        backoff_factor=GLEIF_BACKOFF_FACTOR
+    ):
+        self.url = url
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(connect_timeout, read=read_timeout),
+            limits=httpx.Limits(
+                max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize
+            )
+        )
+        # httpx 0.16 can leave a request that waits for a free connection
+        # hanging until the pool timeout, so requests queue here instead
+        self.slots = asyncio.Semaphore(pool_maxsize)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def get_records(self, leis):
+        """
+        Fetch the LEI records of a list of LEIs in a single query
+        """
+        url = f"{self.url}?lei={','.join(leis)}"
+        attempt = 0
+        while True:
+            try:
+                async with self.slots:
+                    with metrics.GLEIF_DURATION.time():
+                        response = await self.client.get(url)
+            except httpx.RequestError as e:
+                if attempt == self.max_retries:
+                    metrics.GLEIF_ERRORS.labels("connection").inc()
+                    raise GleifUnavailable(str(e)) from e
+            else:
+                if response.status_code not in self.retry_statuses or attempt == self.max_retries:
+                    return _records(response)
+            attempt += 1
+            if attempt > 1:
+                # The same backoff as urllib3, which retries once straight away
+                await asyncio.sleep(self.backoff_factor * 2 ** (attempt - 1))
+
+    async def get_legal_names(self, leis):
+        """
+        Map each of leis to its legal name, or to None if GLEIF does not know
+        about it
+        """
+        return _legal_names(leis, await self.get_records(leis))
+
+
+client = GleifClient()
+
+
+# LEIs are resolved from the LEI cache, then the LegalEntity table and only
+# then from GLEIF. A legal name is only ever cached once its LegalEntity row
+# has been stored, so a bond can reference any LEI that resolves to a name.
+
+def cached_legal_name(lei):
+    """
+    Resolve an LEI without calling GLEIF, returns MISSING if it is not known
+    """
+    legal_name = lei_cache.get(lei)
+    if legal_name is not MISSING:
+        return legal_name
+
+    legal_name = LegalEntity.objects.filter(lei=lei).values_list("legal_name", flat=True).first()
+    if legal_name is None:
+        return MISSING
+    lei_cache.set(lei, legal_name)
+    return legal_name
+
+
+def fetch_legal_name(lei):
+    """
+    Look up a single LEI on GLEIF, storing and caching the result
+    """
+    legal_name = client.get_legal_names([lei])[lei]
+    if legal_name is not None:
+        LegalEntity.objects.store({lei: legal_name})
+    lei_cache.set(lei, legal_name)
+    return legal_name
+
+
+def stored_legal_names(leis):
+    """
+    Resolve a collection of LEIs without calling GLEIF
+
+    LEIs are deduplicated and served from the LEI cache and LegalEntity
+    table. Returns a dict of the legal names found, with None for LEIs GLEIF
+    is known not to know about, and a sorted list of the LEIs left to fetch.
+    """
+    legal_names = {}
+    unknown = []
+    for lei in set(leis):
+        legal_name = lei_cache.get(lei)
+        if legal_name is MISSING:
+            unknown.append(lei)
+        else:
+            legal_names[lei] = legal_name
+
+    to_fetch = []
+    for batch in chunked(sorted(unknown), GLEIF_BATCH_SIZE):
+        stored = dict(
+            LegalEntity.objects.filter(lei__in=batch).values_list("lei", "legal_name")
+        )
+        for lei in batch:
+            if lei in stored:
+                legal_names[lei] = stored[lei]
+                lei_cache.set(lei, stored[lei])
+            else:
+                to_fetch.append(lei)
+    return legal_names, to_fetch
+
+
+def _store_fetched(fetched):
+    LegalEntity.objects.store({
+        lei: legal_name for lei, legal_name in fetched.items() if legal_name is not None
+    })
+    for lei, legal_name in fetched.items():
+        lei_cache.set(lei, legal_name)
+
+
+def resolve_legal_names(leis):
+    """
+    Resolve a collection of LEIs to their legal names
+
+    LEIs are served by stored_legal_names where possible, the rest are
+    fetched in comma separated batches. Returns a dict mapping each LEI to
+    its legal name, or to None if GLEIF does not know about it.
+    """
+    legal_names, to_fetch = stored_legal_names(leis)
+    for batch in chunked(to_fetch, GLEIF_BATCH_SIZE):
+        try:
+            fetched = client.get_legal_names(batch)
+        except GleifBadRequest as e:
+            raise GleifUnavailable(e.message) from e
+        _store_fetched(fetched)
+        legal_names.update(fetched)
+    return legal_names
+
+
+async def resolve_legal_names_async(leis, async_client):
+    """
+    resolve_legal_names for an event loop, fetching every batch at once
+    through an AsyncGleifClient
+
+    The cache and database are still queried synchronously, they only block
+    the event loop briefly.
+    """
+    legal_names, to_fetch = stored_legal_names(leis)
+    try:
+        batches = await asyncio.gather(*(
+            async_client.get_legal_names(batch)
+            for batch in chunked(to_fetch, GLEIF_BATCH_SIZE)
+        ))
+    except GleifBadRequest as e:
+        raise GleifUnavailable(e.message) from e
+    for fetched in batches:
+        _store_fetched(fetched)
+        legal_names.update(fetched)
+    return legal_names
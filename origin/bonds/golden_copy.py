@@ -0,0 +1,138 @@
+import csv
+import io
+import os
+import zipfile
+from collections import namedtuple
+from xml.etree import ElementTree
+
+from bonds.cache import lei_cache
+from bonds.models import LegalEntity
+from bonds.settings import GOLDEN_COPY_CHUNK_SIZE
+from bonds.utils import chunked, write_atomic
+
+CSV = "csv"
+XML = "xml"
+FORMATS = (CSV, XML)
+
+# Columns of the LEI-CDF golden copy and delta CSV files
+LEI_COLUMN = "LEI"
+LEGAL_NAME_COLUMN = "Entity.LegalName"
+
+# Outcome of one committed chunk of records
+LoadedChunk = namedtuple("LoadedChunk", ["records", "changed", "skipped"])
+
+
+class GoldenCopyFormatError(Exception):
+    """
+    The file is not a golden copy in a format that can be read
+    """
+
+
+def detect_format(path):
+    """
+    Guess the format of a golden copy from its name, e.g. "...-golden-copy.csv.zip"
+    """
+    name = path.lower()
+    if name.endswith(".zip"):
+        name = name[:-len(".zip")]
+    extension = os.path.splitext(name)[1].lstrip(".")
+    if extension not in FORMATS:
+        raise GoldenCopyFormatError(
+            f"Cannot tell the format of {path}, expected a .csv or .xml file, optionally zipped"
+        )
+    return extension
+
+
+def open_file(path):
+    """
+    Open a golden copy as a binary stream, reading the first member of zip
+    archives as they are published by GLEIF without extracting it
+    """
+    if zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        names = [name for name in archive.namelist() if not name.endswith("/")]
+        if not names:
+            raise GoldenCopyFormatError(f"{path} is an empty archive")
+        return archive.open(names[0])
+    return open(path, "rb")
+
+
+def read_records(file, format):
+    """
+    Lazily yield the (lei, legal_name) of every record of a binary stream
+    """
+    if format == CSV:
+        return _iter_csv(file)
+    elif format == XML:
+        return _iter_xml(file)
+    raise GoldenCopyFormatError(f"Unknown format {format}")
+
+
+def load(path, format=None, chunk_size=GOLDEN_COPY_CHUNK_SIZE):
+    """
+    Store the legal names of a golden copy or delta file in LegalEntity
+
+    Records are inserted, or renamed if their legal name changed, one chunk
+    per transaction. Delta files hold the records that changed since the
+    previous publication and are loaded the same way, in the order they were
+    published. Records without a valid LEI or legal name are skipped. Yields
+    a LoadedChunk after every commit.
+    """
+    format = format or detect_format(path)
+    with open_file(path) as file:
+        for records in chunked(read_records(file, format), chunk_size):
+            legal_names = {}
+            skipped = 0
+            for lei, legal_name in records:
+                if lei and len(lei) == 20 and legal_name:
+                    legal_names[lei] = legal_name
+                else:
+                    skipped += 1
+            with write_atomic():
+                changed = LegalEntity.objects.store(legal_names)
+            # Drop cached names, and cached misses, of the changed LEIs
+            for lei in changed:
+                lei_cache.delete(lei)
+            yield LoadedChunk(len(records), len(changed), skipped)
+
+
+def _iter_csv(file):
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8", newline=""))
+    if reader.fieldnames is None or not {LEI_COLUMN, LEGAL_NAME_COLUMN} <= set(reader.fieldnames):
+        raise GoldenCopyFormatError(
+            f"CSV golden copies must have {LEI_COLUMN} and {LEGAL_NAME_COLUMN} columns"
+        )
+    for row in reader:
+        yield row[LEI_COLUMN].strip(), row[LEGAL_NAME_COLUMN].strip()
+
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _iter_xml(file):
+    # Elements are matched on their local name so that any version of the
+    # LEI-CDF namespace is accepted. Each record is cleared and removed from
+    # its parent once read, as the tree would otherwise keep an empty element
+    # for every record and grow with the file
+    try:
+        lei = legal_name = None
+        parents = []
+        for event, element in ElementTree.iterparse(file, events=("start", "end")):
+            if event == "start":
+                parents.append(element)
+                continue
+            parents.pop()
+            tag = _local_name(element.tag)
+            if tag == "LEI" and lei is None:
+                lei = (element.text or "").strip()
+            elif tag == "LegalName" and legal_name is None:
+                legal_name = (element.text or "").strip()
+            elif tag == "LEIRecord":
+                yield lei, legal_name
+                lei = legal_name = None
+                element.clear()
+                if parents:
+                    parents[-1].remove(element)
+    except ElementTree.ParseError as e:
+        raise GoldenCopyFormatError(f"Invalid XML: {e}") from e
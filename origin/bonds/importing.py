@@ -0,0 +1,156 @@
+import csv
+import json
+import os
+import re
+from collections import namedtuple
+from itertools import islice
+
+from django.db.models import F
+from django.utils import timezone
+
+from bonds import bulk
+from bonds import sharding
+from bonds.models import BondImport
+from bonds.settings import IMPORT_CHUNK_SIZE
+from bonds.utils import chunked
+
+CSV = "csv"
+JSON = "json"
+NDJSON = "ndjson"
+FORMATS = (CSV, JSON, NDJSON)
+
+EXTENSIONS = {
+    ".csv": CSV,
+    ".json": JSON,
+    ".ndjson": NDJSON,
+    ".jsonl": NDJSON,
+}
+
+# Whitespace between the elements of a JSON array
+_WHITESPACE = re.compile(r"\s*")
+
+# Outcome of one committed chunk, start is the index of its first row in the
+# file and results are those of bulk.ingest_bonds
+ImportedChunk = namedtuple("ImportedChunk", ["start", "results", "created", "failed"])
+
+
+class ImportFormatError(Exception):
+    """
+    The file could not be read as the given format
+    """
+
+
+def detect_format(path):
+    """
+    Guess the format of a file from its extension
+    """
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        return EXTENSIONS[extension]
+    except KeyError:
+        raise ImportFormatError(
+            f"Cannot tell the format of {path}, expected one of {', '.join(EXTENSIONS)}"
+        )
+
+
+def read_rows(file, format):
+    """
+    Lazily yield the rows of an open text file, one dict per bond
+
+    CSV files must have a header row, JSON files hold an array of bonds and
+    NDJSON files one bond per line. Rows are not validated here.
+    """
+    if format == CSV:
+        return csv.DictReader(file)
+    elif format == NDJSON:
+        return _iter_ndjson(file)
+    elif format == JSON:
+        return _iter_json_array(file)
+    raise ImportFormatError(f"Unknown format {format}")
+
+
+def import_bonds(user, path, format=None, chunk_size=IMPORT_CHUNK_SIZE, restart=False):
+    """
+    Load the bonds of a file for user, chunk by chunk
+
+    Each chunk is validated and enriched like a POST /bonds/bulk/ request,
+    then written in one transaction along with the import's progress. If an
+    earlier import of the same file was interrupted, rows that were already
+    committed are skipped unless restart is set. Yields an ImportedChunk
+    after every commit. Raises gleif.GleifUnavailable if LEIs could not be
+    resolved, or sharding.ShardMoved if the user was moved to another shard,
+    the chunk that failed is retried by the next run.
+    """
+    source = os.path.abspath(path)
+    format = format or detect_format(path)
+    # Not held across the yields, which hand the thread back to the caller
+    shard = sharding.shard_for(user.pk)
+    with sharding.use_shard(shard, user.pk):
+        progress, _ = BondImport.objects.get_or_create(user=user, source=source)
+        if restart:
+            progress.rows = progress.created = progress.failed = 0
+            progress.started_at = timezone.now()
+            progress.save()
+
+    start = progress.rows
+    with open(path, newline="", encoding="utf-8") as file:
+        rows = islice(read_rows(file, format), start, None)
+        for chunk in chunked(rows, chunk_size):
+            with sharding.use_shard(shard, user.pk):
+                results, bonds = bulk.prepare_bonds(user, chunk)
+                with sharding.atomic():
+                    bonds = bulk.recheck_existing(user, chunk, results, bonds)
+                    created = len(bonds)
+                    failed = len(chunk) - created
+                    bulk.save_bonds(user, bonds)
+                    BondImport.objects.filter(pk=progress.pk).update(
+                        rows=F("rows") + len(chunk),
+                        created=F("created") + created,
+                        failed=F("failed") + failed,
+                        updated_at=timezone.now()
+                    )
+            yield ImportedChunk(start, results, created, failed)
+            start += len(chunk)
+
+
+def _iter_ndjson(file):
+    for line in file:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            # Reported as an invalid row rather than stopping the import
+            yield line
+
+
+def _iter_json_array(file, read_size=1 << 16):
+    # Decode the elements of a top level array one at a time from an offset
+    # into the buffer, which is only compacted when more of the file is read
+    decoder = json.JSONDecoder()
+    buffer = file.read(read_size)
+    pos = _WHITESPACE.match(buffer).end()
+    if not buffer.startswith("[", pos):
+        raise ImportFormatError("JSON files must contain an array of bonds")
+    pos += 1
+
+    while True:
+        pos = _WHITESPACE.match(buffer, pos).end()
+        if buffer.startswith(",", pos):
+            pos += 1
+            continue
+        if buffer.startswith("]", pos):
+            return
+        try:
+            if pos == len(buffer):
+                raise ValueError
+            value, pos = decoder.raw_decode(buffer, pos)
+        except ValueError:
+            more = file.read(read_size)
+            if not more:
+                raise ImportFormatError("JSON file ended in the middle of the array")
+            buffer = buffer[pos:] + more
+            pos = 0
+            continue
+        yield value
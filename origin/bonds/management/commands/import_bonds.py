@@ -0,0 +1,80 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from bonds import bulk
+from bonds import gleif
+from bonds import importing
+from bonds import sharding
+from bonds.settings import IMPORT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Load a user's bonds from a CSV, JSON or NDJSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("file")
+        parser.add_argument("--user", required=True, help="Username owning the bonds")
+        parser.add_argument(
+            "--format",
+            choices=importing.FORMATS,
+            help="Format of the file, guessed from its extension by default"
+        )
+        parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Start from the first row even if the file was partly imported"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user {options['user']}")
+
+        chunks = importing.import_bonds(
+            user,
+            options["file"],
+            format=options["format"],
+            chunk_size=options["chunk_size"],
+            restart=options["restart"]
+        )
+        rows = created = failed = 0
+        started = time.monotonic()
+        try:
+            chunk_started = started
+            for chunk in chunks:
+                if not rows and chunk.start:
+                    self.stdout.write(f"Resuming after row {chunk.start}")
+                now = time.monotonic()
+                count = len(chunk.results)
+                rows += count
+                created += chunk.created
+                failed += chunk.failed
+                for result in chunk.results:
+                    if result["status"] == bulk.ERROR:
+                        self.stderr.write(
+                            f"Row {chunk.start + result['index'] + 1}: {result['errors']}"
+                        )
+                self.stdout.write(
+                    f"Committed rows {chunk.start + 1}-{chunk.start + count}: "
+                    f"{chunk.created} created, {chunk.failed} failed "
+                    f"({count / max(now - chunk_started, 1e-9):.0f} rows/s)"
+                )
+                chunk_started = now
+        except (OSError, importing.ImportFormatError) as e:
+            raise CommandError(str(e))
+        except gleif.GleifUnavailable as e:
+            raise CommandError(
+                f"Could not resolve LEIs ({e}), run the command again to resume"
+            )
+        except sharding.ShardMoved as e:
+            raise CommandError(f"{e}, run the command again to resume")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"Imported {rows} rows in {elapsed:.1f}s: {created} created, {failed} failed "
+            f"({rows / max(elapsed, 1e-9):.0f} rows/s)"
+        )
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bonds import golden_copy
+from bonds.settings import GOLDEN_COPY_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Load legal names from a GLEIF golden copy or delta file (CSV or XML, optionally zipped)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("files", nargs="+", help="Applied in the order given")
+        parser.add_argument(
+            "--format",
+            choices=golden_copy.FORMATS,
+            help="Format of the files, guessed from their names by default"
+        )
+        parser.add_argument("--chunk-size", type=int, default=GOLDEN_COPY_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        for path in options["files"]:
+            records = changed = skipped = 0
+            started = time.monotonic()
+            try:
+                for chunk in golden_copy.load(
+                    path, format=options["format"], chunk_size=options["chunk_size"]
+                ):
+                    records += chunk.records
+                    changed += chunk.changed
+                    skipped += chunk.skipped
+            except (OSError, golden_copy.GoldenCopyFormatError) as e:
+                raise CommandError(f"{path}: {e}")
+
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"{path}: {records} records in {elapsed:.1f}s, {changed} inserted or "
+                f"renamed, {skipped} skipped ({records / max(elapsed, 1e-9):.0f} records/s)"
+            )
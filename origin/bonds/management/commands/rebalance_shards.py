@@ -0,0 +1,60 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from bonds import rebalancing
+from bonds import sharding
+
+
+class Command(BaseCommand):
+    help = "Move users between shards, to even out the shards or to a given shard"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            action="append",
+            dest="usernames",
+            help="Only move this user, may be repeated"
+        )
+        parser.add_argument("--to", help="Move the users given with --user to this shard")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Print the moves without making them"
+        )
+
+    def handle(self, *args, **options):
+        if not sharding.enabled():
+            raise CommandError("Sharding is disabled, BONDS_SHARDS lists a single database")
+
+        users = None
+        if options["usernames"]:
+            users = dict(
+                User.objects.filter(username__in=options["usernames"])
+                .values_list("id", "username")
+            )
+            missing = set(options["usernames"]) - set(users.values())
+            if missing:
+                raise CommandError(f"Unknown users: {', '.join(sorted(missing))}")
+
+        if options["to"] is not None:
+            if users is None:
+                raise CommandError("--to needs at least one --user")
+            if options["to"] not in sharding.SHARDS:
+                raise CommandError(f"{options['to']} is not one of BONDS_SHARDS")
+            moves = [
+                (user_id, sharding.shard_for(user_id), options["to"], None)
+                for user_id in users
+            ]
+        else:
+            moves = rebalancing.plan(users)
+
+        names = dict(User.objects.values_list("id", "username"))
+        for user_id, source, target, count in moves:
+            if source == target:
+                continue
+            if not options["dry_run"]:
+                count = rebalancing.move_user(user_id, target)
+            bonds = "" if count is None else f" ({count} bonds)"
+            self.stdout.write(f"{names.get(user_id, user_id)}: {source} -> {target}{bonds}")
+        if not moves:
+            self.stdout.write("The shards are balanced")
@@ -0,0 +1,45 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from bonds import aggregates
+from bonds import sharding
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-user portfolio aggregates from the bonds, or verify them"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            action="append",
+            dest="usernames",
+            help="Only rebuild the aggregates of this user, may be repeated"
+        )
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Check the aggregates against the bonds without changing them"
+        )
+
+    def handle(self, *args, **options):
+        users = None
+        if options["usernames"]:
+            users = list(User.objects.filter(username__in=options["usernames"]))
+            missing = set(options["usernames"]) - {user.username for user in users}
+            if missing:
+                raise CommandError(f"Unknown users: {', '.join(sorted(missing))}")
+
+        mismatches = []
+        for shard in sharding.SHARDS:
+            with sharding.use_shard(shard):
+                if not options["verify"]:
+                    aggregates.rebuild(users)
+                mismatches += aggregates.verify(users)
+        if not options["verify"]:
+            self.stdout.write("Rebuilt portfolio aggregates")
+
+        for key, stored, expected in mismatches:
+            self.stderr.write(f"{key}: stored {stored}, expected {expected}")
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} portfolio aggregates do not match")
+        self.stdout.write("Portfolio aggregates match the bonds")
@@ -0,0 +1,83 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bonds import enrichment
+from bonds import sharding
+from bonds.settings import (
+    ENRICHMENT_WORKERS,
+    ENRICHMENT_CONCURRENCY,
+    ENRICHMENT_BATCH_SIZE,
+    ENRICHMENT_POLL_INTERVAL,
+)
+
+
+class Command(BaseCommand):
+    help = "Resolve the legal names of bonds that are pending enrichment"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=ENRICHMENT_WORKERS)
+        parser.add_argument(
+            "--asyncio",
+            action="store_true",
+            help="Run the workers as coroutines of one event loop rather than threads"
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=ENRICHMENT_CONCURRENCY,
+            help="Number of coroutines with --asyncio"
+        )
+        parser.add_argument("--batch-size", type=int, default=ENRICHMENT_BATCH_SIZE)
+        parser.add_argument(
+            "--poll-interval", type=float, default=ENRICHMENT_POLL_INTERVAL
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the jobs that are currently due and exit"
+        )
+
+    def handle(self, *args, **options):
+        if options["asyncio"]:
+            worker = enrichment.AsyncEnrichmentWorker(
+                concurrency=options["concurrency"],
+                batch_size=options["batch_size"],
+                poll_interval=options["poll_interval"]
+            )
+            if options["once"]:
+                processed = worker.run(once=True)
+                self.stdout.write(f"Processed {processed} enrichment jobs")
+                return
+            self.stdout.write(f"Started {options['concurrency']} enrichment coroutines")
+            try:
+                worker.run()
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping enrichment workers")
+            return
+
+        if options["once"]:
+            processed = 0
+            for shard in sharding.SHARDS:
+                with sharding.use_shard(shard):
+                    while True:
+                        claimed = enrichment.process_jobs(options["batch_size"])
+                        if not claimed:
+                            break
+                        processed += claimed
+            self.stdout.write(f"Processed {processed} enrichment jobs")
+            return
+
+        pool = enrichment.EnrichmentWorkerPool(
+            workers=options["workers"],
+            batch_size=options["batch_size"],
+            poll_interval=options["poll_interval"]
+        )
+        pool.start()
+        self.stdout.write(f"Started {options['workers']} enrichment workers")
+        try:
+            while True:
+                time.sleep(60)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping enrichment workers")
+            pool.stop()
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from bonds import sharding
+from bonds.models import LegalEntity
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the legal entities of the default database, and their search "
+        "terms, to shards added after they were stored"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "shards",
+            nargs="*",
+            help="Database aliases to copy to, the shards of BONDS_SHARDS by default"
+        )
+
+    def handle(self, *args, **options):
+        shards = options["shards"] or [
+            alias for alias in sharding.SHARDS if alias != DEFAULT_DB_ALIAS
+        ]
+        if not shards:
+            raise CommandError("No shards given and BONDS_SHARDS only lists default")
+        for alias in shards:
+            if alias not in connections.databases:
+                raise CommandError(f"Unknown database {alias}")
+
+        for alias in shards:
+            if alias == DEFAULT_DB_ALIAS:
+                continue
+            changed = LegalEntity.objects.db_manager(DEFAULT_DB_ALIAS).copy_to(alias)
+            self.stdout.write(f"{alias}: {len(changed)} legal entities inserted or renamed")
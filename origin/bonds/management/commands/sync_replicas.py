@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from bonds.settings import READ_REPLICAS
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the default SQLite database to its read replicas, a local "
+        "stand-in for replication"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "aliases",
+            nargs="*",
+            help="Database aliases to copy to, BONDS_READ_REPLICAS by default"
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Keep copying every this many seconds, emulating replication lag"
+        )
+
+    def handle(self, *args, **options):
+        aliases = options["aliases"] or READ_REPLICAS
+        if not aliases:
+            raise CommandError("No replicas given and BONDS_READ_REPLICAS is empty")
+        for alias in [DEFAULT_DB_ALIAS, *aliases]:
+            if alias not in connections.databases:
+                raise CommandError(f"Unknown database {alias}")
+            if connections[alias].vendor != "sqlite":
+                raise CommandError(f"Database {alias} is not an SQLite database")
+
+        while True:
+            started = time.monotonic()
+            for alias in aliases:
+                self.copy(alias)
+            self.stdout.write(
+                f"Copied {DEFAULT_DB_ALIAS} to {', '.join(aliases)} "
+                f"in {time.monotonic() - started:.2f}s"
+            )
+            if options["interval"] is None:
+                return
+            time.sleep(options["interval"])
+
+    def copy(self, alias):
+        primary = connections[DEFAULT_DB_ALIAS]
+        replica = connections[alias]
+        primary.ensure_connection()
+        replica.ensure_connection()
+        # The online backup API gives a consistent snapshot of the primary
+        # while it is being written to
+        primary.connection.backup(replica.connection)
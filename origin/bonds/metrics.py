@@ -0,0 +1,84 @@
+"""
+Prometheus metrics of the bonds service
+
+When the prometheus_multiproc_dir environment variable names a directory,
+set before the workers start, every worker process writes its metrics there
+and GET /metrics reports the sum over all of them. Servers that replace
+workers should call child_exit with the pid of each worker that exits, e.g.
+from gunicorn's child_exit hook.
+"""
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+MULTIPROCESS_DIR = "prometheus_multiproc_dir"
+
+REQUEST_DURATION = Histogram(
+    "bonds_request_duration_seconds",
+    "Time to respond to a request",
+    ["route", "method", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "bonds_requests_in_progress",
+    "Requests being handled",
+    multiprocess_mode="livesum",
+)
+REQUEST_QUERIES = Histogram(
+    "bonds_request_db_queries",
+    "Database queries run by a request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500, float("inf")),
+)
+GLEIF_DURATION = Histogram(
+    "bonds_gleif_request_duration_seconds",
+    "Time taken by GLEIF lookups, including retries",
+)
+GLEIF_ERRORS = Counter(
+    "bonds_gleif_errors_total",
+    "GLEIF lookups that failed",
+    ["reason"],
+)
+LEI_CACHE_LOOKUPS = Counter(
+    "bonds_lei_cache_lookups_total",
+    "LEI cache lookups, the hit ratio is hits over all lookups",
+    ["result"],
+)
+DB_LOCK_RETRIES = Counter(
+    "bonds_db_lock_retries_total",
+    "SQLite statements retried because another connection held the write lock",
+)
+
+
+def registry():
+    """
+    Registry to report, aggregating every worker in multiprocess mode
+    """
+    if MULTIPROCESS_DIR not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def exposition():
+    """
+    Return the content type and body of a text exposition of the metrics
+    """
+    return CONTENT_TYPE_LATEST, generate_latest(registry())
+
+
+def child_exit(server, worker):
+    """
+    gunicorn child_exit hook, drops the live gauges of a dead worker
+    """
+    if MULTIPROCESS_DIR in os.environ:
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,101 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from bonds import metrics
+from bonds import timing
+from bonds.settings import SLOW_REQUEST_MS
+
+logger = logging.getLogger("bonds.performance")
+
+
+class PerformanceMiddleware:
+    """
+    Break the time of each request down by phase
+
+    Records the time spent authenticating, calling GLEIF, validating bonds,
+    running database queries and rendering the response, returns it in a
+    Server-Timing header and logs requests slower than BONDS_SLOW_REQUEST_MS
+    with their breakdown. Streamed responses are timed until their first
+    byte. Enable by adding "bonds.middleware.PerformanceMiddleware" to
+    MIDDLEWARE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = timing.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timing.time_query))
+                response = self.get_response(request)
+        finally:
+            timing.stop()
+
+        total = timings.elapsed
+        response["Server-Timing"] = timings.header(total)
+        if total * 1000 >= SLOW_REQUEST_MS:
+            logger.warning(
+                "Slow request %s %s %s took %.1fms: %s",
+                request.method,
+                request.get_full_path(),
+                response.status_code,
+                total * 1000,
+                timings.breakdown()
+            )
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered by Django right after this hook
+        timings = timing.current()
+        if timings is not None:
+            started = time.perf_counter()
+            response.add_post_render_callback(
+                lambda response: timings.add("render", time.perf_counter() - started)
+            )
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Record the latency, status and number of queries of every request, and
+    the number of requests in progress, for GET /metrics
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with metrics.REQUESTS_IN_PROGRESS.track_inprogress():
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(counter))
+                response = self.get_response(request)
+
+        # Label by URL pattern name rather than path to bound cardinality
+        match = getattr(request, "resolver_match", None)
+        route = match.url_name if match is not None and match.url_name else "unmatched"
+        metrics.REQUEST_DURATION.labels(
+            route, request.method, response.status_code
+        ).observe(time.perf_counter() - started)
+        metrics.REQUEST_QUERIES.labels(route).observe(counter.count)
+        return response
+
+
+class QueryCounter:
+    """
+    Database execute wrapper counting queries
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.13 on 2026-10-18 17:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bonds', '0002_auto_20201220_0011'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bond',
+            name='enrichment_state',
+            field=models.CharField(choices=[('pending', 'Pending'), ('resolved', 'Resolved'), ('failed', 'Failed')], default='resolved', max_length=8),
+        ),
+        migrations.AlterField(
+            model_name='bond',
+            name='legal_name',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.CreateModel(
+            name='EnrichmentJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_by', models.CharField(blank=True, max_length=32)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('bond', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='enrichment_job', to='bonds.Bond')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='enrichmentjob',
+            index=models.Index(fields=['available_at'], name='bonds_enric_availab_dabc25_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.13 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bonds', '0003_enrichment'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bond',
+            index=models.Index(fields=['user', 'legal_name'], name='bonds_bond_user_id_0aa079_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bond',
+            index=models.Index(fields=['user', 'maturity'], name='bonds_bond_user_id_97214b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bond',
+            index=models.Index(fields=['user', 'currency'], name='bonds_bond_user_id_53af2c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bond',
+            index=models.Index(fields=['user', 'lei'], name='bonds_bond_user_id_e38be5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bond',
+            index=models.Index(fields=['user', 'size'], name='bonds_bond_user_id_6b65db_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bond',
+            index=models.Index(fields=['user', 'enrichment_state'], name='bonds_bond_user_id_15b803_idx'),
+        ),
+    ]
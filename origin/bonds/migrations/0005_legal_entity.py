@@ -0,0 +1,73 @@
+# Generated by Django 2.2.13 on 2026-10-18 17:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def copy_legal_names(apps, schema_editor):
+    """
+    Create a legal entity for every resolved LEI and point its bonds at it
+    """
+    Bond = apps.get_model('bonds', 'Bond')
+    LegalEntity = apps.get_model('bonds', 'LegalEntity')
+    db_alias = schema_editor.connection.alias
+
+    legal_names = dict(
+        Bond.objects.using(db_alias).exclude(legal_name='')
+        .order_by('created', 'id')
+        .values_list('lei', 'legal_name')
+    )
+    LegalEntity.objects.using(db_alias).bulk_create(
+        [LegalEntity(lei=lei, legal_name=legal_name) for lei, legal_name in legal_names.items()],
+        batch_size=500
+    )
+    Bond.objects.using(db_alias).exclude(legal_name='').update(legal_entity_id=models.F('lei'))
+
+
+def copy_legal_names_back(apps, schema_editor):
+    Bond = apps.get_model('bonds', 'Bond')
+    LegalEntity = apps.get_model('bonds', 'LegalEntity')
+    db_alias = schema_editor.connection.alias
+
+    for entity in LegalEntity.objects.using(db_alias):
+        Bond.objects.using(db_alias).filter(legal_entity=entity).update(legal_name=entity.legal_name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bonds', '0004_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LegalEntity',
+            fields=[
+                ('lei', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('legal_name', models.CharField(db_index=True, max_length=500)),
+                ('fetched_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'legal entities',
+            },
+        ),
+        migrations.AddField(
+            model_name='bond',
+            name='legal_entity',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='bonds', to='bonds.LegalEntity'),
+        ),
+        migrations.RunPython(copy_legal_names, copy_legal_names_back),
+        migrations.RemoveIndex(
+            model_name='bond',
+            name='bonds_bond_user_id_0aa079_idx',
+        ),
+        migrations.RemoveField(
+            model_name='bond',
+            name='legal_name',
+        ),
+        migrations.AddIndex(
+            model_name='bond',
+            index=models.Index(fields=['user', 'legal_entity'], name='bonds_bond_user_id_27ad38_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 2.2.13 on 2026-10-18 17:08
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractYear
+import django.db.models.deletion
+
+
+def build_aggregates(apps, schema_editor):
+    Bond = apps.get_model('bonds', 'Bond')
+    PortfolioAggregate = apps.get_model('bonds', 'PortfolioAggregate')
+    db_alias = schema_editor.connection.alias
+
+    rows = (
+        Bond.objects.using(db_alias).order_by()
+        .annotate(maturity_year=ExtractYear('maturity'))
+        .values('user_id', 'currency', 'lei', 'maturity_year')
+        .annotate(size=Sum('size'), count=Count('id'))
+    )
+    PortfolioAggregate.objects.using(db_alias).bulk_create(
+        [PortfolioAggregate(**row) for row in rows], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bonds', '0005_legal_entity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioAggregate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(max_length=3)),
+                ('lei', models.CharField(max_length=20)),
+                ('maturity_year', models.IntegerField()),
+                ('size', models.BigIntegerField(default=0)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'currency', 'lei', 'maturity_year')},
+            },
+        ),
+        migrations.RunPython(build_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 2.2.13 on 2026-10-18 17:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from bonds import search
+
+
+def index_legal_names(apps, schema_editor):
+    LegalEntity = apps.get_model('bonds', 'LegalEntity')
+    LegalNameTerm = apps.get_model('bonds', 'LegalNameTerm')
+    db_alias = schema_editor.connection.alias
+
+    entities = list(LegalEntity.objects.using(db_alias))
+    for entity in entities:
+        entity.search_name = search.normalize(entity.legal_name)
+    LegalEntity.objects.using(db_alias).bulk_update(entities, ['search_name'], batch_size=500)
+    LegalNameTerm.objects.using(db_alias).bulk_create(
+        [
+            LegalNameTerm(term=term, legal_entity_id=entity.lei)
+            for entity in entities
+            for term in search.terms(entity.legal_name)
+        ],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bonds', '0008_bond_import'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='legalentity',
+            name='search_name',
+            field=models.CharField(db_index=True, default='', max_length=500),
+        ),
+        migrations.CreateModel(
+            name='LegalNameTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=500)),
+                ('legal_entity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='bonds.LegalEntity')),
+            ],
+            options={
+                'unique_together': {('term', 'legal_entity')},
+            },
+        ),
+        migrations.RunPython(index_legal_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 2.2.13 on 2026-10-18 17:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def pin_users_to_default(apps, schema_editor):
+    """
+    The bonds of existing users are on the default database, keep them there
+    """
+    db_alias = schema_editor.connection.alias
+    if db_alias != 'default':
+        return
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    ShardAssignment = apps.get_model('bonds', 'ShardAssignment')
+    ShardAssignment.objects.using(db_alias).bulk_create(
+        [
+            ShardAssignment(user_id=user_id, shard='default')
+            for user_id in User.objects.using(db_alias).values_list('id', flat=True)
+        ],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('bonds', '0009_legal_name_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShardAssignment',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('shard', models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='bond',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='bondimport',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='portfolioaggregate',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='userdataversion',
+            name='user',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(pin_users_to_default, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,16 @@
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, models, router
 from django.contrib.auth.models import User  
+from django.utils import timezone
 from django.core.validators import RegexValidator
 from django.core.exceptions import ValidationError
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
 
+from bonds import replication
+from bonds import search
+from bonds import sharding
 from bonds.settings import CURRENCY_CODES
+from bonds.utils import chunked, write_atomic
 
 def validate_positive(value):
     if value <= 0:
@@ -22,8 +29,159 @@ def validate_lei_length(value):
         raise ValidationError(f"{value} has invalid length for lei")
 
 
+class LegalEntityManager(models.Manager):
+    def store(self, legal_names):
+        """
+        Insert or rename the legal entities of a {lei: legal_name} dict,
+        returns the LEIs that were inserted or renamed
+
+        The entities are written to the default database and copied to every
+        shard.
+        """
+        changed = []
+        for alias in sharding.reference_databases():
+            stored = self.db_manager(alias)._store(legal_names)
+            if alias == DEFAULT_DB_ALIAS:
+                changed = stored
+        return changed
+
+    def copy_to(self, alias, chunk_size=500):
+        """
+        Store the legal entities of this manager's database on alias, with
+        their search terms, returns the LEIs inserted or renamed there
+
+        Fills a shard added after the entities were stored.
+        """
+        changed = []
+        entities = self.order_by("lei").values_list("lei", "legal_name")
+        for rows in chunked(entities.iterator(), chunk_size):
+            with write_atomic(using=alias):
+                changed += self.db_manager(alias)._store(dict(rows))
+        return changed
+
+    def _store(self, legal_names):
+        existing = self.in_bulk(list(legal_names))
+        now = timezone.now()
+        created = []
+        renamed = []
+        for lei, legal_name in legal_names.items():
+            entity = existing.get(lei)
+            if entity is None:
+                created.append(self.model(
+                    lei=lei,
+                    legal_name=legal_name,
+                    search_name=search.normalize(legal_name),
+                    fetched_at=now
+                ))
+            elif entity.legal_name != legal_name:
+                entity.legal_name = legal_name
+                entity.search_name = search.normalize(legal_name)
+                entity.fetched_at = now
+                renamed.append(entity)
+        self.bulk_create(created, ignore_conflicts=True)
+        self.bulk_update(renamed, ["legal_name", "search_name", "fetched_at"])
+        LegalNameTerm.objects.db_manager(self.db).index(created + renamed)
+        if renamed and self.db in sharding.SHARDS:
+            # The bonds listed by every holder of a renamed issuer change
+            with sharding.use_shard(self.db):
+                UserDataVersion.objects.bump(
+                    Bond.objects.filter(legal_entity__in=renamed)
+                    .values_list("user_id", flat=True)
+                    .distinct()
+                )
+        return [entity.lei for entity in created + renamed]
+
+
+class LegalEntity(models.Model):
+    """
+    Issuer of bonds, shared by every bond with its LEI
+    """
+    lei = models.CharField(primary_key=True, max_length=20)
+    legal_name = models.CharField(max_length=500, db_index=True)
+    # bonds.search.normalize(legal_name), for case and accent insensitive
+    # prefix matches
+    search_name = models.CharField(max_length=500, db_index=True, default="")
+    fetched_at = models.DateTimeField(default=timezone.now)
+
+    objects = LegalEntityManager()
+
+    class Meta:
+        verbose_name_plural = "legal entities"
+
+    def __str__(self):
+        return f"lei: {self.lei}, legal_name: {self.legal_name}"
+
+    def save(self, *args, **kwargs):
+        self.search_name = search.normalize(self.legal_name)
+        super().save(*args, **kwargs)
+        LegalNameTerm.objects.db_manager(self._state.db).index([self])
+        for alias in sharding.reference_databases():
+            if alias != self._state.db:
+                LegalEntity.objects.db_manager(alias)._store({self.lei: self.legal_name})
+
+
+class LegalNameTermManager(models.Manager):
+    def index(self, entities):
+        """
+        Replace the search terms of legal entities by those of their names
+        """
+        # Keep the IN clause below SQLite's bound parameter limit
+        for batch in chunked([entity.lei for entity in entities], 500):
+            self.filter(legal_entity__in=batch).delete()
+        self.bulk_create(
+            [
+                self.model(term=term, legal_entity_id=entity.lei)
+                for entity in entities
+                for term in search.terms(entity.legal_name)
+            ],
+            ignore_conflicts=True
+        )
+
+    def matching(self, query):
+        """
+        LEIs of the legal entities with a word starting with each word of
+        query, e.g. "soc gen" matches "Société Générale"
+        """
+        entities = LegalEntity.objects.all()
+        for term in search.terms(query):
+            entities = entities.filter(lei__in=self.filter(
+                **search.prefix_range("term", term)
+            ).values("legal_entity"))
+        return entities.values("lei")
+
+
+class LegalNameTerm(models.Model):
+    """
+    A word of a legal entity's normalized name, the index behind ?search=
+    """
+    term = models.CharField(max_length=500)
+    legal_entity = models.ForeignKey(
+        LegalEntity, on_delete=models.CASCADE, related_name="terms"
+    )
+
+    objects = LegalNameTermManager()
+
+    class Meta:
+        unique_together = ("term", "legal_entity")
+
+    def __str__(self):
+        return f"term: {self.term}, lei: {self.legal_entity_id}"
+
+
 class Bond(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # States of the legal entity lookup, bonds created while asynchronous
+    # enrichment is enabled stay pending until a worker has resolved the LEI
+    PENDING = "pending"
+    RESOLVED = "resolved"
+    FAILED = "failed"
+    ENRICHMENT_STATES = [
+        (PENDING, "Pending"),
+        (RESOLVED, "Resolved"),
+        (FAILED, "Failed"),
+    ]
+
+    # Users are on the default database, their bonds can be on another shard
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
     isin = models.CharField(max_length=12, validators=[
         RegexValidator(
             regex=r"^[A-Z0-9]*$",
@@ -43,14 +201,181 @@ class Bond(models.Model):
         ),
         validate_lei_length
     ])
-    legal_name = models.CharField(max_length=100)
+    # Set once the LEI has been resolved, which is always the case unless
+    # enrichment is pending or failed
+    legal_entity = models.ForeignKey(
+        LegalEntity,
+        null=True,
+        blank=True,
+        on_delete=models.PROTECT,
+        related_name="bonds"
+    )
+    enrichment_state = models.CharField(
+        max_length=8, choices=ENRICHMENT_STATES, default=RESOLVED
+    )
     created = models.DateField(auto_now=True)
 
     class Meta:
         unique_together = ("user", "isin")
+        # Every query is scoped to a user, so each list filter gets an index
+        # led by user. SQLite appends the rowid to every index, which lets
+        # equality filters also return rows in the id order used for paging.
         indexes = [
-            models.Index(fields=["user", "isin"])
+            models.Index(fields=["user", "isin"]),
+            models.Index(fields=["user", "legal_entity"]),
+            models.Index(fields=["user", "maturity"]),
+            models.Index(fields=["user", "currency"]),
+            models.Index(fields=["user", "lei"]),
+            models.Index(fields=["user", "size"]),
+            models.Index(fields=["user", "enrichment_state"]),
         ]
     def __str__(self):
         return f"isin: {self.isin}, user: {self.user.id}"
-    
\ No newline at end of file
+    
+
+
+class EnrichmentJob(models.Model):
+    """
+    Queued legal entity lookup for a pending bond
+
+    A job is claimed by setting locked_by/locked_until, so that a worker that
+    dies mid-batch only holds on to its jobs until the lease runs out.
+    """
+    bond = models.OneToOneField(
+        Bond, on_delete=models.CASCADE, related_name="enrichment_job"
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=32, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["available_at"])
+        ]
+
+    def __str__(self):
+        return f"bond: {self.bond_id}, attempts: {self.attempts}"
+
+
+@receiver(pre_delete, sender=User)
+def _delete_shard_rows(sender, instance, **kwargs):
+    shard = (
+        ShardAssignment.objects.using(DEFAULT_DB_ALIAS)
+        .filter(user=instance)
+        .values_list("shard", flat=True)
+        .first()
+    )
+    if shard not in (None, DEFAULT_DB_ALIAS):
+        # Django only cascades within the default database
+        with sharding.use_shard(shard):
+            for model in [Bond, PortfolioAggregate, UserDataVersion, BondImport]:
+                model.objects.filter(user=instance).delete()
+
+
+class PortfolioAggregate(models.Model):
+    """
+    Running totals of a user's bonds per currency, issuer and maturity year
+
+    Kept up to date in the same transaction as every write to Bond, see
+    bonds.aggregates, so that summaries are read from here instead of being
+    computed over every bond.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
+    currency = models.CharField(max_length=3)
+    lei = models.CharField(max_length=20)
+    maturity_year = models.IntegerField()
+    size = models.BigIntegerField(default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("user", "currency", "lei", "maturity_year")
+
+    def __str__(self):
+        return (
+            f"user: {self.user_id}, currency: {self.currency}, lei: {self.lei}, "
+            f"maturity_year: {self.maturity_year}"
+        )
+
+
+class UserDataVersionManager(models.Manager):
+    def bump(self, user_ids):
+        """
+        Record a change to the bonds of users, must be called in the
+        transaction that makes the change
+
+        The users read their bonds from the default database rather than a
+        replica for a while once the change is committed.
+        """
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+        # Insert the counters that do not exist yet, then increment them all
+        self.bulk_create(
+            [self.model(user_id=user_id) for user_id in user_ids],
+            ignore_conflicts=True
+        )
+        self.filter(user_id__in=user_ids).update(
+            version=models.F("version") + 1, modified=timezone.now()
+        )
+        replication.record_writes(user_ids, using=router.db_for_write(self.model))
+
+    def current(self, user):
+        """
+        Version number and time of the last change to a user's bonds, (0, None)
+        if they have never been changed
+        """
+        version = self.filter(user=user).values_list("version", "modified").first()
+        return version or (0, None)
+
+
+class UserDataVersion(models.Model):
+    """
+    Counter incremented whenever any of a user's bonds change, used to answer
+    conditional requests without querying the bonds
+    """
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, db_constraint=False
+    )
+    version = models.BigIntegerField(default=0)
+    modified = models.DateTimeField(default=timezone.now)
+
+    objects = UserDataVersionManager()
+
+    def __str__(self):
+        return f"user: {self.user_id}, version: {self.version}"
+
+
+class BondImport(models.Model):
+    """
+    Progress of a file being loaded by the import_bonds command
+
+    rows is the number of rows of the file that have been committed, it is
+    updated in the same transaction as each chunk of bonds so that an
+    interrupted import carries on from the first row that was not written.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
+    source = models.CharField(max_length=1024)
+    rows = models.PositiveIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ("user", "source")
+
+    def __str__(self):
+        return f"user: {self.user_id}, source: {self.source}, rows: {self.rows}"
+
+
+class ShardAssignment(models.Model):
+    """
+    Shard holding a user's bonds, see bonds.sharding
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    shard = models.CharField(max_length=100)
+
+    def __str__(self):
+        return f"user: {self.user_id}, shard: {self.shard}"
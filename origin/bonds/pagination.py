@@ -0,0 +1,17 @@
+from rest_framework.pagination import CursorPagination
+
+from bonds.settings import PAGE_SIZE, MAX_PAGE_SIZE
+
+
+class BondCursorPagination(CursorPagination):
+    """
+    Keyset pagination of a user's bonds ordered by id
+
+    Pages are fetched with `WHERE user_id = ? AND id > ? ORDER BY id LIMIT ?`,
+    which SQLite answers from the user_id index (that implicitly ends with the
+    rowid), so a page costs the same however deep the cursor is.
+    """
+    ordering = "id"
+    page_size = PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = MAX_PAGE_SIZE
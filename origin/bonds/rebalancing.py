@@ -0,0 +1,144 @@
+from collections import Counter, defaultdict
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count
+
+from bonds import sharding
+from bonds.models import (
+    Bond,
+    BondImport,
+    EnrichmentJob,
+    PortfolioAggregate,
+    ShardAssignment,
+    UserDataVersion,
+)
+from bonds.settings import BULK_CHUNK_SIZE
+from bonds.utils import chunked, write_atomic
+
+# Rows of a user copied along with the bonds, keyed by user rather than bond
+USER_MODELS = [PortfolioAggregate, UserDataVersion, BondImport]
+
+
+def move_user(user_id, target):
+    """
+    Move the rows of a user to the target shard, returns the number of bonds
+    moved
+
+    The user's rows are copied while the write lock of the source shard is
+    held, and the user is reassigned before it is released. sharding.atomic
+    checks the assignment once it holds that lock, so the writes of a
+    process still sending the user's requests to the old shard are refused
+    with ShardMoved rather than left behind; its reads may find no bonds for
+    up to BONDS_SHARD_MAP_TTL seconds. Bonds get new ids on the target shard,
+    and the user's data version is bumped so that pages cached with the old
+    cursors are not reused.
+    """
+    source = sharding.assigned_shard(user_id)
+    if source == target:
+        return 0
+
+    # Raises ShardMoved if another move of the user committed first
+    with sharding.use_shard(source, user_id), sharding.atomic():
+        # Taking the write lock of the source shard before reading
+        UserDataVersion.objects.bump([user_id])
+        bonds = list(Bond.objects.filter(user_id=user_id).order_by("id"))
+        jobs = list(EnrichmentJob.objects.filter(bond__user_id=user_id))
+        rows = {model: list(model.objects.filter(user_id=user_id)) for model in USER_MODELS}
+
+        # Committed before the user is reassigned, and the source only after,
+        # so that whichever step fails the shard the user is assigned to
+        # holds all of their rows
+        with write_atomic(using=target), sharding.use_shard(target):
+            # Stale copies left by an earlier move that did not complete, no
+            # write reaches a shard the user is not assigned to
+            _delete(user_id)
+            Bond.objects.bulk_create(
+                [_copy(bond) for bond in bonds], batch_size=BULK_CHUNK_SIZE
+            )
+            # bulk_create sets the auto_now creation dates to today
+            by_created = defaultdict(list)
+            for bond in bonds:
+                by_created[bond.created].append(bond.isin)
+            for created, isins in by_created.items():
+                for batch in chunked(isins, BULK_CHUNK_SIZE):
+                    Bond.objects.filter(user_id=user_id, isin__in=batch).update(created=created)
+            if jobs:
+                # Bonds are matched up by ISIN, unique for a user
+                isin_of = {bond.id: bond.isin for bond in bonds}
+                ids = dict(Bond.objects.filter(user_id=user_id).values_list("isin", "id"))
+                copies = []
+                for job in jobs:
+                    copy = _copy(job)
+                    copy.bond_id = ids[isin_of[job.bond_id]]
+                    copies.append(copy)
+                EnrichmentJob.objects.bulk_create(copies, batch_size=BULK_CHUNK_SIZE)
+            for model, instances in rows.items():
+                model.objects.bulk_create(
+                    [_copy(instance) for instance in instances], batch_size=BULK_CHUNK_SIZE
+                )
+
+        ShardAssignment.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+            user_id=user_id, defaults={"shard": target}
+        )
+        _delete(user_id)
+
+    sharding.shard_map.delete(user_id)
+    return len(bonds)
+
+
+def plan(users=None):
+    """
+    Moves that even out the number of bonds on each shard, as a list of
+    (user_id, source, target, bonds) tuples
+
+    The largest users that fit in half the gap between the fullest and the
+    emptiest shard are moved first, so no shard ends up fuller than the one
+    it relieved. Only users whose ids are in users are moved, if it is given.
+    """
+    loads = Counter({shard: 0 for shard in sharding.SHARDS})
+    users_by_shard = {}
+    for shard in sharding.SHARDS:
+        with sharding.use_shard(shard):
+            counts = Counter(dict(
+                Bond.objects.order_by().values("user_id")
+                .annotate(count=Count("id"))
+                .values_list("user_id", "count")
+            ))
+        loads[shard] = sum(counts.values())
+        users_by_shard[shard] = counts
+
+    moves = []
+    while True:
+        fullest = max(loads, key=loads.get)
+        emptiest = min(loads, key=loads.get)
+        gap = loads[fullest] - loads[emptiest]
+        movable = [
+            (count, user_id) for user_id, count in users_by_shard[fullest].items()
+            if 0 < count <= gap // 2 and (users is None or user_id in users)
+        ]
+        if not movable:
+            return moves
+        count, user_id = max(movable)
+        del users_by_shard[fullest][user_id]
+        users_by_shard[emptiest][user_id] = count
+        loads[fullest] -= count
+        loads[emptiest] += count
+        moves.append((user_id, fullest, emptiest, count))
+
+
+def _copy(instance):
+    # A new row with the same values, the user's rows keep their primary key
+    # only when it is the user's id
+    fields = {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields
+        if not field.primary_key or field.attname == "user_id"
+    }
+    return type(instance)(**fields)
+
+
+def _delete(user_id):
+    EnrichmentJob.objects.filter(bond__user_id=user_id).delete()
+    Bond.objects.filter(user_id=user_id).delete()
+    for model in USER_MODELS:
+        model.objects.filter(user_id=user_id).delete()
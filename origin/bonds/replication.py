@@ -0,0 +1,126 @@
+"""
+Routing of read-only requests to read replicas
+
+BondsViewSet marks its list, export and summary requests as read-only once
+the user is known, and ReplicaRouter sends their queries to one of the
+READ_REPLICAS. Every other query, and every write, goes to the default
+database. Users whose data changed in the last REPLICA_STICKINESS seconds
+keep reading from the default database, so that they see their own writes
+however far the replicas lag behind.
+"""
+import random
+import threading
+
+from django.core.cache import caches
+from django.core.signals import request_finished
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.dispatch import receiver
+
+from bonds.cache import MISSING, LRUCache
+from bonds.settings import (
+    READ_REPLICAS,
+    REPLICA_STICKINESS,
+    REPLICA_STICKINESS_SIZE,
+    REPLICA_STICKINESS_BACKEND,
+)
+
+_local = threading.local()
+
+
+class RecentWriters:
+    """
+    Users who changed their data in the last ttl seconds
+
+    When a Django cache alias is given it is shared between workers and
+    consulted whenever the in-process LRU misses.
+    """
+    key_prefix = "bonds:wrote:"
+
+    def __init__(self, max_size, ttl, backend=None):
+        self.ttl = ttl
+        self.backend = backend
+        self.local = LRUCache(max_size, ttl)
+
+    @property
+    def shared(self):
+        if self.backend is None:
+            return None
+        return caches[self.backend]
+
+    def __contains__(self, user_id):
+        if self.local.get(user_id) is not MISSING:
+            return True
+        return self.shared is not None and bool(self.shared.get(self.key_prefix + str(user_id)))
+
+    def add(self, user_ids):
+        for user_id in user_ids:
+            self.local.set(user_id, True)
+        if self.shared is not None:
+            self.shared.set_many(
+                {self.key_prefix + str(user_id): True for user_id in user_ids}, self.ttl
+            )
+
+    def clear(self):
+        self.local.clear()
+
+
+recent_writers = RecentWriters(
+    REPLICA_STICKINESS_SIZE,
+    REPLICA_STICKINESS,
+    backend=REPLICA_STICKINESS_BACKEND,
+)
+
+
+def record_writes(user_ids, using=None):
+    """
+    Keep users reading from the default database for REPLICA_STICKINESS
+    seconds once the current transaction on using commits
+    """
+    user_ids = set(user_ids)
+    if READ_REPLICAS and user_ids:
+        transaction.on_commit(lambda: recent_writers.add(user_ids), using=using)
+
+
+def read_from_replica(user):
+    """
+    Send the reads of the current thread's request to a replica, unless user
+    wrote recently, returns the alias chosen or None
+    """
+    _local.replica = None
+    if READ_REPLICAS and user.pk not in recent_writers:
+        _local.replica = random.choice(READ_REPLICAS)
+    return _local.replica
+
+
+def read_from_primary():
+    _local.replica = None
+
+
+def current_replica():
+    return getattr(_local, "replica", None)
+
+
+@receiver(request_finished)
+def _end_request(sender, **kwargs):
+    # Sent once streaming responses have been read to the end as well
+    read_from_primary()
+
+
+class ReplicaRouter:
+    """
+    Database router sending the reads of read-only requests to a replica
+    """
+
+    def db_for_read(self, model, **hints):
+        return current_replica()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the default database
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas are copies of the default database and are never migrated
+        return db not in READ_REPLICAS
@@ -0,0 +1,13 @@
+from rest_framework.routers import SimpleRouter
+
+
+class BondRouter(SimpleRouter):
+    """
+    SimpleRouter that also maps DELETE on list routes, to bulk_destroy
+    """
+    routes = [
+        SimpleRouter.routes[0]._replace(
+            mapping={**SimpleRouter.routes[0].mapping, "delete": "bulk_destroy"}
+        ),
+        *SimpleRouter.routes[1:],
+    ]
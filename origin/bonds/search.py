@@ -0,0 +1,33 @@
+import re
+import unicodedata
+
+# Sorts after any string that starts with a given prefix, so that prefix
+# matches are index range scans: prefix <= value < prefix + PREFIX_END
+PREFIX_END = "\U0010ffff"
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(value):
+    """
+    Fold a legal name for searching: accents are dropped, case is folded and
+    punctuation collapses to single spaces, "Société Générale S.A." becomes
+    "societe generale s a"
+    """
+    value = unicodedata.normalize("NFKD", value)
+    value = "".join(char for char in value if not unicodedata.combining(char))
+    return " ".join(_WORD.findall(value.casefold()))
+
+
+def terms(value):
+    """
+    Distinct words of a normalized legal name or search query
+    """
+    return set(normalize(value).split())
+
+
+def prefix_range(field, prefix):
+    """
+    Lookups matching values of field that start with prefix
+    """
+    return {f"{field}__gte": prefix, f"{field}__lt": prefix + PREFIX_END}
@@ -4,11 +4,40 @@ from rest_framework import serializers
 
 from bonds.models import Bond
 
+# Largest integer SQLite can store, Bond.size is not bounded by Django on it
+MAX_SIZE = 2 ** 63 - 1
+
 class BondSerializer(serializers.ModelSerializer):
     class Meta:
         model = Bond
-        exclude = ["id", "created"]
+        fields = [
+            "user",
+            "isin",
+            "size",
+            "currency",
+            "maturity",
+            "lei",
+            "legal_name",
+            "enrichment_state",
+        ]
+        read_only_fields = ["enrichment_state"]
+        extra_kwargs = {"size": {"max_value": MAX_SIZE}}
 
     user = serializers.HiddenField(
         default=serializers.CurrentUserDefault()
-    )
\ No newline at end of file
+    )
+    # Empty until the LEI has been resolved
+    legal_name = serializers.CharField(
+        source="legal_entity.legal_name", read_only=True, default=""
+    )
+
+
+class BulkBondSerializer(serializers.ModelSerializer):
+    """
+    Validates a single row of a bulk upload, the owner and legal entity are
+    filled in by the bulk ingestion itself
+    """
+    class Meta:
+        model = Bond
+        fields = ["isin", "size", "currency", "maturity", "lei"]
+        extra_kwargs = {"size": {"max_value": MAX_SIZE}}
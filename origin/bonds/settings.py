@@ -1,6 +1,98 @@
 from django.conf import settings
 
 GLEIF_LEILOOKUP_URL = getattr(settings, 'BONDS_GLEIF_LEILOOKUP_URL')
+GLEIF_POOL_MAXSIZE = getattr(settings, 'BONDS_GLEIF_POOL_MAXSIZE', 10)
+GLEIF_ASYNC_POOL_MAXSIZE = getattr(settings, 'BONDS_GLEIF_ASYNC_POOL_MAXSIZE', 100)
+GLEIF_CONNECT_TIMEOUT = getattr(settings, 'BONDS_GLEIF_CONNECT_TIMEOUT', 3.05)
+GLEIF_READ_TIMEOUT = getattr(settings, 'BONDS_GLEIF_READ_TIMEOUT', 10)
+GLEIF_MAX_RETRIES = getattr(settings, 'BONDS_GLEIF_MAX_RETRIES', 3)
+GLEIF_BACKOFF_FACTOR = getattr(settings, 'BONDS_GLEIF_BACKOFF_FACTOR', 0.3)
+
+# LEI -> legal name cache. LEI_CACHE_BACKEND names a Django cache alias
+# shared between workers, the in-process LRU is always used in front of it.
+LEI_CACHE_SIZE = getattr(settings, 'BONDS_LEI_CACHE_SIZE', 10000)
+LEI_CACHE_TTL = getattr(settings, 'BONDS_LEI_CACHE_TTL', 24 * 60 * 60)
+LEI_CACHE_NEGATIVE_TTL = getattr(settings, 'BONDS_LEI_CACHE_NEGATIVE_TTL', 5 * 60)
+LEI_CACHE_BACKEND = getattr(settings, 'BONDS_LEI_CACHE_BACKEND', None)
+
+# Token -> user cache of CachedTokenAuthentication. Entries are dropped when a
+# token is deleted or its user saved, the TTL bounds how long other workers'
+# in-process copies can outlive that.
+TOKEN_CACHE_SIZE = getattr(settings, 'BONDS_TOKEN_CACHE_SIZE', 10000)
+TOKEN_CACHE_TTL = getattr(settings, 'BONDS_TOKEN_CACHE_TTL', 60)
+TOKEN_CACHE_BACKEND = getattr(settings, 'BONDS_TOKEN_CACHE_BACKEND', None)
+
+# Number of LEIs sent in one comma separated GLEIF query
+GLEIF_BATCH_SIZE = getattr(settings, 'BONDS_GLEIF_BATCH_SIZE', 100)
+
+# Records of a GLEIF golden copy stored per transaction by load_golden_copy
+GOLDEN_COPY_CHUNK_SIZE = getattr(settings, 'BONDS_GOLDEN_COPY_CHUNK_SIZE', 5000)
+
+# Bulk ingestion through POST /bonds/bulk/
+BULK_MAX_ROWS = getattr(settings, 'BONDS_BULK_MAX_ROWS', 10000)
+BULK_CHUNK_SIZE = getattr(settings, 'BONDS_BULK_CHUNK_SIZE', 500)
+
+# Rows read from the file and committed together by the import_bonds command
+IMPORT_CHUNK_SIZE = getattr(settings, 'BONDS_IMPORT_CHUNK_SIZE', 5000)
+
+# Cursor pagination of GET /bonds/, clients can ask for up to MAX_PAGE_SIZE
+# bonds per page with ?page_size=
+PAGE_SIZE = getattr(settings, 'BONDS_PAGE_SIZE', 100)
+MAX_PAGE_SIZE = getattr(settings, 'BONDS_MAX_PAGE_SIZE', 1000)
+
+# Rows fetched from the database at a time when streaming NDJSON/CSV
+EXPORT_CHUNK_SIZE = getattr(settings, 'BONDS_EXPORT_CHUNK_SIZE', 2000)
+
+# Default tenor buckets, in years from today, of GET /bonds/summary/?bucket=tenor
+SUMMARY_TENORS = getattr(settings, 'BONDS_SUMMARY_TENORS', [1, 3, 5, 10])
+
+# Asynchronous legal_name enrichment. When enabled, bonds whose LEI is not
+# already cached are saved as pending and resolved by the enrichment workers,
+# threads or, with ENRICHMENT_CONCURRENCY coroutines, one event loop
+ASYNC_ENRICHMENT = getattr(settings, 'BONDS_ASYNC_ENRICHMENT', False)
+ENRICHMENT_WORKERS = getattr(settings, 'BONDS_ENRICHMENT_WORKERS', 4)
+ENRICHMENT_CONCURRENCY = getattr(settings, 'BONDS_ENRICHMENT_CONCURRENCY', 100)
+ENRICHMENT_BATCH_SIZE = getattr(settings, 'BONDS_ENRICHMENT_BATCH_SIZE', 50)
+ENRICHMENT_POLL_INTERVAL = getattr(settings, 'BONDS_ENRICHMENT_POLL_INTERVAL', 1)
+ENRICHMENT_LEASE = getattr(settings, 'BONDS_ENRICHMENT_LEASE', 5 * 60)
+ENRICHMENT_MAX_ATTEMPTS = getattr(settings, 'BONDS_ENRICHMENT_MAX_ATTEMPTS', 5)
+ENRICHMENT_RETRY_DELAY = getattr(settings, 'BONDS_ENRICHMENT_RETRY_DELAY', 30)
+
+# Requests slower than this, in milliseconds, are logged with their breakdown
+# by bonds.middleware.PerformanceMiddleware
+SLOW_REQUEST_MS = getattr(settings, 'BONDS_SLOW_REQUEST_MS', 500)
+
+# Connection pragmas, mode of the write transactions opened with
+# bonds.utils.write_atomic and lock retries of the bonds.backends.sqlite3
+# database backend. busy_timeout is in milliseconds, a negative cache_size in
+# KiB, the retry delay in seconds and doubled for every attempt
+SQLITE_PRAGMAS = getattr(settings, 'BONDS_SQLITE_PRAGMAS', {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+    "temp_store": "memory",
+})
+SQLITE_TRANSACTION_MODE = getattr(settings, 'BONDS_SQLITE_TRANSACTION_MODE', "IMMEDIATE")
+SQLITE_LOCK_RETRIES = getattr(settings, 'BONDS_SQLITE_LOCK_RETRIES', 5)
+SQLITE_LOCK_RETRY_DELAY = getattr(settings, 'BONDS_SQLITE_LOCK_RETRY_DELAY', 0.05)
+
+# Database aliases of read replicas for GET /bonds/, export and summary
+# requests. Users whose data changed in the last REPLICA_STICKINESS seconds
+# read from the default database instead, REPLICA_STICKINESS_BACKEND names a
+# Django cache alias sharing that between workers.
+READ_REPLICAS = getattr(settings, 'BONDS_READ_REPLICAS', [])
+REPLICA_STICKINESS = getattr(settings, 'BONDS_REPLICA_STICKINESS', 5)
+REPLICA_STICKINESS_SIZE = getattr(settings, 'BONDS_REPLICA_STICKINESS_SIZE', 10000)
+REPLICA_STICKINESS_BACKEND = getattr(settings, 'BONDS_REPLICA_STICKINESS_BACKEND', None)
+
+# Database aliases the users' bonds are spread over, see bonds.sharding.
+# The shard of each user is cached in-process for SHARD_MAP_TTL seconds.
+SHARDS = getattr(settings, 'BONDS_SHARDS', ['default'])
+SHARD_MAP_SIZE = getattr(settings, 'BONDS_SHARD_MAP_SIZE', 10000)
+SHARD_MAP_TTL = getattr(settings, 'BONDS_SHARD_MAP_TTL', 60)
+
 CURRENCY_CODES = {
     "GTQ",
     "AOA",
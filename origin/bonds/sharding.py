@@ -0,0 +1,182 @@
+"""
+Sharding of the bonds by user
+
+Every row that belongs to a user, their bonds, enrichment jobs, portfolio
+aggregates, data version and imports, lives on one of the SHARDS database
+aliases. ShardAssignment, on the default database, records which one; a user
+without an assignment is placed by a hash of their id the first time they
+are seen. The legal entities and their search terms are reference data
+written to every shard, so that bonds can still be joined to them, and
+everything else stays on the default database.
+
+The shard of the current thread is chosen with use_shard, or for a request
+by BondsViewSet once the user is known, and ShardRouter sends the queries of
+the user's models to it. With the default SHARDS of ["default"] sharding is
+disabled and everything stays on the default database.
+
+Assignments are cached by every process for up to SHARD_MAP_TTL seconds, so
+a process may still send a user's queries to their old shard after they
+were moved. Writes are safe from this: atomic checks the assignment once it
+holds the shard's write lock, see bonds.rebalancing.move_user.
+"""
+import threading
+import zlib
+from contextlib import contextmanager
+
+from django.core.signals import request_finished
+from django.db import DEFAULT_DB_ALIAS
+from django.dispatch import receiver
+
+from bonds.cache import MISSING, LRUCache
+from bonds.settings import SHARDS, SHARD_MAP_SIZE, SHARD_MAP_TTL
+from bonds.utils import write_atomic
+
+# Models of the bonds app whose rows are partitioned by user
+SHARDED_MODELS = {"bond", "enrichmentjob", "portfolioaggregate", "userdataversion", "bondimport"}
+
+_local = threading.local()
+
+# User id -> shard alias. Only the process that moves a user drops its entry,
+# other workers keep using the old shard for up to SHARD_MAP_TTL seconds.
+shard_map = LRUCache(SHARD_MAP_SIZE, SHARD_MAP_TTL)
+
+
+class ShardNotSelected(Exception):
+    """
+    Raised when a user's rows are queried before their shard was chosen
+    """
+
+
+class ShardMoved(Exception):
+    """
+    Raised when a user's rows are written to a shard they were moved away
+    from, nothing was written and the next attempt uses the new shard
+    """
+
+
+def is_sharded(model):
+    return model._meta.app_label == "bonds" and model._meta.model_name in SHARDED_MODELS
+
+
+def enabled():
+    return SHARDS != [DEFAULT_DB_ALIAS]
+
+
+def reference_databases():
+    """
+    Databases holding a copy of the legal entities, the default one first
+    """
+    return [DEFAULT_DB_ALIAS] + [alias for alias in SHARDS if alias != DEFAULT_DB_ALIAS]
+
+
+def shard_for(user_id):
+    """
+    Alias of the shard holding a user's rows, assigning one if need be
+    """
+    if not enabled():
+        return DEFAULT_DB_ALIAS
+    shard = shard_map.get(user_id)
+    if shard is not MISSING:
+        return shard
+    shard = assigned_shard(user_id)
+    shard_map.set(user_id, shard)
+    return shard
+
+
+def assigned_shard(user_id):
+    """
+    Shard a user is assigned to on the default database, bypassing shard_map
+    """
+    from bonds.models import ShardAssignment
+    assignment, _ = ShardAssignment.objects.db_manager(DEFAULT_DB_ALIAS).get_or_create(
+        user_id=user_id, defaults={"shard": placement(user_id)}
+    )
+    return assignment.shard
+
+
+def placement(user_id):
+    """
+    Shard of a user without an assignment
+    """
+    return SHARDS[zlib.crc32(str(user_id).encode()) % len(SHARDS)]
+
+
+def select_shard(user):
+    """
+    Send the current thread's queries of user's rows to their shard
+    """
+    _local.shard = shard_for(user.pk)
+    _local.user_id = user.pk
+    return _local.shard
+
+
+def current_shard():
+    shard = getattr(_local, "shard", None)
+    if shard is not None:
+        return shard
+    if not enabled():
+        return DEFAULT_DB_ALIAS
+    raise ShardNotSelected("No shard has been selected for this thread")
+
+
+@contextmanager
+def use_shard(alias, user_id=None):
+    """
+    Send the queries of users' rows to alias while in the block
+
+    user_id is given when alias was chosen for that user's rows, so that
+    atomic can check it still holds them.
+    """
+    previous = getattr(_local, "shard", None), getattr(_local, "user_id", None)
+    _local.shard, _local.user_id = alias, user_id
+    try:
+        yield alias
+    finally:
+        _local.shard, _local.user_id = previous
+
+
+@contextmanager
+def atomic():
+    """
+    write_atomic on the current shard
+
+    When the shard was chosen for a user, their assignment is read again
+    once the transaction holds the shard's write lock. ShardMoved is raised,
+    and the cached assignment dropped, if they were moved in the meantime.
+    """
+    shard = current_shard()
+    user_id = getattr(_local, "user_id", None)
+    with write_atomic(using=shard):
+        if user_id is not None and enabled() and assigned_shard(user_id) != shard:
+            shard_map.delete(user_id)
+            raise ShardMoved(f"User {user_id} is no longer on shard {shard}")
+        yield
+
+
+@receiver(request_finished)
+def _end_request(sender, **kwargs):
+    _local.shard = None
+    _local.user_id = None
+
+
+class ShardRouter:
+    """
+    Database router sending the queries of users' rows to the current shard
+    """
+
+    def _shard(self, model, hints):
+        if not is_sharded(model):
+            return None
+        # Rows reached from a sharded row are on the same shard as it
+        instance = hints.get("instance")
+        if instance is not None and is_sharded(instance) and instance._state.db:
+            return instance._state.db
+        return current_shard()
+
+    def db_for_read(self, model, **hints):
+        shard = self._shard(model, hints)
+        # Leave reads of the default database to the replica router
+        return None if shard == DEFAULT_DB_ALIAS else shard
+
+    def db_for_write(self, model, **hints):
+        return self._shard(model, hints)
@@ -0,0 +1,138 @@
+import datetime
+
+from django.db.models import Case, CharField, Count, Sum, Value, When
+from django.db.models.functions import Cast, ExtractYear
+
+from bonds.models import LegalEntity, PortfolioAggregate
+from bonds.utils import chunked
+
+YEAR = "year"
+TENOR = "tenor"
+BUCKETS = [YEAR, TENOR]
+
+MATURED = "matured"
+# Longest tenor in years, keeping today plus the tenor a valid date
+MAX_TENOR = 100
+
+
+def summarize(queryset, bucket=YEAR, tenors=None):
+    """
+    Total size and number of bonds by currency, issuer and maturity bucket
+
+    Each breakdown is a single GROUP BY over queryset. Maturities are either
+    grouped by year or into tenor buckets, given as a sorted list of whole
+    years from today, e.g. [1, 5] gives "matured", "0-1y", "1-5y" and "5y+".
+    """
+    totals = {"size": Sum("size"), "count": Count("id")}
+
+    total = queryset.aggregate(**totals)
+    by_currency = queryset.values("currency").annotate(**totals).order_by("currency")
+    by_issuer = queryset.values("lei").annotate(**totals).order_by("lei")
+    if bucket == TENOR:
+        by_maturity = (
+            queryset.annotate(bucket=_tenor_bucket(tenors))
+            .values("bucket")
+            .annotate(**totals)
+        )
+        order = _tenor_labels(tenors)
+        by_maturity = sorted(by_maturity, key=lambda row: order.index(row["bucket"]))
+    else:
+        by_maturity = (
+            queryset.annotate(bucket=Cast(ExtractYear("maturity"), CharField()))
+            .values("bucket")
+            .annotate(**totals)
+            .order_by("bucket")
+        )
+
+    return {
+        "total": {"size": total["size"] or 0, "count": total["count"]},
+        "by_currency": list(by_currency),
+        "by_issuer": _with_legal_names(by_issuer),
+        "by_maturity": list(by_maturity),
+    }
+
+
+def summarize_aggregates(user):
+    """
+    Same as summarize() by year over all of a user's bonds, but read from the
+    user's PortfolioAggregate rows rather than from the bonds
+    """
+    aggregates = PortfolioAggregate.objects.filter(user=user).order_by()
+    totals = {"size": Sum("size"), "count": Sum("count")}
+
+    total = aggregates.aggregate(**totals)
+    by_currency = aggregates.values("currency").annotate(**totals).order_by("currency")
+    by_issuer = aggregates.values("lei").annotate(**totals).order_by("lei")
+    by_maturity = (
+        aggregates.values("maturity_year").annotate(**totals).order_by("maturity_year")
+    )
+
+    return {
+        "total": {"size": total["size"] or 0, "count": total["count"] or 0},
+        "by_currency": list(by_currency),
+        "by_issuer": _with_legal_names(by_issuer),
+        "by_maturity": [
+            {"bucket": str(row["maturity_year"]), "size": row["size"], "count": row["count"]}
+            for row in by_maturity
+        ],
+    }
+
+
+def parse_tenors(value):
+    """
+    Parse a comma separated list of tenors in years, raises ValueError if it
+    is not a list of distinct integers from 1 to MAX_TENOR
+    """
+    tenors = sorted(int(tenor) for tenor in value.split(","))
+    if (
+        not tenors
+        or tenors[0] <= 0
+        or tenors[-1] > MAX_TENOR
+        or len(set(tenors)) != len(tenors)
+    ):
+        raise ValueError(f"Invalid tenors {value}")
+    return tenors
+
+
+def _with_legal_names(by_issuer):
+    by_issuer = list(by_issuer)
+    legal_names = {}
+    for batch in chunked([row["lei"] for row in by_issuer], 500):
+        legal_names.update(
+            LegalEntity.objects.filter(lei__in=batch).values_list("lei", "legal_name")
+        )
+    return [
+        {
+            "lei": row["lei"],
+            "legal_name": legal_names.get(row["lei"], ""),
+            "size": row["size"],
+            "count": row["count"],
+        }
+        for row in by_issuer
+    ]
+
+
+def _tenor_labels(tenors):
+    bounds = [0] + tenors
+    return (
+        [MATURED]
+        + [f"{low}-{high}y" for low, high in zip(bounds, bounds[1:])]
+        + [f"{tenors[-1]}y+"]
+    )
+
+
+def _tenor_bucket(tenors):
+    today = datetime.date.today()
+    labels = _tenor_labels(tenors)
+    whens = [When(maturity__lt=today, then=Value(MATURED))]
+    for tenor, label in zip(tenors, labels[1:]):
+        whens.append(When(maturity__lt=_add_years(today, tenor), then=Value(label)))
+    return Case(*whens, default=Value(labels[-1]), output_field=CharField())
+
+
+def _add_years(date, years):
+    try:
+        return date.replace(year=date.year + years)
+    except ValueError:
+        # 29th of February in a year that is not a leap year
+        return date.replace(year=date.year + years, day=28)
@@ -0,0 +1,95 @@
+import json
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from bonds import aggregates
+from bonds import models
+from bonds.cache import lei_cache
+
+
+class PortfolioAggregateTestCase(TestCase):
+
+    def setUp(self):
+        lei_cache.clear()
+        self.user = User(username="test", password="Test_123!")
+        self.user.save()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        models.LegalEntity.objects.create(lei="R0MUWSFPU8MPRO8K5P83", legal_name="Test")
+        models.LegalEntity.objects.create(lei="R0MUWSFPU8MPRO8K5P84", legal_name="Test 2")
+
+    def payload(self, isin, size=100, lei="R0MUWSFPU8MPRO8K5P83", maturity="2020-12-25"):
+        return {
+            "isin": isin,
+            "size": size,
+            "currency": "EUR",
+            "lei": lei,
+            "maturity": maturity
+        }
+
+    def stored(self):
+        return {
+            (row.currency, row.lei, row.maturity_year): (row.size, row.count)
+            for row in models.PortfolioAggregate.objects.filter(user=self.user)
+        }
+
+    def test_create_and_destroy(self):
+        for payload in [
+            self.payload("123451232513"),
+            self.payload("123451232514", size=50),
+            self.payload("123451232515", lei="R0MUWSFPU8MPRO8K5P84", maturity="2021-06-30"),
+        ]:
+            response = self.client.post(
+                reverse("bonds-list"), json.dumps(payload), content_type="application/json"
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.stored(), {
+            ("EUR", "R0MUWSFPU8MPRO8K5P83", 2020): (150, 2),
+            ("EUR", "R0MUWSFPU8MPRO8K5P84", 2021): (100, 1),
+        })
+
+        self.client.delete(reverse("bonds-detail", kwargs={"pk": "123451232513"}))
+        self.client.delete(reverse("bonds-detail", kwargs={"pk": "123451232515"}))
+        self.assertEqual(self.stored(), {
+            ("EUR", "R0MUWSFPU8MPRO8K5P83", 2020): (50, 1),
+        })
+        self.assertEqual(aggregates.verify(), [])
+
+    def test_bulk_create(self):
+        payload = [
+            self.payload("123451232513"),
+            self.payload("123451232514", maturity="2022-01-01"),
+            self.payload("123451232515", lei="R0MUWSFPU8MPRO8K5P84"),
+        ]
+        self.client.post(
+            reverse("bonds-bulk"), json.dumps(payload), content_type="application/json"
+        )
+        self.assertEqual(self.stored(), {
+            ("EUR", "R0MUWSFPU8MPRO8K5P83", 2020): (100, 1),
+            ("EUR", "R0MUWSFPU8MPRO8K5P83", 2022): (100, 1),
+            ("EUR", "R0MUWSFPU8MPRO8K5P84", 2020): (100, 1),
+        })
+        self.assertEqual(aggregates.verify(), [])
+
+    def test_rebuild_aggregates_command(self):
+        self.client.post(
+            reverse("bonds-list"),
+            json.dumps(self.payload("123451232513")),
+            content_type="application/json"
+        )
+        models.PortfolioAggregate.objects.update(size=1)
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_aggregates", "--verify", stdout=StringIO(), stderr=StringIO())
+
+        out = StringIO()
+        call_command("rebuild_aggregates", "--user", "test", stdout=out)
+        self.assertIn("Portfolio aggregates match the bonds", out.getvalue())
+        self.assertEqual(self.stored(), {("EUR", "R0MUWSFPU8MPRO8K5P83", 2020): (100, 1)})
@@ -1,13 +1,21 @@
+import datetime
 import json
 from unittest import mock
 
+import requests
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APIClient
 from rest_framework.reverse import reverse
 from django.contrib.auth.models import User
 
+from bonds import aggregates
+from bonds import bulk
 from bonds import models
+from bonds.cache import lei_cache
 
 class MockResponse:
     def __init__(self, status_code, json_dict):
@@ -21,12 +29,13 @@ class MockResponse:
 class CreateBondTestCase(TestCase):
 
     def setUp(self):
+        lei_cache.clear()
         self.user = User(username="test", password="Test_123!")
         self.user.save()
         self.client = APIClient()
         self.client.force_authenticate(self.user)
 
-    @mock.patch("requests.get")
+    @mock.patch("requests.Session.get")
     def test_create_bond__valid(self, gleif_get):
         gleif_get.return_value = MockResponse(
             status.HTTP_200_OK, 
@@ -45,7 +54,7 @@ class CreateBondTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(len(models.Bond.objects.filter(user=self.user, isin=payload["isin"])) > 0)
 
-    @mock.patch("requests.get")
+    @mock.patch("requests.Session.get")
     def test_create_bond__invalid_lei_api_gives_400(self, gleif_get):
         gleif_get.return_value = MockResponse(
             status.HTTP_400_BAD_REQUEST, 
@@ -64,7 +73,7 @@ class CreateBondTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(len(models.Bond.objects.filter(user=self.user, isin=payload["isin"])), 0)
 
-    @mock.patch("requests.get")
+    @mock.patch("requests.Session.get")
     def test_create_bond__invalid_lei_api_gives_500(self, gleif_get):
         gleif_get.return_value = MockResponse(
             status.HTTP_500_INTERNAL_SERVER_ERROR, 
@@ -86,7 +95,23 @@ class CreateBondTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
         self.assertEqual(len(models.Bond.objects.filter(user=self.user, isin=payload["isin"])), 0)
 
-    @mock.patch("requests.get")
+    @mock.patch("requests.Session.get")
+    def test_create_bond__gleif_timeout(self, gleif_get):
+        gleif_get.side_effect = requests.ReadTimeout("timed out")
+        payload = {
+            "isin": "123451232514",
+            "size": 100,
+            "currency": "EUR",
+            "lei": "R0MUWSFPU8MPRO8K5P83",
+            "maturity": "2020-12-25"
+        }
+        response = self.client.post(
+            reverse("bonds-list"), json.dumps(payload), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(len(models.Bond.objects.filter(user=self.user, isin=payload["isin"])), 0)
+
+    @mock.patch("requests.Session.get")
     def test_create_bond__invalid_lei_missing_field(self, gleif_get):
         gleif_get.return_value = MockResponse(
             status.HTTP_200_OK, 
@@ -104,7 +129,7 @@ class CreateBondTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(len(models.Bond.objects.filter(user=self.user, isin=payload["isin"])), 0)
 
-    @mock.patch("requests.get")
+    @mock.patch("requests.Session.get")
     def test_create_bond__invalid_lei_invalid_isin(self, gleif_get):
         gleif_get.return_value = MockResponse(
             status.HTTP_200_OK, 
@@ -123,7 +148,7 @@ class CreateBondTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(len(models.Bond.objects.filter(user=self.user, isin=payload["isin"])), 0)
     
-    @mock.patch("requests.get")
+    @mock.patch("requests.Session.get")
     def test_create_bond__invalid_lei_duplicate_isin(self, gleif_get):
         gleif_get.return_value = MockResponse(
             status.HTTP_200_OK, 
@@ -145,11 +170,50 @@ class CreateBondTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(len(models.Bond.objects.filter(user=self.user, isin=payload["isin"])), 1)
 
+    @mock.patch("requests.Session.get")
+    def test_create_bond__lei_lookup_is_cached(self, gleif_get):
+        gleif_get.return_value = MockResponse(
+            status.HTTP_200_OK,
+            [{"Entity":{"LegalName":{"$":"Test"}}}]
+        )
+        for isin in ["123451232513", "123451232514"]:
+            payload = {
+                "isin": isin,
+                "size": 100,
+                "currency": "EUR",
+                "lei": "R0MUWSFPU8MPRO8K5P83",
+                "maturity": "2020-12-25"
+            }
+            response = self.client.post(
+                reverse("bonds-list"), json.dumps(payload), content_type="application/json"
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(gleif_get.call_count, 1)
+        self.assertEqual(len(models.Bond.objects.filter(user=self.user)), 2)
+
+    @mock.patch("requests.Session.get")
+    def test_create_bond__unknown_lei_is_cached(self, gleif_get):
+        gleif_get.return_value = MockResponse(status.HTTP_200_OK, [])
+        payload = {
+            "isin": "123451232513",
+            "size": 100,
+            "currency": "EUR",
+            "lei": "R0MUWSFPU8MPRO8K5P83",
+            "maturity": "2020-12-25"
+        }
+        for _ in range(2):
+            response = self.client.post(
+                reverse("bonds-list"), json.dumps(payload), content_type="application/json"
+            )
+            self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(gleif_get.call_count, 1)
+
 
 class ListBondsTestCase(TestCase):
 
-    @mock.patch("requests.get")
+    @mock.patch("requests.Session.get")
     def setUp(self, gleif_get):
+        lei_cache.clear()
         self.user = User(username="test", password="Test_123!")
         self.user.save()
         self.client = APIClient()
@@ -199,13 +263,29 @@ class ListBondsTestCase(TestCase):
             reverse("bonds-list"), json.dumps(payload), content_type="application/json"
         )
 
+    def test_list__same_output_as_serializer(self):
+        models.LegalEntity.objects.filter(lei="R0MUWSFPU8MPRO8K5P84").update(
+            legal_name="Société \u2028 \"Test\""
+        )
+        models.Bond.objects.filter(isin="123451232516").update(
+            legal_entity=None, enrichment_state=models.Bond.PENDING
+        )
+        url = reverse("bonds-list") + "?page_size=3"
+        while url:
+            fast = self.client.get(url)
+            # indent=0 is rendered compactly, by the serializer and JSONRenderer
+            serialized = self.client.get(url, HTTP_ACCEPT="application/json; indent=0")
+            self.assertEqual(fast["Content-Type"], serialized["Content-Type"])
+            self.assertEqual(fast.content, serialized.content)
+            url = fast.json()["next"]
+
     def test_list__all(self):
         response = self.client.get(
             reverse("bonds-list")
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         response_json = response.json()
-        self.assertEqual(len(response_json), 4)
+        self.assertEqual(len(response_json["results"]), 4)
 
     def test_list__filter_by_size(self):
         response = self.client.get(
@@ -213,7 +293,7 @@ class ListBondsTestCase(TestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         response_json = response.json()
-        self.assertEqual(len(response_json), 2)
+        self.assertEqual(len(response_json["results"]), 2)
 
     def test_list__all_by_isin(self):
         response = self.client.get(
@@ -221,7 +301,7 @@ class ListBondsTestCase(TestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         response_json = response.json()
-        self.assertEqual(len(response_json), 1)
+        self.assertEqual(len(response_json["results"]), 1)
 
     def test_list__all_isin_not_present(self):
         response = self.client.get(
@@ -229,7 +309,7 @@ class ListBondsTestCase(TestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         response_json = response.json()
-        self.assertEqual(len(response_json), 0)
+        self.assertEqual(len(response_json["results"]), 0)
 
     def test_list__all_different_user(self):
         new_user = User(username="test-2", password="Test_123!")
@@ -241,7 +321,7 @@ class ListBondsTestCase(TestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         response_json = response.json()
-        self.assertEqual(len(response_json), 0)
+        self.assertEqual(len(response_json["results"]), 0)
 
     def test_list__all_by_currency_and_size(self):
         response = self.client.get(
@@ -249,7 +329,7 @@ class ListBondsTestCase(TestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         response_json = response.json()
-        self.assertEqual(len(response_json), 2)
+        self.assertEqual(len(response_json["results"]), 2)
 
     def test_list__all_by_maturity(self):
         response = self.client.get(
@@ -257,13 +337,166 @@ class ListBondsTestCase(TestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         response_json = response.json()
-        self.assertEqual(len(response_json), 1)
+        self.assertEqual(len(response_json["results"]), 1)
+
+
+    def test_list__by_legal_name(self):
+        models.LegalEntity.objects.filter(lei="R0MUWSFPU8MPRO8K5P84").update(legal_name="Test 2")
+        response = self.client.get(reverse("bonds-list"), {"legal_name": "Test 2"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["results"], [
+            {
+                "isin": "123451232515",
+                "size": 100,
+                "currency": "EUR",
+                "maturity": "2021-12-25",
+                "lei": "R0MUWSFPU8MPRO8K5P84",
+                "legal_name": "Test 2",
+                "enrichment_state": "resolved"
+            },
+            {
+                "isin": "123451232516",
+                "size": 50,
+                "currency": "EUR",
+                "maturity": "2022-12-25",
+                "lei": "R0MUWSFPU8MPRO8K5P84",
+                "legal_name": "Test 2",
+                "enrichment_state": "resolved"
+            },
+        ])
+
+    def test_list__search_legal_name(self):
+        models.LegalEntity.objects.store({"R0MUWSFPU8MPRO8K5P84": "Société Générale S.A."})
+        for query, isins in [
+            ("soc gen", ["123451232515", "123451232516"]),
+            ("GENERALE societe", ["123451232515", "123451232516"]),
+            ("soc test", []),
+            ("tes", ["123451232513", "123451232514"]),
+            ("", ["123451232513", "123451232514", "123451232515", "123451232516"]),
+        ]:
+            with self.subTest(query=query):
+                response = self.client.get(reverse("bonds-list"), {"search": query})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(
+                    [bond["isin"] for bond in response.json()["results"]], isins
+                )
+
+    def test_list__legal_name_prefix(self):
+        models.LegalEntity.objects.store({"R0MUWSFPU8MPRO8K5P84": "Société Générale S.A."})
+        for prefix, isins in [
+            ("SOCIETE gén", ["123451232515", "123451232516"]),
+            ("société générale s.a.", ["123451232515", "123451232516"]),
+            ("generale", []),
+            ("t", ["123451232513", "123451232514"]),
+        ]:
+            with self.subTest(prefix=prefix):
+                response = self.client.get(
+                    reverse("bonds-list"), {"legal_name__prefix": prefix}
+                )
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(
+                    [bond["isin"] for bond in response.json()["results"]], isins
+                )
+
+    def test_list__by_maturity_range(self):
+        response = self.client.get(
+            reverse("bonds-list"), {"maturity__gte": "2021-01-01", "maturity__lte": "2022-12-31"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [bond["isin"] for bond in response.json()["results"]],
+            ["123451232515", "123451232516"]
+        )
+
+    def test_list__by_size_range(self):
+        response = self.client.get(reverse("bonds-list"), {"size__lt": 100})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["results"]), 2)
+
+    def test_list__paginated(self):
+        isins = []
+        response = self.client.get(reverse("bonds-list"), {"page_size": 3})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response_json = response.json()
+            isins.extend(bond["isin"] for bond in response_json["results"])
+            if not response_json["next"]:
+                break
+            response = self.client.get(response_json["next"])
+        self.assertEqual(
+            isins, ["123451232513", "123451232514", "123451232515", "123451232516"]
+        )
+
+    def test_list__paginated_with_filter(self):
+        response = self.client.get(reverse("bonds-list"), {"size": 100, "page_size": 1})
+        response_json = response.json()
+        self.assertEqual([bond["isin"] for bond in response_json["results"]], ["123451232513"])
+        response = self.client.get(response_json["next"])
+        response_json = response.json()
+        self.assertEqual([bond["isin"] for bond in response_json["results"]], ["123451232515"])
+        self.assertIsNone(response_json["next"])
+
+
+    def test_list__ndjson(self):
+        response = self.client.get(reverse("bonds-list"), {"format": "ndjson", "size": 50})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson; charset=utf-8")
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).decode().splitlines()
+        ]
+        self.assertEqual(rows, [
+            {
+                "isin": "123451232514",
+                "size": 50,
+                "currency": "EUR",
+                "maturity": "2020-12-25",
+                "lei": "R0MUWSFPU8MPRO8K5P83",
+                "legal_name": "Test",
+                "enrichment_state": "resolved"
+            },
+            {
+                "isin": "123451232516",
+                "size": 50,
+                "currency": "EUR",
+                "maturity": "2022-12-25",
+                "lei": "R0MUWSFPU8MPRO8K5P84",
+                "legal_name": "Test",
+                "enrichment_state": "resolved"
+            },
+        ])
+
+    def test_export__csv_by_accept_header(self):
+        response = self.client.get(reverse("bonds-export"), HTTP_ACCEPT="text/csv")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="bonds.csv"')
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "isin,size,currency,maturity,lei,legal_name,enrichment_state")
+        self.assertEqual(lines[1], "123451232513,100,EUR,2020-12-25,R0MUWSFPU8MPRO8K5P83,Test,resolved")
+        self.assertEqual(len(lines), 5)
+
+    def test_export__defaults_to_ndjson(self):
+        response = self.client.get(reverse("bonds-export"), {"maturity": "2021-12-25"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)["isin"] for line in lines], ["123451232515"])
+
+    def test_export__different_user(self):
+        new_user = User(username="test-2", password="Test_123!")
+        new_user.save()
+        client = APIClient()
+        client.force_authenticate(new_user)
+        response = client.get(reverse("bonds-export"), {"format": "csv"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
 
 
 class DeleteBondsTestCase(TestCase):
 
-    @mock.patch("requests.get")
+    @mock.patch("requests.Session.get")
     def setUp(self, gleif_get):
+        lei_cache.clear()
         self.user = User(username="test", password="Test_123!")
         self.user.save()
         self.client = APIClient()
@@ -348,4 +581,421 @@ class DeleteBondsTestCase(TestCase):
         response = self.client.delete(
             reverse("bonds-detail", kwargs={"pk": "123451232511"})
         )
-        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_delete__single_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.delete(reverse("bonds-detail", kwargs={"pk": "123451232516"}))
+        bond_queries = [
+            query["sql"] for query in queries.captured_queries
+            if 'FROM "bonds_bond"' in query["sql"] and "bonds_enrichmentjob" not in query["sql"]
+        ]
+        # The aggregates' GROUP BY and the DELETE itself
+        self.assertEqual(len(bond_queries), 2)
+        self.assertTrue(bond_queries[1].startswith('DELETE FROM "bonds_bond"'))
+
+    def test_bulk_delete__filters(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete(
+                reverse("bonds-list") + "?maturity__lt=2021-01-01&currency=EUR"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {"deleted": 2})
+        self.assertEqual(
+            sorted(models.Bond.objects.filter(user=self.user).values_list("isin", flat=True)),
+            ["123451232515", "123451232516"]
+        )
+        deletes = [
+            query["sql"] for query in queries.captured_queries
+            if query["sql"].startswith('DELETE FROM "bonds_bond"')
+        ]
+        self.assertEqual(len(deletes), 1)
+        self.assertEqual(aggregates.verify(), [])
+
+    def test_bulk_delete__isins(self):
+        response = self.client.delete(
+            reverse("bonds-list") + "?currency=EUR",
+            json.dumps({"isins": ["123451232513", "123451232515", "999999999999"]}),
+            content_type="application/json"
+        )
+        self.assertEqual(response.json(), {"deleted": 2})
+        self.assertEqual(models.Bond.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(aggregates.verify(), [])
+
+    def test_bulk_delete__pending_bonds(self):
+        bond = models.Bond.objects.get(isin="123451232516")
+        models.EnrichmentJob.objects.create(bond=bond)
+        response = self.client.delete(reverse("bonds-list") + "?maturity__gte=2022-01-01")
+        self.assertEqual(response.json(), {"deleted": 1})
+        self.assertFalse(models.EnrichmentJob.objects.exists())
+
+    def test_bulk_delete__requires_filter(self):
+        for url, body in [
+            (reverse("bonds-list"), None),
+            (reverse("bonds-list") + "?curency=EUR", None),
+            (reverse("bonds-list"), json.dumps(["123451232513"])),
+            (reverse("bonds-list") + "?size__gt=abc", None),
+            # Blank values are skipped by django-filter
+            (reverse("bonds-list") + "?currency=", None),
+            (reverse("bonds-list") + "?currency=&maturity__lt=", None),
+            # Values without a word would match every issuer
+            (reverse("bonds-list") + "?search=-", None),
+            (reverse("bonds-list") + "?legal_name__prefix=-", None),
+            (reverse("bonds-list") + "?legal_name__prefix=-&currency=EUR", None),
+        ]:
+            with self.subTest(url=url, body=body):
+                response = self.client.delete(url, body, content_type="application/json")
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(models.Bond.objects.filter(user=self.user).count(), 4)
+
+    def test_bulk_delete__legal_name_only(self):
+        models.LegalEntity.objects.store({"R0MUWSFPU8MPRO8K5P84": "Other"})
+        response = self.client.delete(reverse("bonds-list") + "?legal_name__prefix=TE")
+        self.assertEqual(response.json(), {"deleted": 2})
+        response = self.client.delete(reverse("bonds-list") + "?search=oth")
+        self.assertEqual(response.json(), {"deleted": 2})
+        self.assertFalse(models.Bond.objects.filter(user=self.user).exists())
+
+    def test_bulk_delete__other_users_bonds(self):
+        other = User.objects.create(username="test-2", password="Test_123!")
+        models.Bond.objects.create(
+            user=other, isin="123451232513", size=1, currency="EUR",
+            maturity="2020-12-25", lei="R0MUWSFPU8MPRO8K5P83",
+            legal_entity_id="R0MUWSFPU8MPRO8K5P83"
+        )
+        self.client.delete(reverse("bonds-list") + "?currency=EUR")
+        self.assertEqual(models.Bond.objects.filter(user=other).count(), 1)
+
+    def test_delete_user_with_pending_bonds(self):
+        bond = models.Bond.objects.get(isin="123451232516")
+        models.EnrichmentJob.objects.create(bond=bond)
+        self.user.delete()
+        self.assertFalse(models.Bond.objects.exists())
+        self.assertFalse(models.EnrichmentJob.objects.exists())
+
+
+class BulkCreateBondsTestCase(TestCase):
+
+    def setUp(self):
+        lei_cache.clear()
+        self.user = User(username="test", password="Test_123!")
+        self.user.save()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def payload(self, isin, lei="R0MUWSFPU8MPRO8K5P83", **kwargs):
+        payload = {
+            "isin": isin,
+            "size": 100,
+            "currency": "EUR",
+            "lei": lei,
+            "maturity": "2020-12-25"
+        }
+        payload.update(kwargs)
+        return payload
+
+    @mock.patch("requests.Session.get")
+    def test_bulk_create__valid(self, gleif_get):
+        gleif_get.return_value = MockResponse(
+            status.HTTP_200_OK,
+            [
+                {"LEI":{"$":"R0MUWSFPU8MPRO8K5P83"},"Entity":{"LegalName":{"$":"Test"}}},
+                {"LEI":{"$":"R0MUWSFPU8MPRO8K5P84"},"Entity":{"LegalName":{"$":"Test 2"}}}
+            ]
+        )
+        payload = [
+            self.payload("123451232513"),
+            self.payload("123451232514"),
+            self.payload("123451232515", lei="R0MUWSFPU8MPRO8K5P84"),
+        ]
+        response = self.client.post(
+            reverse("bonds-bulk"), json.dumps(payload), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["created"], 3)
+        # Both LEIs are resolved in a single GLEIF query
+        self.assertEqual(gleif_get.call_count, 1)
+        self.assertEqual(
+            gleif_get.call_args[0][0].split("?lei=")[1],
+            "R0MUWSFPU8MPRO8K5P83,R0MUWSFPU8MPRO8K5P84"
+        )
+        self.assertEqual(
+            models.Bond.objects.get(user=self.user, isin="123451232515").legal_entity.legal_name,
+            "Test 2"
+        )
+
+    @mock.patch("requests.Session.get")
+    def test_bulk_create__reports_row_errors(self, gleif_get):
+        gleif_get.return_value = MockResponse(status.HTTP_200_OK, [])
+        models.Bond.objects.create(
+            user=self.user,
+            isin="123451232510",
+            size=100,
+            currency="EUR",
+            maturity="2020-12-25",
+            lei="R0MUWSFPU8MPRO8K5P83",
+            legal_entity=models.LegalEntity.objects.create(
+                lei="R0MUWSFPU8MPRO8K5P83", legal_name="Test"
+            )
+        )
+        payload = [
+            self.payload("123451232513"),
+            self.payload("akdjslakda"),
+            self.payload("123451232513"),
+            self.payload("123451232510"),
+            self.payload("123451232514", lei="R0MUWSFPU8MPRO8K5P84"),
+            # Too large for an SQLite INTEGER
+            dict(self.payload("123451232515"), size=10 ** 20),
+        ]
+        response = self.client.post(
+            reverse("bonds-bulk"), json.dumps(payload), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response_json = response.json()
+        self.assertEqual(response_json["created"], 1)
+        self.assertEqual(response_json["failed"], 5)
+        self.assertEqual(
+            [result["status"] for result in response_json["results"]],
+            ["created", "error", "error", "error", "error", "error"]
+        )
+        self.assertIn("isin", response_json["results"][1]["errors"])
+        self.assertIn("lei", response_json["results"][4]["errors"])
+        self.assertIn("size", response_json["results"][5]["errors"])
+        self.assertEqual(len(models.Bond.objects.filter(user=self.user)), 2)
+
+    def test_bulk_create__isin_created_concurrently(self):
+        models.LegalEntity.objects.create(lei="R0MUWSFPU8MPRO8K5P83", legal_name="Test")
+        prepare_bonds = bulk.prepare_bonds
+
+        def prepare_then_race(user, rows):
+            prepared = prepare_bonds(user, rows)
+            # Another request creates one of the bonds once they were checked
+            models.Bond.objects.create(
+                user=user, isin="123451232514", size=1, currency="EUR",
+                maturity="2020-12-25", lei="R0MUWSFPU8MPRO8K5P83",
+                legal_entity_id="R0MUWSFPU8MPRO8K5P83"
+            )
+            return prepared
+
+        payload = [self.payload("123451232513"), self.payload("123451232514")]
+        with mock.patch.object(bulk, "prepare_bonds", prepare_then_race):
+            response = self.client.post(
+                reverse("bonds-bulk"), json.dumps(payload), content_type="application/json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["created"], 1)
+        self.assertEqual(
+            response.json()["results"][1]["errors"],
+            {"non_field_errors": [bulk.DUPLICATE_ISIN]}
+        )
+        self.assertEqual(models.Bond.objects.get(isin="123451232514").size, 1)
+
+    @mock.patch("requests.Session.get")
+    def test_bulk_create__gleif_unavailable(self, gleif_get):
+        gleif_get.return_value = MockResponse(
+            status.HTTP_500_INTERNAL_SERVER_ERROR,
+            {"message": "500 Internal Server Error"}
+        )
+        response = self.client.post(
+            reverse("bonds-bulk"),
+            json.dumps([self.payload("123451232513")]),
+            content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(len(models.Bond.objects.filter(user=self.user)), 0)
+
+    def test_bulk_create__not_a_list(self):
+        response = self.client.post(
+            reverse("bonds-bulk"),
+            json.dumps(self.payload("123451232513")),
+            content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SummaryTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User(username="test", password="Test_123!")
+        self.user.save()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        bnp = models.LegalEntity.objects.create(
+            lei="R0MUWSFPU8MPRO8K5P83", legal_name="BNPPARIBAS"
+        )
+        sg = models.LegalEntity.objects.create(
+            lei="O2RNE8IBXP4R0TD8PU41", legal_name="SOCIETEGENERALE"
+        )
+        today = datetime.date.today()
+        self.maturities = [
+            today - datetime.timedelta(days=200),
+            today + datetime.timedelta(days=2 * 365),
+            today + datetime.timedelta(days=20 * 365),
+        ]
+        for isin, size, currency, entity, maturity in [
+            ("123451232513", 100, "EUR", bnp, self.maturities[0]),
+            ("123451232514", 50, "EUR", bnp, self.maturities[1]),
+            ("123451232515", 200, "USD", sg, self.maturities[1]),
+            ("123451232516", 25, "GBP", sg, self.maturities[2]),
+        ]:
+            models.Bond.objects.create(
+                user=self.user,
+                isin=isin,
+                size=size,
+                currency=currency,
+                maturity=maturity,
+                lei=entity.lei,
+                legal_entity=entity
+            )
+        aggregates.rebuild()
+
+    def test_summary__by_year(self):
+        response = self.client.get(reverse("bonds-summary"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response_json = response.json()
+        self.assertEqual(response_json["total"], {"size": 375, "count": 4})
+        self.assertEqual(response_json["by_currency"], [
+            {"currency": "EUR", "size": 150, "count": 2},
+            {"currency": "GBP", "size": 25, "count": 1},
+            {"currency": "USD", "size": 200, "count": 1},
+        ])
+        self.assertEqual(response_json["by_issuer"], [
+            {"lei": "O2RNE8IBXP4R0TD8PU41", "legal_name": "SOCIETEGENERALE", "size": 225, "count": 2},
+            {"lei": "R0MUWSFPU8MPRO8K5P83", "legal_name": "BNPPARIBAS", "size": 150, "count": 2},
+        ])
+        self.assertEqual(response_json["by_maturity"], [
+            {"bucket": str(self.maturities[0].year), "size": 100, "count": 1},
+            {"bucket": str(self.maturities[1].year), "size": 250, "count": 2},
+            {"bucket": str(self.maturities[2].year), "size": 25, "count": 1},
+        ])
+
+    def test_summary__by_tenor(self):
+        response = self.client.get(
+            reverse("bonds-summary"), {"bucket": "tenor", "tenors": "1,5,10"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["by_maturity"], [
+            {"bucket": "matured", "size": 100, "count": 1},
+            {"bucket": "1-5y", "size": 250, "count": 2},
+            {"bucket": "10y+", "size": 25, "count": 1},
+        ])
+
+    def test_summary__with_filters(self):
+        response = self.client.get(reverse("bonds-summary"), {"currency": "EUR"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response_json = response.json()
+        self.assertEqual(response_json["total"], {"size": 150, "count": 2})
+        self.assertEqual(
+            response_json["by_currency"], [{"currency": "EUR", "size": 150, "count": 2}]
+        )
+
+    def test_summary__different_user(self):
+        new_user = User(username="test-2", password="Test_123!")
+        new_user.save()
+        client = APIClient()
+        client.force_authenticate(new_user)
+        response = client.get(reverse("bonds-summary"))
+        self.assertEqual(response.json()["total"], {"size": 0, "count": 0})
+
+    def test_summary__aggregates_match_bonds(self):
+        from_aggregates = self.client.get(reverse("bonds-summary")).json()
+        # Any filter makes the summary go over the bonds themselves
+        from_bonds = self.client.get(reverse("bonds-summary"), {"size__gt": 0}).json()
+        self.assertEqual(from_aggregates, from_bonds)
+
+    def test_summary__invalid_tenors(self):
+        for tenors in ["5,abc", "0,5", "5,5", "10000", "1," + "9" * 400]:
+            with self.subTest(tenors=tenors):
+                response = self.client.get(
+                    reverse("bonds-summary"), {"bucket": "tenor", "tenors": tenors}
+                )
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConditionalRequestTestCase(TestCase):
+
+    def setUp(self):
+        lei_cache.clear()
+        self.user = User(username="test", password="Test_123!")
+        self.user.save()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        models.LegalEntity.objects.create(lei="R0MUWSFPU8MPRO8K5P83", legal_name="Test")
+
+    def create(self, isin):
+        payload = {
+            "isin": isin,
+            "size": 100,
+            "currency": "EUR",
+            "lei": "R0MUWSFPU8MPRO8K5P83",
+            "maturity": "2020-12-25"
+        }
+        response = self.client.post(
+            reverse("bonds-list"), json.dumps(payload), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_not_modified(self):
+        self.create("123451232513")
+        response = self.client.get(reverse("bonds-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Cache-Control"], "private, no-cache")
+        self.assertNotIn("Last-Modified", response)
+        etag = response["ETag"]
+
+        # Only the version counter is read before answering
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("bonds-list"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_etag_changes_with_bonds(self):
+        etags = [self.client.get(reverse("bonds-list"))["ETag"]]
+        self.create("123451232513")
+        etags.append(self.client.get(reverse("bonds-list"))["ETag"])
+        self.client.delete(reverse("bonds-detail", kwargs={"pk": "123451232513"}))
+        etags.append(self.client.get(reverse("bonds-list"))["ETag"])
+        self.assertEqual(len(set(etags)), 3)
+
+        response = self.client.get(reverse("bonds-list"), HTTP_IF_NONE_MATCH=etags[1])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_etag_depends_on_format(self):
+        self.create("123451232513")
+        json_etag = self.client.get(reverse("bonds-list"))["ETag"]
+        response = self.client.get(
+            reverse("bonds-list"), {"format": "ndjson"}, HTTP_IF_NONE_MATCH=json_etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], json_etag)
+
+    def test_rename_changes_etag(self):
+        self.create("123451232513")
+        etag = self.client.get(reverse("bonds-list"))["ETag"]
+        models.LegalEntity.objects.store({"R0MUWSFPU8MPRO8K5P83": "Renamed"})
+        response = self.client.get(reverse("bonds-list"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_summary_not_modified(self):
+        self.create("123451232513")
+        etag = self.client.get(reverse("bonds-summary"))["ETag"]
+        response = self.client.get(reverse("bonds-summary"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_tenor_summary_etag_changes_with_date(self):
+        self.create("123451232513")
+        params = {"bucket": "tenor"}
+        with mock.patch("bonds.views.datetime") as views_datetime:
+            date = views_datetime.date
+            date.today.return_value = datetime.date(2020, 12, 1)
+            etag = self.client.get(reverse("bonds-summary"), params)["ETag"]
+            response = self.client.get(
+                reverse("bonds-summary"), params, HTTP_IF_NONE_MATCH=etag
+            )
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+            date.today.return_value = datetime.date(2020, 12, 2)
+            response = self.client.get(
+                reverse("bonds-summary"), params, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
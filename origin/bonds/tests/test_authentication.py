@@ -0,0 +1,65 @@
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from bonds.authentication import TokenCache, token_cache
+from bonds.cache import MISSING
+
+
+class CachedTokenAuthenticationTestCase(TestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create(username="test", password="Test_123!")
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_token_is_looked_up_once(self):
+        self.assertEqual(self.client.get(reverse("bonds-list")).status_code, status.HTTP_200_OK)
+        self.assertIsNot(token_cache.get(self.token.key), MISSING)
+
+        # Only the data version and the bonds are queried from now on
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("bonds-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get(reverse("bonds-list"))
+        self.token.delete()
+        self.assertIs(token_cache.get(self.token.key), MISSING)
+        response = self.client.get(reverse("bonds-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get(reverse("bonds-list"))
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(reverse("bonds-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalid_token_is_not_cached(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token invalid")
+        response = self.client.get(reverse("bonds-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIs(token_cache.get("invalid"), MISSING)
+
+    def test_shared_backend(self):
+        caches["default"].clear()
+        writer = TokenCache(max_size=10, ttl=60, backend="default")
+        reader = TokenCache(max_size=10, ttl=60, backend="default")
+        writer.set(self.token.key, self.token)
+        self.assertEqual(reader.get(self.token.key).user, self.user)
+        # The password hash never reaches the shared cache
+        self.assertNotIn(
+            self.user.password, str(caches["default"].get(TokenCache.key_prefix + self.token.key))
+        )
+        self.assertIn("password", reader.get(self.token.key).user.get_deferred_fields())
+
+        writer.delete(self.token.key)
+        other = TokenCache(max_size=10, ttl=60, backend="default")
+        self.assertIs(other.get(self.token.key), MISSING)
@@ -0,0 +1,92 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from unittest import mock
+
+from django.db import OperationalError, connection, transaction
+from django.test import SimpleTestCase
+from prometheus_client import REGISTRY
+
+from bonds.backends.sqlite3 import base
+from bonds.utils import write_atomic
+
+
+class SQLiteBackendTestCase(SimpleTestCase):
+    """
+    Connections of the production backend to a database file, outside of the
+    in-memory test database
+    """
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.name = os.path.join(directory, "db.sqlite3")
+        self.execute("CREATE TABLE bond (isin TEXT)")
+
+    def connect(self):
+        wrapper = base.DatabaseWrapper({
+            **connection.settings_dict, "NAME": self.name, "TEST": {}
+        }, alias="sqlite-backend-test")
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def execute(self, sql):
+        with self.connect().cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchone()
+
+    def hold_write_lock(self, seconds):
+        # A second process writing, seen through a plain sqlite3 connection
+        writer = sqlite3.connect(self.name, isolation_level=None, check_same_thread=False)
+        self.addCleanup(writer.close)
+        writer.execute("BEGIN IMMEDIATE")
+        release = threading.Timer(seconds, writer.execute, ["COMMIT"])
+        release.start()
+        self.addCleanup(release.join)
+
+    def test_pragmas(self):
+        self.assertEqual(self.execute("PRAGMA journal_mode"), ("wal",))
+        # NORMAL
+        self.assertEqual(self.execute("PRAGMA synchronous"), (1,))
+        self.assertEqual(self.execute("PRAGMA busy_timeout"), (5000,))
+        self.assertEqual(self.execute("PRAGMA foreign_keys"), (1,))
+
+    def insert_elsewhere(self):
+        other = sqlite3.connect(self.name, timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+        other.execute("INSERT INTO bond VALUES ('123451232513')")
+
+    def test_write_transactions_take_the_write_lock(self):
+        wrapper = self.connect()
+        with mock.patch("django.db.transaction.get_connection", return_value=wrapper):
+            with write_atomic():
+                with self.assertRaisesMessage(sqlite3.OperationalError, "database is locked"):
+                    self.insert_elsewhere()
+        self.assertFalse(wrapper.begin_immediate)
+
+    def test_other_transactions_start_deferred(self):
+        wrapper = self.connect()
+        with mock.patch("django.db.transaction.get_connection", return_value=wrapper):
+            with transaction.atomic():
+                with wrapper.cursor() as cursor:
+                    cursor.execute("SELECT COUNT(*) FROM bond")
+                self.insert_elsewhere()
+
+    @mock.patch.object(base, "SQLITE_LOCK_RETRY_DELAY", 0.05)
+    @mock.patch.object(base, "SQLITE_PRAGMAS", {"busy_timeout": 10})
+    def test_retries_while_locked(self):
+        retries = REGISTRY.get_sample_value("bonds_db_lock_retries_total") or 0
+        self.hold_write_lock(0.2)
+        self.execute("INSERT INTO bond VALUES ('123451232513')")
+        self.assertEqual(self.execute("SELECT COUNT(*) FROM bond"), (1,))
+        self.assertGreater(REGISTRY.get_sample_value("bonds_db_lock_retries_total"), retries)
+
+    @mock.patch.object(base, "SQLITE_LOCK_RETRIES", 1)
+    @mock.patch.object(base, "SQLITE_LOCK_RETRY_DELAY", 0.01)
+    @mock.patch.object(base, "SQLITE_PRAGMAS", {"busy_timeout": 10})
+    def test_gives_up_after_retries(self):
+        self.hold_write_lock(1)
+        with self.assertRaisesMessage(OperationalError, "database is locked"):
+            self.execute("INSERT INTO bond VALUES ('123451232513')")
@@ -0,0 +1,76 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase
+
+from bonds.cache import MISSING, LRUCache, LEICache
+
+
+class LRUCacheTestCase(TestCase):
+    def test_get__missing(self):
+        cache = LRUCache(max_size=2, ttl=60)
+        self.assertIs(cache.get("a"), MISSING)
+        self.assertEqual(cache.misses, 1)
+
+    def test_get__stores_none(self):
+        cache = LRUCache(max_size=2, ttl=60)
+        cache.set("a", None)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.hits, 1)
+
+    def test_set__evicts_least_recently_used(self):
+        cache = LRUCache(max_size=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIs(cache.get("b"), MISSING)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.evictions, 1)
+
+    @mock.patch("bonds.cache.time.monotonic")
+    def test_get__expired(self, monotonic):
+        monotonic.return_value = 100
+        cache = LRUCache(max_size=2, ttl=60)
+        cache.set("a", 1)
+        monotonic.return_value = 161
+        self.assertIs(cache.get("a"), MISSING)
+        self.assertEqual(len(cache), 0)
+
+
+class LEICacheTestCase(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+
+    @mock.patch("bonds.cache.time.monotonic")
+    def test_negative_entries_use_negative_ttl(self, monotonic):
+        monotonic.return_value = 100
+        cache = LEICache(max_size=10, ttl=60, negative_ttl=10)
+        cache.set("R0MUWSFPU8MPRO8K5P83", None)
+        self.assertIsNone(cache.get("R0MUWSFPU8MPRO8K5P83"))
+        monotonic.return_value = 111
+        self.assertIs(cache.get("R0MUWSFPU8MPRO8K5P83"), MISSING)
+
+    def test_shared_backend(self):
+        writer = LEICache(max_size=10, ttl=60, negative_ttl=10, backend="default")
+        reader = LEICache(max_size=10, ttl=60, negative_ttl=10, backend="default")
+        writer.set("R0MUWSFPU8MPRO8K5P83", "BNPPARIBAS")
+        writer.set("R0MUWSFPU8MPRO8K5P84", None)
+
+        self.assertEqual(reader.get("R0MUWSFPU8MPRO8K5P83"), "BNPPARIBAS")
+        self.assertIsNone(reader.get("R0MUWSFPU8MPRO8K5P84"))
+        self.assertIs(reader.get("R0MUWSFPU8MPRO8K5P85"), MISSING)
+        # Second read is served from the in-process LRU
+        self.assertEqual(reader.get("R0MUWSFPU8MPRO8K5P83"), "BNPPARIBAS")
+        self.assertEqual(
+            reader.stats(),
+            {
+                "hits": 3,
+                "misses": 1,
+                "local_hits": 1,
+                "shared_hits": 2,
+                "evictions": 0,
+                "size": 2,
+            }
+        )
@@ -0,0 +1,175 @@
+import json
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from bonds import enrichment
+from bonds import gleif
+from bonds import models
+from bonds.cache import lei_cache
+from bonds.tests.test_api import MockResponse
+
+
+@mock.patch("bonds.views.ASYNC_ENRICHMENT", True)
+class AsyncEnrichmentTestCase(TestCase):
+
+    def setUp(self):
+        lei_cache.clear()
+        self.user = User(username="test", password="Test_123!")
+        self.user.save()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_bond(self, isin, lei="R0MUWSFPU8MPRO8K5P83"):
+        payload = {
+            "isin": isin,
+            "size": 100,
+            "currency": "EUR",
+            "lei": lei,
+            "maturity": "2020-12-25"
+        }
+        return self.client.post(
+            reverse("bonds-list"), json.dumps(payload), content_type="application/json"
+        )
+
+    @mock.patch("requests.Session.get")
+    def test_create__saves_pending_bond_without_calling_gleif(self, gleif_get):
+        response = self.create_bond("123451232513")
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        gleif_get.assert_not_called()
+        bond = models.Bond.objects.get(user=self.user, isin="123451232513")
+        self.assertEqual(bond.enrichment_state, models.Bond.PENDING)
+        self.assertIsNone(bond.legal_entity)
+        self.assertTrue(models.EnrichmentJob.objects.filter(bond=bond).exists())
+
+    @mock.patch("requests.Session.get")
+    def test_create__cached_lei_is_resolved_immediately(self, gleif_get):
+        models.LegalEntity.objects.create(lei="R0MUWSFPU8MPRO8K5P83", legal_name="Test")
+        response = self.create_bond("123451232513")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        bond = models.Bond.objects.get(user=self.user, isin="123451232513")
+        self.assertEqual(bond.enrichment_state, models.Bond.RESOLVED)
+        self.assertEqual(bond.legal_entity.legal_name, "Test")
+
+    @mock.patch("requests.Session.get")
+    def test_deleting_bonds_deletes_their_jobs(self, gleif_get):
+        self.create_bond("123451232513")
+        self.create_bond("123451232514")
+        models.Bond.objects.get(isin="123451232513").delete()
+        self.assertEqual(
+            list(models.EnrichmentJob.objects.values_list("bond__isin", flat=True)),
+            ["123451232514"]
+        )
+        models.Bond.objects.filter(user=self.user).delete()
+        self.assertFalse(models.EnrichmentJob.objects.exists())
+
+    @mock.patch("requests.Session.get")
+    def test_process_jobs__resolves_pending_bonds(self, gleif_get):
+        gleif_get.return_value = MockResponse(
+            status.HTTP_200_OK,
+            [{"LEI":{"$":"R0MUWSFPU8MPRO8K5P83"},"Entity":{"LegalName":{"$":"Test"}}}]
+        )
+        self.create_bond("123451232513")
+        self.create_bond("123451232514")
+        self.create_bond("123451232515", lei="R0MUWSFPU8MPRO8K5P84")
+
+        self.assertEqual(enrichment.process_jobs(), 3)
+        self.assertEqual(gleif_get.call_count, 1)
+        self.assertEqual(models.EnrichmentJob.objects.count(), 0)
+
+        response = self.client.get(reverse("bonds-list"), {"enrichment_state": "resolved"})
+        self.assertEqual(
+            sorted(bond["isin"] for bond in response.json()["results"]),
+            ["123451232513", "123451232514"]
+        )
+        response = self.client.get(reverse("bonds-list"), {"enrichment_state": "failed"})
+        self.assertEqual([bond["isin"] for bond in response.json()["results"]], ["123451232515"])
+
+    @mock.patch("bonds.enrichment.ENRICHMENT_MAX_ATTEMPTS", 2)
+    @mock.patch("requests.Session.get")
+    def test_process_jobs__retries_until_max_attempts(self, gleif_get):
+        gleif_get.return_value = MockResponse(
+            status.HTTP_500_INTERNAL_SERVER_ERROR, {"message": "500 Internal Server Error"}
+        )
+        self.create_bond("123451232513")
+
+        self.assertEqual(enrichment.process_jobs(), 1)
+        job = models.EnrichmentJob.objects.get()
+        self.assertEqual(job.attempts, 1)
+        # The job is not due again until its retry delay has passed
+        self.assertEqual(enrichment.process_jobs(), 0)
+
+        models.EnrichmentJob.objects.update(available_at=timezone.now())
+        self.assertEqual(enrichment.process_jobs(), 1)
+        self.assertEqual(models.EnrichmentJob.objects.count(), 0)
+        self.assertEqual(
+            models.Bond.objects.get(isin="123451232513").enrichment_state,
+            models.Bond.FAILED
+        )
+
+    @mock.patch("requests.Session.get")
+    def test_retry__keeps_a_lease_taken_since(self, gleif_get):
+        self.create_bond("123451232513")
+        job, = enrichment.claim_jobs(1)
+        # The lease ran out and another worker claimed the job
+        models.EnrichmentJob.objects.update(locked_by="other", attempts=3)
+
+        enrichment._retry(job, "GLEIF responded with status 500")
+        stored = models.EnrichmentJob.objects.get()
+        self.assertEqual((stored.locked_by, stored.attempts, stored.last_error), ("other", 3, ""))
+
+    @mock.patch.object(gleif.AsyncGleifClient, "get_records")
+    def test_async_worker__resolves_pending_bonds(self, get_records):
+        async def records(leis):
+            return [
+                {"LEI": {"$": "R0MUWSFPU8MPRO8K5P83"}, "Entity": {"LegalName": {"$": "Test"}}}
+            ]
+        get_records.side_effect = records
+        self.create_bond("123451232513")
+        self.create_bond("123451232514", lei="R0MUWSFPU8MPRO8K5P84")
+
+        out = StringIO()
+        call_command("run_enrichment_workers", "--asyncio", "--once", stdout=out)
+        self.assertEqual(out.getvalue(), "Processed 2 enrichment jobs\n")
+        self.assertEqual(models.EnrichmentJob.objects.count(), 0)
+        self.assertEqual(
+            dict(models.Bond.objects.values_list("isin", "enrichment_state")),
+            {"123451232513": models.Bond.RESOLVED, "123451232514": models.Bond.FAILED}
+        )
+
+    @mock.patch("bonds.bulk.ASYNC_ENRICHMENT", True)
+    @mock.patch("requests.Session.get")
+    def test_bulk__saves_unknown_leis_as_pending(self, gleif_get):
+        models.LegalEntity.objects.create(lei="R0MUWSFPU8MPRO8K5P83", legal_name="Test")
+        rows = [
+            {
+                "isin": isin,
+                "size": 100,
+                "currency": "EUR",
+                "lei": lei,
+                "maturity": "2020-12-25"
+            }
+            for isin, lei in [
+                ("123451232513", "R0MUWSFPU8MPRO8K5P83"),
+                ("123451232514", "R0MUWSFPU8MPRO8K5P84"),
+            ]
+        ]
+        response = self.client.post(
+            reverse("bonds-bulk"), json.dumps(rows), content_type="application/json"
+        )
+        self.assertEqual(response.json()["created"], 2)
+        gleif_get.assert_not_called()
+        self.assertEqual(
+            dict(models.Bond.objects.values_list("isin", "enrichment_state")),
+            {"123451232513": models.Bond.RESOLVED, "123451232514": models.Bond.PENDING}
+        )
+        self.assertEqual(
+            models.EnrichmentJob.objects.get().bond.isin, "123451232514"
+        )
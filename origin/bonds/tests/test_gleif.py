@@ -0,0 +1,135 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import requests
+from django.test import TestCase
+
+from bonds import gleif
+from bonds.cache import lei_cache
+from bonds.tests.test_api import MockResponse
+
+
+class FlakyGleifHandler(BaseHTTPRequestHandler):
+    """
+    Fails the first `failures` requests with a 503, then returns one record
+    """
+    protocol_version = "HTTP/1.1"
+    failures = 0
+    requests_seen = 0
+    client_ports = set()
+
+    def do_GET(self):
+        handler = type(self)
+        handler.requests_seen += 1
+        handler.client_ports.add(self.client_address[1])
+        if handler.requests_seen <= handler.failures:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = json.dumps([{
+            "LEI": {"$": "R0MUWSFPU8MPRO8K5P83"},
+            "Entity": {"LegalName": {"$": "BNPPARIBAS"}}
+        }]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class GleifClientTestCase(TestCase):
+
+    def setUp(self):
+        lei_cache.clear()
+        FlakyGleifHandler.requests_seen = 0
+        FlakyGleifHandler.client_ports = set()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyGleifHandler)
+        self.server.daemon_threads = True
+        threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        ).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api/v2/leirecords"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get_legal_names_async(self, leis, **kwargs):
+        async def get_legal_names():
+            client = gleif.AsyncGleifClient(**kwargs)
+            try:
+                return await client.get_legal_names(leis)
+            finally:
+                await client.aclose()
+        return asyncio.run(get_legal_names())
+
+    def test_get_legal_names__retries_server_errors(self):
+        FlakyGleifHandler.failures = 2
+        client = gleif.GleifClient(url=self.url, max_retries=2, backoff_factor=0)
+        self.assertEqual(
+            client.get_legal_names(["R0MUWSFPU8MPRO8K5P83"]),
+            {"R0MUWSFPU8MPRO8K5P83": "BNPPARIBAS"}
+        )
+        self.assertEqual(FlakyGleifHandler.requests_seen, 3)
+
+    def test_get_legal_names__gives_up_after_max_retries(self):
+        FlakyGleifHandler.failures = 3
+        client = gleif.GleifClient(url=self.url, max_retries=1, backoff_factor=0)
+        with self.assertRaises(gleif.GleifUnavailable):
+            client.get_legal_names(["R0MUWSFPU8MPRO8K5P83"])
+        self.assertEqual(FlakyGleifHandler.requests_seen, 2)
+
+    def test_get_legal_names__reuses_connection(self):
+        FlakyGleifHandler.failures = 0
+        client = gleif.GleifClient(url=self.url)
+        for _ in range(3):
+            client.get_legal_names(["R0MUWSFPU8MPRO8K5P83"])
+        self.assertEqual(FlakyGleifHandler.requests_seen, 3)
+        self.assertEqual(len(FlakyGleifHandler.client_ports), 1)
+
+    @mock.patch("requests.Session.get")
+    def test_get_records__uses_timeouts(self, gleif_get):
+        gleif_get.return_value = MockResponse(200, [])
+        client = gleif.GleifClient(url=self.url, connect_timeout=1, read_timeout=2)
+        client.get_records(["R0MUWSFPU8MPRO8K5P83"])
+        self.assertEqual(gleif_get.call_args[1]["timeout"], (1, 2))
+
+    @mock.patch("requests.Session.get")
+    def test_get_records__connection_error(self, gleif_get):
+        gleif_get.side_effect = requests.ConnectTimeout("timed out")
+        client = gleif.GleifClient(url=self.url)
+        with self.assertRaises(gleif.GleifUnavailable):
+            client.get_records(["R0MUWSFPU8MPRO8K5P83"])
+
+    def test_async_get_legal_names__retries_server_errors(self):
+        FlakyGleifHandler.failures = 2
+        self.assertEqual(
+            self.get_legal_names_async(
+                ["R0MUWSFPU8MPRO8K5P83"], url=self.url, max_retries=2, backoff_factor=0
+            ),
+            {"R0MUWSFPU8MPRO8K5P83": "BNPPARIBAS"}
+        )
+        self.assertEqual(FlakyGleifHandler.requests_seen, 3)
+
+    def test_async_get_legal_names__gives_up_after_max_retries(self):
+        FlakyGleifHandler.failures = 3
+        with self.assertRaises(gleif.GleifUnavailable):
+            self.get_legal_names_async(
+                ["R0MUWSFPU8MPRO8K5P83"], url=self.url, max_retries=1, backoff_factor=0
+            )
+        self.assertEqual(FlakyGleifHandler.requests_seen, 2)
+
+    def test_async_get_records__connection_error(self):
+        # Nothing listens on the discard port
+        with self.assertRaises(gleif.GleifUnavailable):
+            self.get_legal_names_async(
+                ["R0MUWSFPU8MPRO8K5P83"], url="http://127.0.0.1:9/api/v2/leirecords",
+                max_retries=0
+            )
@@ -0,0 +1,123 @@
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from bonds import models
+from bonds.cache import MISSING, lei_cache
+
+CSV = (
+    'LEI,Entity.LegalName,Entity.LegalName.xmllang,Registration.RegistrationStatus\n'
+    'R0MUWSFPU8MPRO8K5P83,BNP PARIBAS,fr,ISSUED\n'
+    '529900T8BM49AURSDO55,"Deutsche Börse, AG",de,ISSUED\n'
+    'INVALID,Skipped,en,ISSUED\n'
+)
+
+XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<lei:LEIData xmlns:lei="http://www.gleif.org/data/schema/leidata/2016">
+  <lei:LEIHeader><lei:RecordCount>2</lei:RecordCount></lei:LEIHeader>
+  <lei:LEIRecords>
+    <lei:LEIRecord>
+      <lei:LEI>R0MUWSFPU8MPRO8K5P83</lei:LEI>
+      <lei:Entity>
+        <lei:LegalName xml:lang="fr">BNP PARIBAS SA</lei:LegalName>
+        <lei:OtherEntityNames>
+          <lei:OtherEntityName type="PREVIOUS_LEGAL_NAME">BNP</lei:OtherEntityName>
+        </lei:OtherEntityNames>
+      </lei:Entity>
+    </lei:LEIRecord>
+    <lei:LEIRecord>
+      <lei:LEI>213800D1EI4B9WTWWD28</lei:LEI>
+      <lei:Entity><lei:LegalName>Test Ltd</lei:LegalName></lei:Entity>
+    </lei:LEIRecord>
+  </lei:LEIRecords>
+</lei:LEIData>
+'''
+
+
+class LoadGoldenCopyTestCase(TestCase):
+
+    def setUp(self):
+        lei_cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return path
+
+    def load(self, *paths):
+        out = StringIO()
+        call_command("load_golden_copy", *paths, "--chunk-size", "2", stdout=out)
+        return out.getvalue()
+
+    def names(self):
+        return dict(models.LegalEntity.objects.values_list("lei", "legal_name"))
+
+    def test_load_csv_then_zipped_xml_delta(self):
+        out = self.load(self.write("golden-copy.csv", CSV))
+        self.assertIn("3 records", out)
+        self.assertIn("2 inserted or renamed, 1 skipped", out)
+        self.assertEqual(self.names(), {
+            "R0MUWSFPU8MPRO8K5P83": "BNP PARIBAS",
+            "529900T8BM49AURSDO55": "Deutsche Börse, AG",
+        })
+
+        path = os.path.join(self.directory, "delta.xml.zip")
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("delta.xml", XML)
+        self.load(path)
+        self.assertEqual(self.names(), {
+            "R0MUWSFPU8MPRO8K5P83": "BNP PARIBAS SA",
+            "529900T8BM49AURSDO55": "Deutsche Börse, AG",
+            "213800D1EI4B9WTWWD28": "Test Ltd",
+        })
+
+    def test_delta_clears_cached_names(self):
+        models.LegalEntity.objects.create(lei="R0MUWSFPU8MPRO8K5P83", legal_name="BNP")
+        lei_cache.set("R0MUWSFPU8MPRO8K5P83", "BNP")
+        lei_cache.set("213800D1EI4B9WTWWD28", None)
+        self.load(self.write("delta.xml", XML))
+        self.assertIs(lei_cache.get("R0MUWSFPU8MPRO8K5P83"), MISSING)
+        self.assertIs(lei_cache.get("213800D1EI4B9WTWWD28"), MISSING)
+
+    def test_invalid_file(self):
+        with self.assertRaises(CommandError):
+            self.load(self.write("golden-copy.csv", "lei,name\n"))
+        with self.assertRaises(CommandError):
+            self.load(self.write("golden-copy.xml", "<lei:LEIData"))
+
+    @mock.patch("requests.Session.get")
+    def test_create_resolves_from_loaded_records(self, gleif_get):
+        self.load(self.write("golden-copy.csv", CSV))
+        user = User.objects.create(username="test", password="Test_123!")
+        client = APIClient()
+        client.force_authenticate(user)
+        payload = {
+            "isin": "123451232513",
+            "size": 100,
+            "currency": "EUR",
+            "lei": "R0MUWSFPU8MPRO8K5P83",
+            "maturity": "2020-12-25"
+        }
+        response = client.post(
+            reverse("bonds-list"), json.dumps(payload), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        gleif_get.assert_not_called()
+        self.assertEqual(
+            client.get(reverse("bonds-list")).json()["results"][0]["legal_name"], "BNP PARIBAS"
+        )
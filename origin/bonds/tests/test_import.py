@@ -0,0 +1,136 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from rest_framework import status
+
+from bonds import aggregates
+from bonds import importing
+from bonds import models
+from bonds.cache import lei_cache
+from bonds.tests.test_api import MockResponse
+
+LEIS = ["R0MUWSFPU8MPRO8K5P83", "R0MUWSFPU8MPRO8K5P84"]
+
+
+def gleif_records(url, **kwargs):
+    leis = url.split("lei=")[1].split(",")
+    return MockResponse(status.HTTP_200_OK, [
+        {"LEI": {"$": lei}, "Entity": {"LegalName": {"$": f"Issuer {lei[-2:]}"}}}
+        for lei in leis
+    ])
+
+
+class ImportBondsTestCase(TestCase):
+
+    def setUp(self):
+        lei_cache.clear()
+        self.user = User(username="test", password="Test_123!")
+        self.user.save()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as file:
+            file.write(content)
+        return path
+
+    def csv(self, rows):
+        lines = ["isin,size,currency,maturity,lei"]
+        lines += [f"{isin},100,EUR,2020-12-25,{LEIS[i % 2]}" for i, isin in enumerate(rows)]
+        return self.write("bonds.csv", "\n".join(lines) + "\n")
+
+    def run_import(self, path, *args):
+        out = StringIO()
+        err = StringIO()
+        call_command("import_bonds", path, "--user", "test", *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    @mock.patch("requests.Session.get", side_effect=gleif_records)
+    def test_import_csv(self, gleif_get):
+        path = self.csv([f"1234512325{i:02}" for i in range(5)] + ["bad"])
+        out, err = self.run_import(path, "--chunk-size", "2")
+
+        self.assertEqual(models.Bond.objects.filter(user=self.user).count(), 5)
+        self.assertEqual(
+            models.LegalEntity.objects.get(lei=LEIS[1]).legal_name, "Issuer 84"
+        )
+        # Both LEIs are resolved by the first chunk
+        self.assertEqual(gleif_get.call_count, 1)
+        self.assertIn("Committed rows 5-6: 1 created, 1 failed", out)
+        self.assertIn("Imported 6 rows", out)
+        self.assertIn("rows/s", out)
+        self.assertIn("Row 6: ", err)
+        self.assertEqual(aggregates.verify(), [])
+
+    @mock.patch("requests.Session.get", side_effect=gleif_records)
+    def test_import_json_and_ndjson(self, gleif_get):
+        bonds = [
+            {"isin": f"1234512325{i:02}", "size": 100, "currency": "EUR",
+             "maturity": "2020-12-25", "lei": LEIS[0]}
+            for i in range(4)
+        ]
+        self.run_import(self.write("bonds.json", json.dumps(bonds[:2], indent=2)))
+        self.run_import(self.write(
+            "bonds.ndjson", "\n".join(json.dumps(bond) for bond in bonds[2:]) + "\n"
+        ))
+        self.assertEqual(models.Bond.objects.filter(user=self.user).count(), 4)
+
+    @mock.patch("requests.Session.get")
+    def test_resume_after_failure(self, gleif_get):
+        path = self.csv([f"1234512325{i:02}" for i in range(4)])
+        # The second chunk has an LEI that has not been seen, and GLEIF is down
+        with open(path, "a") as file:
+            file.write("123451232599,100,EUR,2020-12-25,R0MUWSFPU8MPRO8K5P85\n")
+        gleif_get.side_effect = [
+            gleif_records(f"?lei={','.join(LEIS)}"),
+            MockResponse(status.HTTP_503_SERVICE_UNAVAILABLE, {}),
+        ]
+
+        with self.assertRaises(CommandError):
+            self.run_import(path, "--chunk-size", "4")
+        self.assertEqual(models.Bond.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(models.BondImport.objects.get(user=self.user).rows, 4)
+
+        gleif_get.side_effect = None
+        gleif_get.return_value = MockResponse(
+            status.HTTP_200_OK, [{"Entity": {"LegalName": {"$": "Test 3"}}}]
+        )
+        out, err = self.run_import(path, "--chunk-size", "4")
+        self.assertIn("Resuming after row 4", out)
+        self.assertIn("Imported 1 rows", out)
+        self.assertEqual(err, "")
+        self.assertEqual(models.Bond.objects.filter(user=self.user).count(), 5)
+
+        # Everything has been imported, restarting only finds duplicates
+        out, err = self.run_import(path, "--restart")
+        self.assertIn("0 created, 5 failed", out)
+
+
+class ReadRowsTestCase(TestCase):
+
+    def test_json_array_read_in_small_pieces(self):
+        rows = [{"isin": str(i), "nested": {"list": [1, 2, "]"]}} for i in range(10)]
+        file = io.StringIO(json.dumps(rows))
+        self.assertEqual(list(importing._iter_json_array(file, read_size=7)), rows)
+
+    def test_json_must_be_an_array(self):
+        with self.assertRaises(importing.ImportFormatError):
+            list(importing.read_rows(io.StringIO('{"isin": "1"}'), importing.JSON))
+
+    def test_truncated_json(self):
+        with self.assertRaises(importing.ImportFormatError):
+            list(importing.read_rows(io.StringIO('[{"isin": "1"}, {"isin"'), importing.JSON))
+
+    def test_invalid_ndjson_line_is_a_row(self):
+        rows = list(importing.read_rows(io.StringIO('{"isin": "1"}\nnope\n\n'), importing.NDJSON))
+        self.assertEqual(rows, [{"isin": "1"}, "nope"])
@@ -0,0 +1,83 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from prometheus_client import REGISTRY
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from bonds.cache import lei_cache
+from bonds.tests.test_api import MockResponse
+
+
+class MetricsTestCase(TestCase):
+
+    def setUp(self):
+        lei_cache.clear()
+        self.user = User.objects.create(username="test", password="Test_123!")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_request_metrics(self):
+        count = self.sample(
+            "bonds_request_duration_seconds_count", route="bonds-list", method="GET", status="200"
+        )
+        queries = self.sample("bonds_request_db_queries_sum", route="bonds-list")
+        self.client.get(reverse("bonds-list"))
+        self.assertEqual(
+            self.sample(
+                "bonds_request_duration_seconds_count",
+                route="bonds-list", method="GET", status="200"
+            ),
+            count + 1
+        )
+        # Data version and bonds
+        self.assertEqual(self.sample("bonds_request_db_queries_sum", route="bonds-list"), queries + 2)
+
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        content = response.content.decode()
+        self.assertIn(
+            'bonds_request_duration_seconds_bucket{le="0.005",method="GET",route="bonds-list",status="200"}',
+            content
+        )
+        self.assertIn("bonds_requests_in_progress 1.0", content)
+
+    @mock.patch("requests.Session.get")
+    def test_gleif_and_lei_cache_metrics(self, gleif_get):
+        gleif_get.return_value = MockResponse(status.HTTP_503_SERVICE_UNAVAILABLE, {})
+        errors = self.sample("bonds_gleif_errors_total", reason="status")
+        lookups = self.sample("bonds_gleif_request_duration_seconds_count")
+        misses = self.sample("bonds_lei_cache_lookups_total", result="miss")
+        payload = {
+            "isin": "123451232513",
+            "size": 100,
+            "currency": "EUR",
+            "lei": "R0MUWSFPU8MPRO8K5P83",
+            "maturity": "2020-12-25"
+        }
+        response = self.client.post(
+            reverse("bonds-list"), json.dumps(payload), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(self.sample("bonds_gleif_errors_total", reason="status"), errors + 1)
+        self.assertEqual(self.sample("bonds_gleif_request_duration_seconds_count"), lookups + 1)
+        self.assertEqual(self.sample("bonds_lei_cache_lookups_total", result="miss"), misses + 1)
+
+    def test_multiprocess_mode(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with mock.patch.dict(os.environ, {"prometheus_multiproc_dir": directory}):
+            response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Nothing has been written to the directory by any worker
+        self.assertEqual(response.content, b"")
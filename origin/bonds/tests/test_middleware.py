@@ -0,0 +1,67 @@
+import json
+import re
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from bonds.authentication import token_cache
+from bonds.cache import lei_cache
+from bonds.tests.test_api import MockResponse
+
+
+@override_settings(MIDDLEWARE=settings.MIDDLEWARE + ["bonds.middleware.PerformanceMiddleware"])
+class PerformanceMiddlewareTestCase(TestCase):
+
+    def setUp(self):
+        lei_cache.clear()
+        token_cache.clear()
+        self.user = User.objects.create(username="test", password="Test_123!")
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def phases(self, response):
+        return {
+            metric.split(";")[0]: metric for metric in response["Server-Timing"].split(", ")
+        }
+
+    @mock.patch("requests.Session.get")
+    def test_server_timing(self, gleif_get):
+        gleif_get.return_value = MockResponse(
+            status.HTTP_200_OK, [{"Entity": {"LegalName": {"$": "Test"}}}]
+        )
+        payload = {
+            "isin": "123451232513",
+            "size": 100,
+            "currency": "EUR",
+            "lei": "R0MUWSFPU8MPRO8K5P83",
+            "maturity": "2020-12-25"
+        }
+        response = self.client.post(
+            reverse("bonds-list"), json.dumps(payload), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        phases = self.phases(response)
+        self.assertEqual(
+            set(phases), {"auth", "gleif", "validation", "db", "render", "total"}
+        )
+        self.assertRegex(phases["gleif"], r'^gleif;dur=[0-9.]+;desc="1"$')
+        self.assertRegex(phases["total"], r"^total;dur=[0-9.]+$")
+
+    def test_query_count(self):
+        response = self.client.get(reverse("bonds-list"))
+        # Token, data version and bonds
+        self.assertIn('desc="3"', self.phases(response)["db"])
+
+    @mock.patch("bonds.middleware.SLOW_REQUEST_MS", 0)
+    def test_slow_requests_are_logged(self):
+        with self.assertLogs("bonds.performance", "WARNING") as logs:
+            self.client.get(reverse("bonds-list"))
+        self.assertEqual(len(logs.output), 1)
+        self.assertTrue(re.search(r"Slow request GET /bonds/ 200 took .*db=[0-9.]+ms/3", logs.output[0]))
@@ -1,8 +1,11 @@
+import re
+
 from django.test import TestCase
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
 
 from bonds import models
+from bonds.filters import BondFilter
 
 class CustomValidatorsTestCase(TestCase):
     def test_positive_validator__valid(self):
@@ -46,8 +49,7 @@ class BondModelTestCase(TestCase):
             size = 100,
             currency = "EUR",
             maturity = "2020-12-25",
-            lei = "12312312312312312312",
-            legal_name = "test legal name"
+            lei = "12312312312312312312"
         )
         assert str(bond) == "isin: 123456781234, user: 1"
 
@@ -59,7 +61,10 @@ class BondModelTestCase(TestCase):
             maturity = "2020-12-25",
             currency = "EUR",
             lei = "12312312312312312312",
-            legal_name = "test legal name"
+            legal_entity = models.LegalEntity.objects.create(
+                lei = "12312312312312312312",
+                legal_name = "test legal name"
+            )
         )
         bond.save()
 
@@ -70,8 +75,7 @@ class BondModelTestCase(TestCase):
             size = 100,
             maturity = "2020-12-25",
             currency = "EUR",
-            lei = "1231231231231231231a",
-            legal_name = "test legal name"
+            lei = "1231231231231231231a"
         )
         with self.assertRaises(ValidationError) as e:
             bond.full_clean()
@@ -83,8 +87,83 @@ class BondModelTestCase(TestCase):
             size = 100,
             maturity = "2020-12-25",
             currency = "EUR",
-            lei = "12312312312312312312",
-            legal_name = "test legal name"
+            lei = "12312312312312312312"
         )
         with self.assertRaises(ValidationError) as e:
-            bond.full_clean()
\ No newline at end of file
+            bond.full_clean()
+
+
+class LegalEntityTestCase(TestCase):
+    def test_store__creates_and_renames(self):
+        models.LegalEntity.objects.create(lei="12312312312312312312", legal_name="old name")
+        models.LegalEntity.objects.store({
+            "12312312312312312312": "new name",
+            "12312312312312312313": "other name",
+        })
+        self.assertEqual(
+            dict(models.LegalEntity.objects.values_list("lei", "legal_name")),
+            {
+                "12312312312312312312": "new name",
+                "12312312312312312313": "other name",
+            }
+        )
+
+    def test_store__indexes_search_terms(self):
+        models.LegalEntity.objects.create(lei="12312312312312312312", legal_name="Old Name")
+        models.LegalEntity.objects.store({
+            "12312312312312312312": "Société Générale",
+            "12312312312312312313": "BNP Paribas",
+        })
+        self.assertEqual(
+            dict(models.LegalEntity.objects.values_list("lei", "search_name")),
+            {
+                "12312312312312312312": "societe generale",
+                "12312312312312312313": "bnp paribas",
+            }
+        )
+        self.assertEqual(
+            set(models.LegalNameTerm.objects.values_list("legal_entity", "term")),
+            {
+                ("12312312312312312312", "societe"),
+                ("12312312312312312312", "generale"),
+                ("12312312312312312313", "bnp"),
+                ("12312312312312312313", "paribas"),
+            }
+        )
+
+
+class FilterIndexTestCase(TestCase):
+    """
+    Every list filter should be answered from an index led by user rather
+    than by scanning all of the user's bonds
+    """
+    values = {
+        "isin": "123456781234",
+        "size": 100,
+        "lei": "12312312312312312312",
+        "legal_name": "test legal name",
+        "maturity": "2020-12-25",
+        "currency": "EUR",
+        "enrichment_state": models.Bond.RESOLVED,
+    }
+    # Issuers are looked up by name first, then the user's bonds pointing at them
+    columns = {"legal_name": "legal_entity_id"}
+    operators = {"exact": "=", "lt": "<", "lte": "<", "gt": ">", "gte": ">"}
+
+    def test_filters_use_user_index(self):
+        user = User.objects.create_user(username="test")
+        for name, filter in BondFilter.base_filters.items():
+            with self.subTest(filter=name):
+                field = filter.field_name
+                filterset = BondFilter(
+                    {name: self.values[field]},
+                    queryset=models.Bond.objects.filter(user=user)
+                )
+                self.assertTrue(filterset.is_valid())
+                self.assertRegex(
+                    filterset.qs.explain(),
+                    rf"USING (COVERING )?INDEX \w+ \(user_id=\? AND "
+                    rf"{self.columns.get(field, field)}"
+                    rf"{re.escape(self.operators[filter.lookup_expr])}"
+                )
+
@@ -0,0 +1,124 @@
+import json
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from bonds import models
+from bonds import replication
+from bonds.cache import lei_cache
+
+
+@mock.patch.object(replication, "READ_REPLICAS", ["replica"])
+class ReplicaRoutingTestCase(TransactionTestCase):
+    # The replica mirrors the test database, so it only sees committed rows
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        lei_cache.clear()
+        replication.recent_writers.clear()
+        self.user = User.objects.create(username="test", password="Test_123!")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        models.LegalEntity.objects.create(lei="R0MUWSFPU8MPRO8K5P83", legal_name="Test")
+        models.Bond.objects.create(
+            user=self.user,
+            isin="123451232513",
+            size=100,
+            currency="EUR",
+            maturity="2020-12-25",
+            lei="R0MUWSFPU8MPRO8K5P83",
+            legal_entity_id="R0MUWSFPU8MPRO8K5P83",
+        )
+
+    def request(self, method, url, *args, **kwargs):
+        """
+        Returns the response and the number of queries sent to each database
+        """
+        with CaptureQueriesContext(connections["default"]) as primary:
+            with CaptureQueriesContext(connections["replica"]) as replica:
+                response = getattr(self.client, method)(url, *args, **kwargs)
+        return response, len(primary), len(replica)
+
+    def test_reads_go_to_replica(self):
+        for url in [reverse("bonds-list"), reverse("bonds-summary")]:
+            with self.subTest(url=url):
+                response, primary, replica = self.request("get", url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(primary, 0)
+                self.assertGreater(replica, 0)
+
+        response, primary, replica = self.request("get", reverse("bonds-list"))
+        self.assertEqual(
+            [bond["isin"] for bond in response.json()["results"]], ["123451232513"]
+        )
+
+    def test_writer_reads_own_writes_from_primary(self):
+        other = User.objects.create(username="other", password="Test_123!")
+        response, primary, replica = self.request(
+            "post",
+            reverse("bonds-list"),
+            json.dumps({
+                "isin": "123451232514",
+                "size": 100,
+                "currency": "EUR",
+                "lei": "R0MUWSFPU8MPRO8K5P83",
+                "maturity": "2020-12-25"
+            }),
+            content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(replica, 0)
+
+        response, primary, replica = self.request("get", reverse("bonds-list"))
+        self.assertEqual(replica, 0)
+        self.assertEqual(len(response.json()["results"]), 2)
+
+        self.client.force_authenticate(other)
+        response, primary, replica = self.request("get", reverse("bonds-list"))
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_writes_go_to_primary(self):
+        response, primary, replica = self.request(
+            "delete", reverse("bonds-detail", kwargs={"pk": "123451232513"})
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(replica, 0)
+        self.assertFalse(models.Bond.objects.exists())
+
+    def test_routing_ends_with_the_request(self):
+        self.client.get(reverse("bonds-list"))
+        self.assertIsNone(replication.current_replica())
+        self.assertEqual(models.Bond.objects.all().db, "default")
+
+
+class RecentWritersTestCase(SimpleTestCase):
+
+    def test_expiry(self):
+        writers = replication.RecentWriters(max_size=10, ttl=60)
+        writers.add([1, 2])
+        self.assertIn(1, writers)
+        self.assertNotIn(3, writers)
+
+        writers = replication.RecentWriters(max_size=10, ttl=0)
+        writers.add([1])
+        self.assertNotIn(1, writers)
+
+
+class SyncReplicasTestCase(SimpleTestCase):
+
+    @mock.patch("bonds.management.commands.sync_replicas.READ_REPLICAS", [])
+    def test_requires_replicas(self):
+        with self.assertRaises(CommandError):
+            call_command("sync_replicas", stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command("sync_replicas", "unknown", stdout=StringIO())
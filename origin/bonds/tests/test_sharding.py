@@ -0,0 +1,183 @@
+import json
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from bonds import aggregates
+from bonds import models
+from bonds import rebalancing
+from bonds import sharding
+from bonds.cache import lei_cache
+
+
+class ShardingTestCase(TestCase):
+    databases = {"default", "shard1"}
+
+    def setUp(self):
+        # Patched here rather than on the class so that setUp sees the shards
+        patcher = mock.patch.object(sharding, "SHARDS", ["default", "shard1"])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        lei_cache.clear()
+        sharding.shard_map.clear()
+        self.alice = User.objects.create(username="alice", password="Test_123!")
+        self.bob = User.objects.create(username="bob", password="Test_123!")
+        models.ShardAssignment.objects.create(user=self.alice, shard="default")
+        models.ShardAssignment.objects.create(user=self.bob, shard="shard1")
+        models.LegalEntity.objects.store({"R0MUWSFPU8MPRO8K5P83": "Société Générale"})
+        self.client = APIClient()
+
+    def create(self, user, *isins):
+        response = self.post(user, *isins)
+        self.assertEqual(response.json()["created"], len(isins))
+
+    def post(self, user, *isins):
+        self.client.force_authenticate(user)
+        return self.client.post(
+            reverse("bonds-bulk"),
+            json.dumps([
+                {
+                    "isin": isin,
+                    "size": 100,
+                    "currency": "EUR",
+                    "lei": "R0MUWSFPU8MPRO8K5P83",
+                    "maturity": "2020-12-25"
+                }
+                for isin in isins
+            ]),
+            content_type="application/json"
+        )
+
+    def listed(self, user, **params):
+        self.client.force_authenticate(user)
+        response = self.client.get(reverse("bonds-list"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [bond["isin"] for bond in response.json()["results"]]
+
+    def stored(self, alias, user):
+        return list(
+            models.Bond.objects.using(alias).filter(user=user).order_by("isin")
+            .values_list("isin", flat=True)
+        )
+
+    def test_bonds_stay_on_their_users_shard(self):
+        self.create(self.alice, "123451232513")
+        self.create(self.bob, "123451232514")
+
+        self.assertEqual(self.stored("default", self.alice), ["123451232513"])
+        self.assertEqual(self.stored("shard1", self.bob), ["123451232514"])
+        self.assertEqual(self.stored("default", self.bob), [])
+        self.assertEqual(self.listed(self.alice), ["123451232513"])
+        self.assertEqual(self.listed(self.bob), ["123451232514"])
+        # Legal names are joined from the copy on the bond's shard
+        self.assertEqual(self.listed(self.bob, search="soc gen"), ["123451232514"])
+
+        self.client.force_authenticate(self.bob)
+        response = self.client.get(reverse("bonds-summary"))
+        self.assertEqual(response.json()["total"], {"size": 100, "count": 1})
+
+    def test_new_users_are_placed_by_hash(self):
+        carol = User.objects.create(username="carol", password="Test_123!")
+        self.listed(carol)
+        self.assertEqual(
+            models.ShardAssignment.objects.get(user=carol).shard, sharding.placement(carol.pk)
+        )
+
+    def test_shard_must_be_selected(self):
+        with self.assertRaises(sharding.ShardNotSelected):
+            models.Bond.objects.count()
+        with sharding.use_shard("shard1"):
+            self.assertEqual(models.Bond.objects.count(), 0)
+
+    def test_move_user(self):
+        self.create(self.alice, "123451232513", "123451232514")
+        with sharding.use_shard("default"):
+            bond = models.Bond.objects.get(isin="123451232514")
+            models.EnrichmentJob.objects.create(bond=bond)
+            version = models.UserDataVersion.objects.current(self.alice)[0]
+
+        self.assertEqual(rebalancing.move_user(self.alice.pk, "shard1"), 2)
+
+        self.assertEqual(sharding.shard_for(self.alice.pk), "shard1")
+        self.assertEqual(self.stored("default", self.alice), [])
+        self.assertEqual(self.stored("shard1", self.alice), ["123451232513", "123451232514"])
+        self.assertEqual(self.listed(self.alice), ["123451232513", "123451232514"])
+        with sharding.use_shard("shard1"):
+            self.assertEqual(
+                models.EnrichmentJob.objects.get().bond.isin, "123451232514"
+            )
+            self.assertGreater(models.UserDataVersion.objects.current(self.alice)[0], version)
+            self.assertEqual(aggregates.verify([self.alice]), [])
+            self.assertTrue(models.PortfolioAggregate.objects.filter(user=self.alice).exists())
+
+    def test_stale_placement_cannot_write_to_the_old_shard(self):
+        self.create(self.alice, "123451232513")
+        rebalancing.move_user(self.alice.pk, "shard1")
+        # Another process that still has the user on their old shard
+        sharding.shard_map.set(self.alice.pk, "default")
+
+        response = self.post(self.alice, "123451232514")
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(self.stored("default", self.alice), [])
+
+        # The stale entry was dropped, so the retry reaches the new shard
+        self.create(self.alice, "123451232514")
+        self.assertEqual(self.stored("shard1", self.alice), ["123451232513", "123451232514"])
+        # And moving the user back keeps every bond
+        rebalancing.move_user(self.alice.pk, "default")
+        self.assertEqual(self.stored("default", self.alice), ["123451232513", "123451232514"])
+
+    def test_rebalance_shards_command(self):
+        carol = User.objects.create(username="carol", password="Test_123!")
+        models.ShardAssignment.objects.create(user=carol, shard="default")
+        self.create(self.alice, "123451232513", "123451232514", "123451232515")
+        self.create(carol, "123451232516")
+
+        out = StringIO()
+        call_command("rebalance_shards", "--dry-run", stdout=out)
+        self.assertEqual(out.getvalue(), "carol: default -> shard1 (1 bonds)\n")
+        self.assertEqual(sharding.shard_for(carol.pk), "default")
+
+        call_command("rebalance_shards", stdout=StringIO())
+        self.assertEqual(sharding.shard_for(carol.pk), "shard1")
+        self.assertEqual(self.stored("shard1", carol), ["123451232516"])
+
+        call_command("rebalance_shards", "--user", "alice", "--to", "shard1", stdout=StringIO())
+        self.assertEqual(self.stored("shard1", self.alice), [
+            "123451232513", "123451232514", "123451232515"
+        ])
+
+    def test_sync_reference_data_command(self):
+        # Stored before shard1 was added
+        with mock.patch.object(sharding, "SHARDS", ["default"]):
+            models.LegalEntity.objects.store({"7LTWFZYICNSX8D621K86": "Deutsche Bank AG"})
+        self.assertFalse(
+            models.LegalEntity.objects.using("shard1").filter(lei="7LTWFZYICNSX8D621K86").exists()
+        )
+
+        out = StringIO()
+        call_command("sync_reference_data", stdout=out)
+        self.assertEqual(out.getvalue(), "shard1: 1 legal entities inserted or renamed\n")
+        self.assertEqual(
+            models.LegalEntity.objects.using("shard1").get(lei="7LTWFZYICNSX8D621K86").legal_name,
+            "Deutsche Bank AG"
+        )
+        self.assertEqual(
+            sorted(
+                models.LegalNameTerm.objects.using("shard1")
+                .filter(legal_entity="7LTWFZYICNSX8D621K86").values_list("term", flat=True)
+            ),
+            ["ag", "bank", "deutsche"]
+        )
+
+    def test_deleting_user_deletes_their_shard_rows(self):
+        self.create(self.bob, "123451232514")
+        self.bob.delete()
+        self.assertFalse(models.Bond.objects.using("shard1").exists())
+        self.assertFalse(models.UserDataVersion.objects.using("shard1").exists())
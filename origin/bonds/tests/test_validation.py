@@ -0,0 +1,66 @@
+import datetime
+
+from django.test import SimpleTestCase
+from rest_framework.exceptions import ValidationError
+
+from bonds.serializers import BulkBondSerializer
+from bonds.validation import validate_rows
+
+VALID = {
+    "isin": "123451232513",
+    "size": 100,
+    "currency": "EUR",
+    "maturity": "2020-12-25",
+    "lei": "R0MUWSFPU8MPRO8K5P83",
+}
+
+# Values of each field that the fast checks must treat exactly like the serializer
+VALUES = {
+    "isin": ["US0378331005", "us0378331005", "US037833100", " US0378331005",
+             "US03783310055", "US037833100\x00", 123451232513, None, ""],
+    "size": [1, 0, -5, "100", "0100", "100.0", " 100", "1e3", 1.5, True, "", None,
+             "9" * 20, 2 ** 63 - 1, 2 ** 63, 10 ** 20, str(2 ** 63 - 1), str(2 ** 63)],
+    "currency": ["EUR", "eur", " EUR", "EURO", "XX", 1, None],
+    "maturity": ["2020-12-25", "2020-2-5", "2020-02-30", "20201225", " 2020-12-25",
+                 "2020-12-25T00:00", datetime.date(2020, 12, 25),
+                 datetime.datetime(2020, 12, 25), None],
+    "lei": ["R0MUWSFPU8MPRO8K5P83", "r0muwsfpu8mpro8k5p83", "R0MUWSFPU8MPRO8K5P8", None],
+}
+
+
+class ValidateRowsTestCase(SimpleTestCase):
+
+    def expected(self, row):
+        try:
+            return BulkBondSerializer().run_validation(row), None
+        except ValidationError as e:
+            return None, e.detail
+
+    def test_matches_serializer(self):
+        rows = [dict(VALID, **{field: value}) for field, values in VALUES.items() for value in values]
+        rows += [{key: value for key, value in VALID.items() if key != "size"}, [], "row", None]
+        validated, errors = validate_rows(rows)
+        for index, row in enumerate(rows):
+            data, detail = self.expected(row)
+            with self.subTest(row=row):
+                self.assertEqual(validated.get(index), data)
+                self.assertEqual(errors.get(index), detail)
+
+    def test_row_order(self):
+        rows = [dict(VALID, size="1.0"), dict(VALID), dict(VALID, size=0)]
+        validated, errors = validate_rows(rows)
+        self.assertEqual(list(validated), [0, 1])
+        self.assertEqual(list(errors), [2])
+
+    def test_large_batch(self):
+        rows = [dict(VALID, isin=f"US{i:010}", size=str(i + 1)) for i in range(10000)]
+        validated, errors = validate_rows(rows)
+        self.assertEqual(errors, {})
+        self.assertEqual(len(validated), 10000)
+        self.assertEqual(validated[5], {
+            "isin": "US0000000005",
+            "size": 6,
+            "currency": "EUR",
+            "maturity": datetime.date(2020, 12, 25),
+            "lei": "R0MUWSFPU8MPRO8K5P83",
+        })
@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+class RequestTimings:
+    """
+    Time spent in each phase of a request, and the number of times each
+    phase was entered
+
+    Phases can overlap, the queries run while validating a bond count
+    towards both "validation" and "db".
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = defaultdict(float)
+        self.counts = Counter()
+
+    def add(self, phase, duration):
+        self.durations[phase] += duration
+        self.counts[phase] += 1
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def header(self, total):
+        """
+        Value of a Server-Timing header, durations are in milliseconds
+        """
+        metrics = []
+        for phase, duration in self.durations.items():
+            metrics.append(
+                f'{phase};dur={duration * 1000:.1f};desc="{self.counts[phase]}"'
+            )
+        metrics.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(metrics)
+
+    def breakdown(self):
+        return " ".join(
+            f"{phase}={duration * 1000:.1f}ms/{self.counts[phase]}"
+            for phase, duration in self.durations.items()
+        )
+
+
+def start():
+    """
+    Start recording the phases of the current thread's request
+    """
+    _local.timings = RequestTimings()
+    return _local.timings
+
+
+def stop():
+    _local.timings = None
+
+
+def current():
+    return getattr(_local, "timings", None)
+
+
+@contextmanager
+def phase(name):
+    """
+    Add the time spent in the block to phase name of the current request,
+    does nothing outside of a recorded request
+    """
+    timings = current()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def time_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper recording queries in the "db" phase
+    """
+    with phase("db"):
+        return execute(sql, params, many, context)
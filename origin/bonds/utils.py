@@ -0,0 +1,34 @@
+from contextlib import contextmanager
+from itertools import islice
+
+from django.db import transaction
+
+
+def chunked(iterable, size):
+    """
+    Yield successive lists of at most size items from iterable
+    """
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+@contextmanager
+def write_atomic(using=None):
+    """
+    transaction.atomic for a transaction that writes
+
+    With bonds.backends.sqlite3 the outermost such transaction starts with
+    BEGIN IMMEDIATE, taking the write lock before its first read, while
+    other transactions start deferred. Other backends ignore the flag.
+    """
+    connection = transaction.get_connection(using)
+    previous = getattr(connection, "begin_immediate", False)
+    connection.begin_immediate = True
+    try:
+        with transaction.atomic(using=using):
+            yield
+    finally:
+        connection.begin_immediate = previous
@@ -0,0 +1,95 @@
+import datetime
+import re
+
+from rest_framework.exceptions import ValidationError
+
+from bonds.serializers import MAX_SIZE, BulkBondSerializer
+from bonds.settings import CURRENCY_CODES
+
+# The rules of the Bond model validators, as single patterns. A value they
+# accept is one that BulkBondSerializer accepts unchanged.
+ISIN = re.compile(r"[A-Z0-9]{12}")
+LEI = re.compile(r"[A-Z0-9]{20}")
+SIZE = re.compile(r"[1-9][0-9]{0,17}")
+MATURITY = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}")
+
+FIELDS = ("isin", "size", "currency", "maturity", "lei")
+
+
+def validate_rows(rows):
+    """
+    Validate a batch of bulk bond rows, column by column
+
+    Each column is checked for the whole batch at once against precompiled
+    patterns. Only the rows that fail are run through BulkBondSerializer, so
+    their error messages are exactly those of the serializer and the model
+    validators, which remain the reference. Returns a {index: validated data}
+    dict of the valid rows, in row order, and an {index: errors} dict of the
+    others.
+    """
+    # Rows that are not dicts fail every check and get the serializer's error
+    rows_or_empty = [row if type(row) is dict else {} for row in rows]
+    isins, sizes, currencies, maturities, leis = (
+        [row.get(name) for row in rows_or_empty] for name in FIELDS
+    )
+    sizes = list(map(_size, sizes))
+    maturities = list(map(_maturity, maturities))
+    valid = map(
+        all,
+        zip(
+            map(_matches(ISIN), isins),
+            map(_is_not_none, sizes),
+            map(_is_currency, currencies),
+            map(_is_not_none, maturities),
+            map(_matches(LEI), leis),
+        )
+    )
+
+    validated = {}
+    errors = {}
+    serializer = BulkBondSerializer()
+    columns = zip(isins, sizes, currencies, maturities, leis)
+    for index, (row, values, is_valid) in enumerate(zip(rows, columns, valid)):
+        if is_valid:
+            validated[index] = dict(zip(FIELDS, values))
+            continue
+        try:
+            validated[index] = serializer.run_validation(row)
+        except ValidationError as e:
+            errors[index] = e.detail
+    return validated, errors
+
+
+def _matches(pattern):
+    fullmatch = pattern.fullmatch
+
+    def matches(value):
+        return type(value) is str and fullmatch(value) is not None
+    return matches
+
+
+def _is_not_none(value):
+    return value is not None
+
+
+def _is_currency(value):
+    return type(value) is str and value in CURRENCY_CODES
+
+
+def _size(value):
+    if type(value) is int:
+        return value if 0 < value <= MAX_SIZE else None
+    if type(value) is str and SIZE.fullmatch(value):
+        return int(value)
+    return None
+
+
+def _maturity(value):
+    if type(value) is datetime.date:
+        return value
+    if type(value) is str and MATURITY.fullmatch(value):
+        try:
+            return datetime.date.fromisoformat(value)
+        except ValueError:
+            return None
+    return None
@@ -1,23 +1,53 @@
-import requests
+import datetime
 
+from django.http import HttpResponse
 from rest_framework import status
 from rest_framework import mixins
 from rest_framework import viewsets
 import django_filters.rest_framework
+from django_filters.utils import translate_validation
 from rest_framework.views import APIView
 from rest_framework.generics import ListCreateAPIView
 from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.decorators import authentication_classes, permission_classes
+from rest_framework.decorators import action, authentication_classes, permission_classes
+from rest_framework.settings import api_settings
 
 
+from bonds import aggregates
+from bonds import bulk as bulk_ingestion
+from bonds import encoding
+from bonds import enrichment
+from bonds import export as streaming
+from bonds import gleif
+from bonds import metrics as prometheus
 from bonds import models
+from bonds import replication
+from bonds import search
 from bonds import serializers
-from bonds.settings import GLEIF_LEILOOKUP_URL
+from bonds import sharding
+from bonds import summary as portfolio
+from bonds import timing
+from bonds.authentication import CachedTokenAuthentication
+from bonds.filters import BondFilter
+from bonds.pagination import BondCursorPagination
+from bonds.renderers import NDJSONRenderer, CSVRenderer
+from bonds.cache import MISSING
+from bonds.settings import BULK_MAX_ROWS, BULK_CHUNK_SIZE, ASYNC_ENRICHMENT, SUMMARY_TENORS
+from bonds.utils import chunked
+from bonds.versioning import condition_on_user_version
 
-@authentication_classes([TokenAuthentication])
+
+def _summary_validator(request):
+    # Tenor buckets are counted from today, so they change with the date
+    if request.query_params.get("bucket") == portfolio.TENOR:
+        tenors = request.query_params.get("tenors", "")
+        return f"{datetime.date.today().isoformat()}.{tenors}"
+    return None
+
+
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 class BondsViewSet(mixins.CreateModelMixin,
     mixins.ListModelMixin,
@@ -25,12 +55,119 @@ class BondsViewSet(mixins.CreateModelMixin,
     viewsets.GenericViewSet
 ):
     serializer_class = serializers.BondSerializer
+    pagination_class = BondCursorPagination
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer, CSVRenderer]
     filter_backends = [django_filters.rest_framework.DjangoFilterBackend]
-    filter_fields = ["isin", "size", "lei", "legal_name", "maturity", "currency"]
+    filterset_class = BondFilter
+
+    # Actions whose queries can be answered by a read replica
+    read_only_actions = {"list", "export", "summary"}
+
+    def perform_authentication(self, request):
+        with timing.phase("auth"):
+            super().perform_authentication(request)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, sharding.ShardMoved):
+            # Nothing was written, the next request goes to the new shard
+            return Response(
+                "Service temporarily unavailable",
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        return super().handle_exception(exc)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        sharding.select_shard(request.user)
+        if self.action in self.read_only_actions:
+            replication.read_from_replica(request.user)
+        else:
+            replication.read_from_primary()
 
     def get_queryset(self):
         # Only allow users to list bonds created by themself
-        return models.Bond.objects.filter(user=self.request.user)
+        return models.Bond.objects.filter(
+            user=self.request.user
+        ).select_related("legal_entity")
+
+    @condition_on_user_version()
+    def list(self, request, *args, **kwargs):
+        # ?format=ndjson|csv or a matching Accept header streams every bond
+        # instead of paginating
+        format = request.accepted_renderer.format
+        if format in streaming.CONTENT_TYPES:
+            return streaming.streaming_response(
+                self.filter_queryset(self.get_queryset()), format
+            )
+        # Pretty printed JSON and the browsable API go through the serializer
+        if format == "json" and "indent" not in request.accepted_media_type:
+            return self._list_json(request)
+        return super().list(request, *args, **kwargs)
+
+    def _list_json(self, request):
+        """
+        Encode a page of bonds straight from the database rows, giving the
+        same output as BondSerializer without building a model instance or
+        running the serializer fields for every bond
+        """
+        # The cursor is read from the id attribute of the named rows
+        rows = self.filter_queryset(self.get_queryset()).values_list(
+            *streaming.COLUMNS, "id", named=True
+        )
+        page = self.paginate_queryset(rows)
+        return HttpResponse(
+            encoding.encode_page(
+                streaming.encode_bond,
+                page,
+                self.paginator.get_next_link(),
+                self.paginator.get_previous_link()
+            ),
+            content_type="application/json"
+        )
+
+    @action(detail=False, renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """
+        Stream all of the user's bonds matching the list filters
+        """
+        format = request.accepted_renderer.format
+        return streaming.streaming_response(
+            self.filter_queryset(self.get_queryset()),
+            format,
+            filename=f"bonds.{format}"
+        )
+
+    @action(detail=False, renderer_classes=api_settings.DEFAULT_RENDERER_CLASSES)
+    @condition_on_user_version(validator=_summary_validator)
+    def summary(self, request):
+        """
+        Total size of the user's bonds by currency, issuer and maturity
+        """
+        bucket = request.query_params.get("bucket", portfolio.YEAR)
+        if bucket not in portfolio.BUCKETS:
+            return Response(
+                f"bucket must be one of {', '.join(portfolio.BUCKETS)}",
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            tenors = portfolio.parse_tenors(request.query_params["tenors"])
+        except KeyError:
+            tenors = SUMMARY_TENORS
+        except ValueError:
+            return Response(
+                "tenors must be a comma separated list of whole years "
+                f"from 1 to {portfolio.MAX_TENOR}",
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Unfiltered summaries by year are served from the running totals
+        filtered = set(request.query_params) & set(BondFilter.base_filters)
+        if bucket == portfolio.YEAR and not filtered:
+            return Response(portfolio.summarize_aggregates(request.user))
+
+        return Response(portfolio.summarize(
+            self.filter_queryset(self.get_queryset()), bucket=bucket, tenors=tenors
+        ))
 
     def destroy(self, request, pk=None):
         isin = pk
@@ -39,18 +176,81 @@ class BondsViewSet(mixins.CreateModelMixin,
                 "ISIN must be present in request",
                 status=status.HTTP_400_BAD_REQUEST
             )
-        bonds = models.Bond.objects.filter(user=request.user, isin=isin)
-        if len(bonds) == 0:
+
+        with sharding.atomic():
+            deleted = bulk_ingestion.delete_bonds(
+                request.user, models.Bond.objects.filter(user=request.user, isin=isin)
+            )
+        if not deleted:
             return Response(
                 f"Bond with ISIN {isin} not found",
                 status=status.HTTP_404_NOT_FOUND
             )
-        
-        bonds[0].delete()
         return Response(
             status=status.HTTP_204_NO_CONTENT
         )
 
+    def bulk_destroy(self, request):
+        """
+        Delete every bond matching the list filters, and/or the ISINs listed
+        in the body as {"isins": [...]}
+        """
+        unknown = set(request.query_params) - set(BondFilter.base_filters) - {"format"}
+        if unknown:
+            return Response(
+                f"Unknown filters: {', '.join(sorted(unknown))}",
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        filterset = BondFilter(request.query_params, queryset=self.get_queryset(), request=request)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        bonds = filterset.qs
+        # django-filter skips blank values, so only these narrow the bonds
+        filters = {
+            name: value for name, value in filterset.form.cleaned_data.items()
+            if value not in (None, "")
+        }
+        for name in ["search", "legal_name__prefix"]:
+            if name in filters and not search.normalize(filters[name]):
+                return Response(
+                    f"{name} must contain a letter or a digit",
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        isins = None
+        if request.body:
+            data = JSONParser().parse(request)
+            isins = data.get("isins") if isinstance(data, dict) else None
+            if not isinstance(isins, list) or not all(isinstance(isin, str) for isin in isins):
+                return Response(
+                    'Request body must be {"isins": [...]}',
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if len(isins) > BULK_MAX_ROWS:
+                return Response(
+                    f"At most {BULK_MAX_ROWS} bonds can be deleted by ISIN in one request",
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        elif not filters:
+            # Deleting everything must be asked for explicitly
+            return Response(
+                "At least one filter or a list of ISINs is required",
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        deleted = 0
+        with sharding.atomic():
+            if isins is None:
+                deleted = bulk_ingestion.delete_bonds(request.user, bonds)
+            else:
+                # Keep the IN clause below SQLite's bound parameter limit
+                for batch in chunked(isins, BULK_CHUNK_SIZE):
+                    deleted += bulk_ingestion.delete_bonds(
+                        request.user, bonds.filter(isin__in=batch)
+                    )
+        return Response({"deleted": deleted}, status=status.HTTP_200_OK)
+
     def create(self, request):
         """
         Create a new bond
@@ -63,33 +263,97 @@ class BondsViewSet(mixins.CreateModelMixin,
                 status=status.HTTP_422_UNPROCESSABLE_ENTITY
             )
 
-        # Get the legal_name via GLEIF API
-        response = requests.get(
-            f"{GLEIF_LEILOOKUP_URL}?lei={data['lei']}"
-        )
-        if response.status_code == status.HTTP_400_BAD_REQUEST:
-            return Response(
-                response.json()["message"], status=status.HTTP_400_BAD_REQUEST
-            )
-        elif response.status_code != 200:
-            return Response(
-                "Service temporarily unavailable", 
-                status=status.HTTP_503_SERVICE_UNAVAILABLE
-            )
+        legal_name = gleif.cached_legal_name(data["lei"])
+        if legal_name is MISSING and ASYNC_ENRICHMENT:
+            return self._create_pending(request, data)
+
+        if legal_name is MISSING:
+            # Get the legal_name via GLEIF API
+            try:
+                legal_name = gleif.fetch_legal_name(data["lei"])
+            except gleif.GleifBadRequest as e:
+                return Response(e.message, status=status.HTTP_400_BAD_REQUEST)
+            except gleif.GleifUnavailable:
+                return Response(
+                    "Service temporarily unavailable",
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE
+                )
 
-        response_json = response.json()
-        if not response_json:
+        if legal_name is None:
             return Response(
                 f"A legal entiry with LEI {data['lei']} does not exist",
                 status = status.HTTP_422_UNPROCESSABLE_ENTITY
             )
-        
-        legal_name = response.json()[0]["Entity"]["LegalName"]["$"]
-        data["legal_name"] = legal_name
+
         serializer = serializers.BondSerializer(data=data, context={"request": request})
 
-        if not serializer.is_valid():
+        with timing.phase("validation"):
+            valid = serializer.is_valid()
+        if not valid:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer.save()
+        with sharding.atomic():
+            # Resolved LEIs always have a legal entity row
+            bond = serializer.save(legal_entity_id=data["lei"])
+            aggregates.record_created([bond])
+            models.UserDataVersion.objects.bump([request.user.pk])
         return Response(status=status.HTTP_200_OK)
+
+    def _create_pending(self, request, data):
+        """
+        Save a bond straight away and leave its legal entity to the enrichment
+        workers
+        """
+        serializer = serializers.BondSerializer(data=data, context={"request": request})
+
+        with timing.phase("validation"):
+            valid = serializer.is_valid()
+        if not valid:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        with sharding.atomic():
+            bond = serializer.save(enrichment_state=models.Bond.PENDING)
+            aggregates.record_created([bond])
+            enrichment.enqueue(bond)
+            models.UserDataVersion.objects.bump([request.user.pk])
+        return Response(status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        Create many bonds at once, reporting the outcome of every row
+        """
+        data = JSONParser().parse(request)
+
+        if not isinstance(data, list):
+            return Response(
+                "Request must be a list of bonds",
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(data) > BULK_MAX_ROWS:
+            return Response(
+                f"At most {BULK_MAX_ROWS} bonds can be created in one request",
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            results = bulk_ingestion.ingest_bonds(request.user, data)
+        except gleif.GleifUnavailable:
+            return Response(
+                "Service temporarily unavailable",
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+
+        created = sum(1 for result in results if result["status"] == bulk_ingestion.CREATED)
+        return Response(
+            {"created": created, "failed": len(results) - created, "results": results},
+            status=status.HTTP_200_OK
+        )
+
+
+def metrics(request):
+    """
+    Prometheus text exposition of the service's metrics
+    """
+    content_type, body = prometheus.exposition()
+    return HttpResponse(body, content_type=content_type)
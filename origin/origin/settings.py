@@ -39,7 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework.authtoken',
     'rest_framework',
-    'bonds'
+    'bonds.apps.BondsConfig'
 ]
 
 MIDDLEWARE = [
@@ -50,6 +50,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'bonds.middleware.MetricsMiddleware',
 ]
 
 ROOT_URLCONF = 'origin.urls'
@@ -76,13 +77,34 @@ WSGI_APPLICATION = 'origin.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
+# bonds.backends.sqlite3 is the stock SQLite backend in WAL mode, with the
+# pragmas and lock retries configured by the BONDS_SQLITE_* settings. It is
+# used for every alias since replicas and shards see the same concurrent
+# workers; only transactions opened with bonds.utils.write_atomic take the
+# write lock up front, others behave as with the stock backend
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'bonds.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    },
+    # A local stand-in for a read replica, a copy of db.sqlite3 refreshed by
+    # manage.py sync_replicas. Reads only go to the aliases listed in
+    # BONDS_READ_REPLICAS
+    'replica': {
+        'ENGINE': 'bonds.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'replica.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    },
+    # A second shard for the users' bonds, only used once it is listed in
+    # BONDS_SHARDS along with default
+    'shard1': {
+        'ENGINE': 'bonds.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'shard1.sqlite3'),
+    },
 }
 
+DATABASE_ROUTERS = ['bonds.sharding.ShardRouter', 'bonds.replication.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -123,3 +145,9 @@ USE_TZ = True
 STATIC_URL = '/static/'
 
 BONDS_GLEIF_LEILOOKUP_URL = "https://leilookup.gleif.org/api/v2/leirecords"
+# Keep-alive connection pool, timeouts (seconds) and retry policy of the GLEIF client
+BONDS_GLEIF_POOL_MAXSIZE = 10
+BONDS_GLEIF_CONNECT_TIMEOUT = 3.05
+BONDS_GLEIF_READ_TIMEOUT = 10
+BONDS_GLEIF_MAX_RETRIES = 3
+BONDS_GLEIF_BACKOFF_FACTOR = 0.3
@@ -16,14 +16,15 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 
-from bonds.views import BondsViewSet
-from rest_framework.routers import Route, SimpleRouter
+from bonds.routers import BondRouter
+from bonds.views import BondsViewSet, metrics
 from rest_framework.authtoken.views import obtain_auth_token
 
-router = SimpleRouter()
+router = BondRouter()
 router.register(r"bonds", BondsViewSet, basename="bonds")
 
 urlpatterns = router.urls + [
     path('admin/', admin.site.urls),
     path('auth_token/', obtain_auth_token),
+    path('metrics', metrics, name='metrics'),
 ]
\ No newline at end of file